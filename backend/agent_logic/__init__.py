@@ -1,3 +1,16 @@
-from .software_engineer_crew import SoftwareEngineerCrew
+import importlib
 
-__all__ = ["SoftwareEngineerCrew"]
+_EXPORTS = {
+    "SoftwareEngineerCrew": ".software_engineer_crew",
+    "TaskCancelledError": ".errors",
+}
+
+__all__ = ["SoftwareEngineerCrew", "TaskCancelledError"]
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
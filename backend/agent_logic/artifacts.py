@@ -0,0 +1,137 @@
+import hashlib
+import re
+import logging
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILENAMES = {
+    "python": "main.py",
+    "javascript": "index.js",
+    "typescript": "index.ts",
+}
+
+FENCE = re.compile(r"^\s*(`{3,}|~{3,})\s*([\w+#.-]*)\s*(.*)$")
+FILENAME = r"([\w./-]+\.[\w]+|Dockerfile|Makefile)"
+ATTR_NAME = re.compile(r"""(?:title|file(?:name)?|path)\s*[=:]\s*["']?""" + FILENAME)
+HEADING_NAME = re.compile(r"^\s*(?:#+\s*|\*\*|__|`|(?:File|Filename|Path)\s*:\s*)*" + FILENAME + r"[`*_:]*\s*$", re.IGNORECASE)
+COMMENT_NAME = re.compile(r"^\s*(?:#|//|--|/\*)\s*(?:(?:File|Filename|Path)\s*:\s*)?" + FILENAME + r"\s*(?:\*/)?\s*$", re.IGNORECASE)
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def safe_filename(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    path = PurePosixPath(name.strip().strip("`'\""))
+    if path.is_absolute() or ".." in path.parts or not path.parts:
+        return None
+    return str(path)
+
+class FencedFileParser:
+    def __init__(self):
+        self._buffer = ""
+        self._fence: Optional[str] = None
+        self._fence_name: Optional[str] = None
+        self._pending_name: Optional[str] = None
+        self._lines: List[str] = []
+        self.files: Dict[str, str] = {}
+        self.unnamed: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        self._buffer += chunk
+        completed = []
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            finished = self._consume(line)
+            if finished:
+                completed.append(finished)
+        return completed
+
+    def close(self) -> List[Tuple[str, str]]:
+        completed = []
+        if self._buffer:
+            finished = self._consume(self._buffer)
+            self._buffer = ""
+            if finished:
+                completed.append(finished)
+        if self._fence is not None:
+            finished = self._finish_block()
+            if finished:
+                completed.append(finished)
+        return completed
+
+    def _consume(self, line: str) -> Optional[Tuple[str, str]]:
+        match = FENCE.match(line)
+        if self._fence is None:
+            if match:
+                self._fence = match.group(1)
+                info = f"{match.group(2)} {match.group(3)}".strip()
+                attr = ATTR_NAME.search(info)
+                if attr:
+                    self._fence_name = safe_filename(attr.group(1))
+                else:
+                    candidates = [part for part in info.split() if "." in part or part in ("Dockerfile", "Makefile")]
+                    self._fence_name = safe_filename(candidates[0]) if candidates else None
+                self._lines = []
+            elif line.strip():
+                heading = HEADING_NAME.match(line)
+                self._pending_name = safe_filename(heading.group(1)) if heading else None
+            return None
+
+        if match and match.group(1).startswith(self._fence[0]) and len(match.group(1)) >= len(self._fence) \
+                and not match.group(2) and not match.group(3):
+            return self._finish_block()
+        self._lines.append(line)
+        return None
+
+    def _finish_block(self) -> Optional[Tuple[str, str]]:
+        name = self._fence_name or self._pending_name
+        lines = self._lines
+        if name is None and lines:
+            comment = COMMENT_NAME.match(lines[0])
+            if comment:
+                name = safe_filename(comment.group(1))
+                lines = lines[1:]
+        content = "\n".join(lines) + "\n"
+
+        self._fence = None
+        self._fence_name = None
+        self._pending_name = None
+        self._lines = []
+
+        if name is None:
+            self.unnamed.append(content)
+            return None
+        self.files[name] = content
+        return name, content
+
+def parse_artifacts(text: str, language: str) -> Dict[str, str]:
+    parser = FencedFileParser()
+    parser.feed(text)
+    parser.close()
+    if parser.files:
+        return parser.files
+    default_name = DEFAULT_FILENAMES.get(language, "main.py")
+    if parser.unnamed:
+        return {default_name: parser.unnamed[0]}
+    return {default_name: text}
+
+def parse_named_files(text: str) -> Dict[str, str]:
+    parser = FencedFileParser()
+    parser.feed(text)
+    parser.close()
+    return parser.files
+
+def render_files(files: Dict[str, str]) -> str:
+    return "\n".join(f"{name}\n```\n{content.rstrip()}\n```\n" for name, content in files.items())
+
+def build_artifacts(files: Dict[str, str], language: str) -> Dict:
+    return {
+        "files": files,
+        "hashes": {name: content_hash(content) for name, content in files.items()},
+        "language": language,
+        "code_text": render_files(files)
+    }
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+
+    from .software_engineer_crew import SoftwareEngineerCrew
+    from .tools.executor_backend import ExecutorBackend
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _crew_runtime():
+    from .software_engineer_crew import SoftwareEngineerCrew, DEFAULT_MODELS
+    return SoftwareEngineerCrew, DEFAULT_MODELS
+
+class CrewRegistry:
+    def __init__(
+        self,
+        max_idle_per_key: int = 4,
+        idle_timeout: float = 600.0,
+        max_connections: int = 100,
+        sandbox_executor: Optional["ExecutorBackend"] = None,
+    ):
+        self.max_idle_per_key = max_idle_per_key
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self._idle: Dict[str, List[Tuple[float, "SoftwareEngineerCrew"]]] = {}
+        self._keys: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._http_client: Optional["httpx.Client"] = None
+        self._sandbox_executor: Optional["ExecutorBackend"] = sandbox_executor
+        self._stats = {"created": 0, "reused": 0, "evicted": 0}
+        self.runtime_state = "cold"
+        self.runtime_load_seconds: Optional[float] = None
+
+    @staticmethod
+    def key_for(openrouter_api_key: str, models: Dict) -> str:
+        payload = openrouter_api_key + json.dumps(models, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def http_client(self) -> "httpx.Client":
+        with self._lock:
+            if self._http_client is None:
+                import httpx
+                from .llm_gateway import get_llm_gateway
+                transport = httpx.HTTPTransport(
+                    http2=_http2_available(),
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                        keepalive_expiry=self.idle_timeout,
+                    ),
+                )
+                gateway = get_llm_gateway()
+                self._http_client = httpx.Client(
+                    transport=gateway.wrap(transport) if gateway is not None else transport,
+                    timeout=httpx.Timeout(600.0, connect=10.0),
+                )
+            return self._http_client
+
+    @property
+    def sandbox_executor(self) -> "ExecutorBackend":
+        with self._lock:
+            if self._sandbox_executor is None:
+                from .tools.executor_backend import create_sandbox_executor
+                self._sandbox_executor = create_sandbox_executor()
+            return self._sandbox_executor
+
+    def warm_up(self) -> bool:
+        if self.runtime_state == "ready":
+            return True
+        self.runtime_state = "loading"
+        started = time.monotonic()
+        try:
+            _crew_runtime()
+            self.sandbox_executor.warm()
+            self.http_client
+        except Exception as e:
+            self.runtime_state = "failed"
+            logger.error(f"Agent runtime warm-up failed: {str(e)}")
+            return False
+        self.runtime_load_seconds = round(time.monotonic() - started, 3)
+        self.runtime_state = "ready"
+        logger.info(f"Agent runtime loaded in {self.runtime_load_seconds:.2f}s")
+        return True
+
+    def acquire(self, openrouter_api_key: str, models: Optional[Dict] = None) -> "SoftwareEngineerCrew":
+        SoftwareEngineerCrew, DEFAULT_MODELS = _crew_runtime()
+        models = models or DEFAULT_MODELS
+        key = self.key_for(openrouter_api_key, models)
+        with self._lock:
+            self._evict_idle_locked()
+            idle = self._idle.get(key)
+            if idle:
+                _, crew = idle.pop()
+                self._stats["reused"] += 1
+                self._keys[id(crew)] = key
+                return crew
+
+        crew = SoftwareEngineerCrew(
+            openrouter_api_key=openrouter_api_key,
+            sandbox_executor=self.sandbox_executor,
+            http_client=self.http_client,
+            models=models
+        )
+        with self._lock:
+            self._stats["created"] += 1
+            self._keys[id(crew)] = key
+        self.runtime_state = "ready"
+        return crew
+
+    def release(self, crew: "SoftwareEngineerCrew"):
+        with self._lock:
+            key = self._keys.pop(id(crew), None)
+            if key is None:
+                return
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_key:
+                idle.append((time.monotonic(), crew))
+
+    @contextmanager
+    def lease(self, openrouter_api_key: str, models: Optional[Dict] = None):
+        crew = self.acquire(openrouter_api_key, models)
+        try:
+            yield crew
+        finally:
+            self.release(crew)
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            return self._evict_idle_locked()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(
+                self._stats,
+                keys=len(self._idle),
+                idle=sum(len(idle) for idle in self._idle.values()),
+                in_use=len(self._keys),
+                runtime=self.runtime_state,
+            )
+
+    def llm_gateway_stats(self) -> Dict:
+        with self._lock:
+            if self._http_client is None:
+                return {"enabled": None, "loaded": False}
+        from .llm_gateway import get_llm_gateway
+        gateway = get_llm_gateway()
+        if gateway is None:
+            return {"enabled": False, "loaded": True}
+        return {"enabled": True, "loaded": True, **gateway.stats()}
+
+    def shutdown(self):
+        with self._lock:
+            self._idle.clear()
+            client, self._http_client = self._http_client, None
+            executor, self._sandbox_executor = self._sandbox_executor, None
+        if client is not None:
+            client.close()
+        if executor is not None:
+            executor.shutdown()
+
+    def _evict_idle_locked(self) -> int:
+        cutoff = time.monotonic() - self.idle_timeout
+        evicted = 0
+        for key in list(self._idle):
+            fresh = [(released_at, crew) for released_at, crew in self._idle[key] if released_at >= cutoff]
+            evicted += len(self._idle[key]) - len(fresh)
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+        self._stats["evicted"] += evicted
+        return evicted
+
+_shared_registry: Optional[CrewRegistry] = None
+_shared_registry_lock = threading.Lock()
+
+def get_crew_registry() -> CrewRegistry:
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = CrewRegistry(
+                max_idle_per_key=int(os.getenv("CREW_MAX_IDLE_PER_KEY", "4")),
+                idle_timeout=float(os.getenv("CREW_IDLE_TIMEOUT", "600")),
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+            )
+        return _shared_registry
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_entries: int = 256,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        return "\n".join(line.rstrip() for line in prompt.strip().splitlines())
+
+    def make_key(self, model: str, temperature: Optional[float], role: str, prompt: str) -> str:
+        payload = json.dumps([model, temperature, role, self.normalize_prompt(prompt)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[0], now):
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._memory[key]
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, now, value)
+        return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._stats["writes"] += 1
+        self._write_disk(key, now, value)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = lookups - self._stats["misses"]
+            return dict(
+                self._stats,
+                hit_rate=round(hits / lookups, 4) if lookups else 0.0,
+                memory_entries=len(self._memory),
+                disk_entries=len(self._disk_index),
+                disk_bytes=self._disk_bytes,
+            )
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, value: str):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_disk_index(self):
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk_index[key] = size
+            self._disk_bytes += size
+
+    def _read_disk(self, key: str, now: float) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if self._expired(entry.get("created_at", 0), now):
+            self._drop_disk(key)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._disk_index:
+                self._disk_index.move_to_end(key)
+        return entry.get("value")
+
+    def _write_disk(self, key: str, created_at: float, value: str):
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        data = json.dumps({"created_at": created_at, "value": value})
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_text(data, encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write LLM cache entry: {str(e)}")
+            return
+
+        size = len(data.encode("utf-8"))
+        doomed = []
+        with self._lock:
+            self._disk_bytes += size - self._disk_index.pop(key, 0)
+            self._disk_index[key] = size
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk_index) > 1:
+                old_key, old_size = self._disk_index.popitem(last=False)
+                self._disk_bytes -= old_size
+                self._stats["evictions"] += 1
+                doomed.append(old_key)
+        for old_key in doomed:
+            self._unlink(old_key)
+
+    def _drop_disk(self, key: str):
+        with self._lock:
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+            self._stats["evictions"] += 1
+        self._unlink(key)
+
+    def _unlink(self, key: str):
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+_shared_cache: Optional[LLMResponseCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    global _shared_cache
+    if os.getenv("LLM_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            ttl = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+            _shared_cache = LLMResponseCache(
+                cache_dir=os.getenv("LLM_CACHE_DIR", "/app/work_dir/llm_cache") or None,
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256")),
+                max_disk_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+                ttl_seconds=ttl or None,
+            )
+        return _shared_cache
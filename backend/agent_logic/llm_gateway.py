@@ -0,0 +1,492 @@
+import contextvars
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from .tools.telemetry import METRICS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LLM_GATEWAY_ENABLED = os.getenv("LLM_GATEWAY_ENABLED", "true").lower() in ("1", "true", "yes")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+LLM_QUEUE_WAIT_SECONDS = METRICS.histogram(
+    "opendevagent_llm_gateway_queue_wait_seconds", "Time LLM calls waited for rate limit tokens and a concurrency slot", ("model",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+)
+LLM_GATEWAY_RETRIES = METRICS.counter("opendevagent_llm_gateway_retries_total", "LLM requests retried by the gateway", ("model", "reason"))
+LLM_GATEWAY_COALESCED = METRICS.counter("opendevagent_llm_gateway_coalesced_total", "LLM calls served by an identical in-flight request", ("model",))
+LLM_GATEWAY_LIMIT = METRICS.gauge("opendevagent_llm_gateway_concurrency_limit", "Adaptive concurrency limit per key and model", ("key", "model"))
+
+_current_call: contextvars.ContextVar = contextvars.ContextVar("llm_gateway_call", default=None)
+
+class GatewayCall:
+    def __init__(self):
+        self.requests = 0
+        self.queue_wait = 0.0
+        self.retries = 0
+        self.coalesced = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            "queue_wait": round(self.queue_wait, 3),
+            "retries": self.retries,
+            "coalesced": self.coalesced > 0,
+        }
+
+@contextmanager
+def gateway_call():
+    call = GatewayCall()
+    token = _current_call.set(call)
+    try:
+        yield call
+    finally:
+        _current_call.reset(token)
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+class AdaptiveLimiter:
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_tolerance: float, on_change=None):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_tolerance = latency_tolerance
+        self.baseline: Optional[float] = None
+        self.in_flight = 0
+        self.decreases = 0
+        self.on_change = on_change
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            self.in_flight += 1
+            return True
+
+    def release(self, throttled: bool = False, latency: Optional[float] = None):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self._decrease()
+            elif latency is not None:
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    self.baseline += (latency - self.baseline) * 0.01
+                if self.latency_tolerance and latency > self.baseline * self.latency_tolerance:
+                    self._decrease()
+                elif self.in_flight + 1 >= int(self.limit):
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            limit = self.limit
+        if self.on_change is not None:
+            self.on_change(limit)
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < max(1.0, self.baseline or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.minimum), self.limit / 2)
+        self.decreases += 1
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "baseline_latency": round(self.baseline, 3) if self.baseline is not None else None,
+                "decreases": self.decreases,
+            }
+
+class Flight:
+    def __init__(self, on_finish):
+        self.ready = threading.Event()
+        self.status_code = 0
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.error: Optional[BaseException] = None
+        self.chunks: List[bytes] = []
+        self.finished = False
+        self.abandoned = False
+        self.subscribers = 1
+        self._upstream: Optional[httpx.Response] = None
+        self._iterator = None
+        self._reading = False
+        self._on_finish = on_finish
+        self._cond = threading.Condition()
+
+    def start(self, response: httpx.Response):
+        self.status_code = response.status_code
+        self.headers = response.headers.raw
+        self._upstream = response
+        self._iterator = iter(response.stream)
+        self.ready.set()
+
+    def fail(self, error: BaseException):
+        self.error = error
+        with self._cond:
+            finished = self._finish(error)
+        self.ready.set()
+        if finished:
+            self._settle()
+
+    def subscribe(self) -> bool:
+        with self._cond:
+            if self.abandoned:
+                return False
+            self.subscribers += 1
+            return True
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+            finished = self.subscribers <= 0 and self._finish(None)
+            if finished:
+                self.abandoned = True
+        if finished:
+            self._settle()
+
+    def chunk(self, index: int) -> Optional[bytes]:
+        with self._cond:
+            while True:
+                if index < len(self.chunks):
+                    return self.chunks[index]
+                if self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    if self.abandoned:
+                        raise httpx.StreamClosed()
+                    return None
+                if not self._reading:
+                    self._reading = True
+                    break
+                self._cond.wait()
+        error = None
+        try:
+            chunk = next(self._iterator, None)
+        except Exception as e:
+            chunk, error = None, e
+        finished = False
+        with self._cond:
+            self._reading = False
+            if chunk is None:
+                finished = self._finish(error)
+            else:
+                self.chunks.append(chunk)
+            self._cond.notify_all()
+        if finished:
+            self._settle()
+        if error is not None:
+            raise error
+        return chunk
+
+    def _finish(self, error: Optional[BaseException]) -> bool:
+        if self.finished:
+            return False
+        self.finished = True
+        if error is not None:
+            self.error = error
+        self._cond.notify_all()
+        return True
+
+    def _settle(self):
+        if self._upstream is not None:
+            self._upstream.close()
+        self._on_finish(self)
+
+class FlightStream(httpx.SyncByteStream):
+    def __init__(self, flight: Flight):
+        self.flight = flight
+        self._closed = False
+
+    def __iter__(self):
+        index = 0
+        while True:
+            chunk = self.flight.chunk(index)
+            if chunk is None:
+                return
+            index += 1
+            yield chunk
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.flight.unsubscribe()
+
+class LLMGateway:
+    def __init__(
+        self,
+        key_rate: float = 5.0,
+        key_burst: float = 10.0,
+        model_rate: float = 10.0,
+        model_burst: float = 20.0,
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        latency_tolerance: float = 3.0,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        max_queue_wait: Optional[float] = 300.0,
+        coalesce: bool = True,
+        seed: Optional[int] = None
+    ):
+        self.key_rate = key_rate
+        self.key_burst = key_burst
+        self.model_rate = model_rate
+        self.model_burst = model_burst
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_tolerance = latency_tolerance
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue_wait = max_queue_wait
+        self.coalesce = coalesce
+        self.random = random.Random(seed)
+        self._key_buckets: Dict[str, TokenBucket] = {}
+        self._model_buckets: Dict[str, TokenBucket] = {}
+        self._limiters: Dict[Tuple[str, str], AdaptiveLimiter] = {}
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "upstream_requests": 0, "coalesced": 0, "retries": 0, "throttled": 0, "queue_wait": 0.0}
+
+    def wrap(self, transport: httpx.BaseTransport) -> "GatewayTransport":
+        return GatewayTransport(self, transport)
+
+    def send(self, transport: httpx.BaseTransport, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        key, model = self._identify(request, body)
+        call = _current_call.get()
+        if call is not None:
+            call.requests += 1
+        with self._lock:
+            self._stats["requests"] += 1
+
+        fingerprint = None
+        if self.coalesce and request.method == "POST":
+            fingerprint = hashlib.sha256(
+                b"\n".join([request.method.encode(), str(request.url).encode(), request.headers.get("authorization", "").encode(), body])
+            ).hexdigest()
+
+        leader = True
+        with self._lock:
+            flight = self._flights.get(fingerprint) if fingerprint is not None else None
+            if flight is not None and flight.subscribe():
+                leader = False
+                self._stats["coalesced"] += 1
+            else:
+                flight = Flight(lambda f: self._forget(fingerprint, f))
+                if fingerprint is not None:
+                    self._flights[fingerprint] = flight
+
+        if leader:
+            try:
+                response, limiter, latency = self._dispatch(transport, request, key, model, call)
+            except BaseException as e:
+                flight.fail(e)
+                raise
+            flight._on_finish = lambda f: self._settle(f, fingerprint, limiter, latency)
+            flight.start(response)
+        else:
+            LLM_GATEWAY_COALESCED.inc(model=model)
+            if call is not None:
+                call.coalesced += 1
+            logger.info(f"Coalesced identical in-flight {model} request")
+            flight.ready.wait()
+            if flight.error is not None and not flight.chunks and flight.status_code == 0:
+                flight.unsubscribe()
+                raise flight.error
+
+        return httpx.Response(flight.status_code, headers=flight.headers, stream=FlightStream(flight), request=request)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            limiters = dict(self._limiters)
+            stats = dict(self._stats, in_flight_requests=len(self._flights))
+        stats["queue_wait"] = round(stats["queue_wait"], 3)
+        stats["limits"] = {f"{key}:{model}": limiter.stats() for (key, model), limiter in limiters.items()}
+        return stats
+
+    def _identify(self, request: httpx.Request, body: bytes) -> Tuple[str, str]:
+        key = hashlib.sha256(request.headers.get("authorization", "").encode("utf-8")).hexdigest()[:16]
+        model = "unknown"
+        if body:
+            try:
+                model = str(json.loads(body).get("model") or model)
+            except (ValueError, AttributeError):
+                pass
+        return key, model
+
+    def _bucket(self, buckets: Dict[str, TokenBucket], name: str, rate: float, burst: float) -> Optional[TokenBucket]:
+        if rate <= 0:
+            return None
+        with self._lock:
+            bucket = buckets.get(name)
+            if bucket is None:
+                bucket = buckets[name] = TokenBucket(rate, burst)
+            return bucket
+
+    def _limiter(self, key: str, model: str) -> AdaptiveLimiter:
+        with self._lock:
+            limiter = self._limiters.get((key, model))
+            if limiter is None:
+                limiter = AdaptiveLimiter(
+                    self.initial_concurrency,
+                    self.min_concurrency,
+                    self.max_concurrency,
+                    self.latency_tolerance,
+                    on_change=lambda limit: LLM_GATEWAY_LIMIT.set(round(limit, 2), key=key[:8], model=model),
+                )
+                self._limiters[(key, model)] = limiter
+            return limiter
+
+    def _wait_turn(self, request: httpx.Request, key: str, model: str) -> Tuple[AdaptiveLimiter, float]:
+        started = time.monotonic()
+        delays = [
+            bucket.reserve() for bucket in (
+                self._bucket(self._key_buckets, key, self.key_rate, self.key_burst),
+                self._bucket(self._model_buckets, model, self.model_rate, self.model_burst),
+            ) if bucket is not None
+        ]
+        delay = max(delays, default=0.0)
+        if delay:
+            time.sleep(delay)
+        limiter = self._limiter(key, model)
+        remaining = self.max_queue_wait - (time.monotonic() - started) if self.max_queue_wait else None
+        if not limiter.acquire(max(0.001, remaining) if remaining is not None else None):
+            raise httpx.PoolTimeout(f"LLM gateway queue wait exceeded {self.max_queue_wait}s for {model}", request=request)
+        return limiter, time.monotonic() - started
+
+    def _dispatch(self, transport: httpx.BaseTransport, request: httpx.Request, key: str, model: str, call: Optional[GatewayCall]):
+        attempt = 0
+        while True:
+            limiter, waited = self._wait_turn(request, key, model)
+            LLM_QUEUE_WAIT_SECONDS.observe(waited, model=model)
+            with self._lock:
+                self._stats["queue_wait"] += waited
+                self._stats["upstream_requests"] += 1
+            if call is not None:
+                call.queue_wait += waited
+
+            sent_at = time.monotonic()
+            try:
+                response = transport.handle_request(request)
+            except httpx.TransportError as e:
+                limiter.release()
+                if attempt >= self.max_retries or isinstance(e, httpx.PoolTimeout):
+                    raise
+                reason, retry_after = type(e).__name__, None
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response, limiter, time.monotonic() - sent_at
+                limiter.release(throttled=response.status_code == 429)
+                if response.status_code == 429:
+                    with self._lock:
+                        self._stats["throttled"] += 1
+                if attempt >= self.max_retries:
+                    response.read()
+                    response.close()
+                    return httpx.Response(response.status_code, headers=response.headers.raw, content=response.content), None, None
+                reason, retry_after = str(response.status_code), self._retry_after(response)
+                response.close()
+
+            delay = self.random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            if retry_after is not None:
+                delay = min(self.backoff_max, retry_after) + delay / 4
+            attempt += 1
+            LLM_GATEWAY_RETRIES.inc(model=model, reason=reason)
+            with self._lock:
+                self._stats["retries"] += 1
+            if call is not None:
+                call.retries += 1
+            logger.warning(f"LLM request to {model} failed ({reason}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            time.sleep(delay)
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None
+
+    def _settle(self, flight: Flight, fingerprint: Optional[str], limiter: Optional[AdaptiveLimiter], latency: Optional[float]):
+        self._forget(fingerprint, flight)
+        if limiter is not None:
+            limiter.release(latency=None if flight.error is not None else latency)
+
+    def _forget(self, fingerprint: Optional[str], flight: Flight):
+        if fingerprint is None:
+            return
+        with self._lock:
+            if self._flights.get(fingerprint) is flight:
+                del self._flights[fingerprint]
+
+class GatewayTransport(httpx.BaseTransport):
+    def __init__(self, gateway: LLMGateway, transport: httpx.BaseTransport):
+        self.gateway = gateway
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self.gateway.send(self.transport, request)
+
+    def close(self):
+        self.transport.close()
+
+_shared_gateway: Optional[LLMGateway] = None
+_shared_gateway_lock = threading.Lock()
+
+def get_llm_gateway() -> Optional[LLMGateway]:
+    global _shared_gateway
+    if not LLM_GATEWAY_ENABLED:
+        return None
+    with _shared_gateway_lock:
+        if _shared_gateway is None:
+            _shared_gateway = LLMGateway(
+                key_rate=float(os.getenv("LLM_GATEWAY_KEY_RATE", "5")),
+                key_burst=float(os.getenv("LLM_GATEWAY_KEY_BURST", "10")),
+                model_rate=float(os.getenv("LLM_GATEWAY_MODEL_RATE", "10")),
+                model_burst=float(os.getenv("LLM_GATEWAY_MODEL_BURST", "20")),
+                initial_concurrency=int(os.getenv("LLM_GATEWAY_CONCURRENCY", "8")),
+                min_concurrency=int(os.getenv("LLM_GATEWAY_MIN_CONCURRENCY", "1")),
+                max_concurrency=int(os.getenv("LLM_GATEWAY_MAX_CONCURRENCY", "64")),
+                latency_tolerance=float(os.getenv("LLM_GATEWAY_LATENCY_TOLERANCE", "3")),
+                max_retries=int(os.getenv("LLM_GATEWAY_MAX_RETRIES", "4")),
+                backoff_base=float(os.getenv("LLM_GATEWAY_BACKOFF_BASE", "0.5")),
+                backoff_max=float(os.getenv("LLM_GATEWAY_BACKOFF_MAX", "30")),
+                max_queue_wait=float(os.getenv("LLM_GATEWAY_MAX_QUEUE_WAIT", "300")) or None,
+                coalesce=os.getenv("LLM_GATEWAY_COALESCE", "true").lower() in ("1", "true", "yes"),
+            )
+        return _shared_gateway
@@ -0,0 +1,224 @@
+import math
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .tools.output_buffer import TRUNCATION_MARKER
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LLM_STREAMING_ENABLED = os.getenv("LLM_STREAMING", "true").lower() in ("1", "true", "yes")
+STREAM_LOG_LINES = int(os.getenv("LLM_STREAM_LOG_LINES", "200"))
+STREAM_PROGRESS_INTERVAL = 0.5
+EXPECTED_RESPONSE_TOKENS = 2000
+
+class StreamStats:
+    def __init__(self, phase: str, role: str, model: str, on_token: Optional[Callable[[str], None]] = None):
+        self.phase = phase
+        self.role = role
+        self.model = model
+        self.on_token = on_token
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.request_started: Optional[float] = None
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.calls = 0
+        self.tokens = 0
+        self.errors = 0
+        self.cached = False
+        self._lock = threading.Lock()
+
+    def start_request(self):
+        with self._lock:
+            self.calls += 1
+            if self.request_started is None:
+                self.request_started = time.monotonic()
+
+    def token(self, token: str):
+        now = time.monotonic()
+        with self._lock:
+            if self.first_token_at is None:
+                self.first_token_at = now
+            self.last_token_at = now
+            self.tokens += 1
+        if self.on_token is not None and token:
+            try:
+                self.on_token(token)
+            except Exception as e:
+                logger.warning(f"Token callback failed for {self.role}: {str(e)}")
+
+    def end_request(self, error: bool = False):
+        if error:
+            with self._lock:
+                self.errors += 1
+
+    def as_dict(self) -> Dict:
+        finished = self.finished or time.monotonic()
+        ttft = None
+        if self.first_token_at is not None:
+            ttft = self.first_token_at - (self.request_started or self.started)
+        streaming_time = (self.last_token_at or 0) - (self.first_token_at or 0)
+        return {
+            "phase": self.phase,
+            "role": self.role,
+            "model": self.model,
+            "cached": self.cached,
+            "calls": self.calls,
+            "errors": self.errors,
+            "tokens": self.tokens,
+            "ttft": round(ttft, 3) if ttft is not None else None,
+            "latency": round(finished - self.started, 3),
+            "tokens_per_second": round(self.tokens / streaming_time, 1) if streaming_time > 0 else None,
+        }
+
+class LLMStreamTracker:
+    def __init__(self):
+        self._local = threading.local()
+        self._runs: Dict[str, StreamStats] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, phase: str, role: str, model: str, on_token: Optional[Callable[[str], None]] = None):
+        stats = StreamStats(phase, role, model, on_token)
+        previous = getattr(self._local, "stats", None)
+        self._local.stats = stats
+        try:
+            yield stats
+        finally:
+            self._local.stats = previous
+            stats.finished = time.monotonic()
+
+    def handler(self) -> "StreamMetricsHandler":
+        return StreamMetricsHandler(self)
+
+    def _start(self, run_id):
+        stats = getattr(self._local, "stats", None)
+        if stats is None:
+            return
+        with self._lock:
+            self._runs[str(run_id)] = stats
+        stats.start_request()
+
+    def _token(self, run_id, token: str):
+        stats = self._runs.get(str(run_id))
+        if stats is not None:
+            stats.token(token)
+
+    def _end(self, run_id, error: bool = False):
+        with self._lock:
+            stats = self._runs.pop(str(run_id), None)
+        if stats is not None:
+            stats.end_request(error)
+
+class StreamMetricsHandler(BaseCallbackHandler):
+    def __init__(self, tracker: LLMStreamTracker):
+        self.tracker = tracker
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self.tracker._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.tracker._start(run_id)
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        self.tracker._token(run_id, token)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self.tracker._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self.tracker._end(run_id, error=True)
+
+class TokenLogStream:
+    def __init__(
+        self,
+        label: str,
+        emit: Callable[[str], None],
+        on_progress: Optional[Callable[[float], None]] = None,
+        max_lines: int = STREAM_LOG_LINES,
+        max_line_length: int = 1000
+    ):
+        self.label = label
+        self.emit = emit
+        self.on_progress = on_progress
+        self.max_lines = max_lines
+        self.max_line_length = max_line_length
+        self.tokens = 0
+        self.forwarded = 0
+        self.dropped = 0
+        self._partial = ""
+        self._truncated = False
+        self._reported = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, token: str):
+        progress = None
+        with self._lock:
+            self.tokens += 1
+            lines = (self._partial + token).split("\n")
+            self._partial = lines.pop()
+            for line in lines:
+                self._emit(line, self._truncated)
+                self._truncated = False
+            if len(self._partial) > self.max_line_length:
+                self._partial, self._truncated = self._partial[:self.max_line_length], True
+            now = time.monotonic()
+            if self.on_progress is not None and now - self._reported >= STREAM_PROGRESS_INTERVAL:
+                self._reported = now
+                progress = 1 - math.exp(-self.tokens / EXPECTED_RESPONSE_TOKENS)
+        if progress is not None:
+            self.on_progress(progress)
+
+    def close(self):
+        with self._lock:
+            if self._partial:
+                self._emit(self._partial, self._truncated)
+                self._partial = ""
+                self._truncated = False
+            if self.dropped:
+                self.emit(f"  [{self.label}] ... {self.dropped} more streamed lines not logged")
+                self.dropped = 0
+
+    def _emit(self, line: str, truncated: bool = False):
+        if not line.strip():
+            return
+        if self.forwarded >= self.max_lines:
+            self.dropped += 1
+            return
+        self.forwarded += 1
+        if truncated or len(line) > self.max_line_length:
+            line = line[:self.max_line_length] + TRUNCATION_MARKER
+        self.emit(f"  [{self.label}] {line}")
+
+def summarize_llm_metrics(records: List[Dict]) -> Dict[str, Dict]:
+    summary: Dict[str, Dict] = {}
+    for record in records:
+        if record["cached"]:
+            continue
+        entry = summary.setdefault(
+            record["model"], {"calls": 0, "tokens": 0, "latency": 0.0, "queue_wait": 0.0, "retries": 0, "coalesced": 0, "ttfts": [], "rates": []}
+        )
+        entry["calls"] += record["calls"]
+        entry["tokens"] += record["tokens"]
+        entry["latency"] += record["latency"]
+        entry["queue_wait"] += record.get("queue_wait", 0.0)
+        entry["retries"] += record.get("retries", 0)
+        entry["coalesced"] += int(record.get("coalesced", False))
+        if record["ttft"] is not None:
+            entry["ttfts"].append(record["ttft"])
+        if record["tokens_per_second"] is not None:
+            entry["rates"].append(record["tokens_per_second"])
+    for entry in summary.values():
+        ttfts, rates = entry.pop("ttfts"), entry.pop("rates")
+        entry["latency"] = round(entry["latency"], 3)
+        entry["queue_wait"] = round(entry["queue_wait"], 3)
+        entry["avg_ttft"] = round(sum(ttfts) / len(ttfts), 3) if ttfts else None
+        entry["avg_tokens_per_second"] = round(sum(rates) / len(rates), 1) if rates else None
+    return summary
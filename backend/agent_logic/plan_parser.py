@@ -0,0 +1,97 @@
+import json
+import re
+import logging
+from typing import Dict, List
+
+from .artifacts import safe_filename
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JSON_BLOCK = re.compile(r"```(?:json)?[ \t]*\n(.*?)\n```", re.DOTALL)
+NAME_SANITIZER = re.compile(r"[^\w.-]+")
+
+FALLBACK_COMPONENT = {"name": "application", "description": "Entire project", "files": [], "depends_on": []}
+
+def _candidates(text: str) -> List[Dict]:
+    found = []
+    for match in JSON_BLOCK.finditer(text):
+        try:
+            data = json.loads(match.group(1))
+        except ValueError:
+            continue
+        if isinstance(data, dict) and isinstance(data.get("components"), list):
+            found.append(data)
+        elif isinstance(data, list) and data and all(isinstance(item, dict) and "name" in item for item in data):
+            found.append({"components": data})
+    return found
+
+def parse_components(text: str) -> List[Dict]:
+    candidates = _candidates(text)
+    if not candidates:
+        return [dict(FALLBACK_COMPONENT)]
+
+    components: List[Dict] = []
+    seen = set()
+    owned = set()
+    for raw in candidates[-1]["components"]:
+        if not isinstance(raw, dict):
+            continue
+        name = NAME_SANITIZER.sub("_", str(raw.get("name", "")).strip()).strip("_")
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        files = []
+        for filename in raw.get("files") or []:
+            filename = safe_filename(str(filename))
+            if filename and filename not in owned:
+                owned.add(filename)
+                files.append(filename)
+        depends_on = raw.get("depends_on") or raw.get("dependencies") or []
+        components.append({
+            "name": name,
+            "description": str(raw.get("description") or raw.get("responsibility") or "").strip(),
+            "files": files,
+            "depends_on": [NAME_SANITIZER.sub("_", str(dep).strip()).strip("_") for dep in depends_on if isinstance(dep, str)],
+        })
+
+    if not components:
+        return [dict(FALLBACK_COMPONENT)]
+    for component in components:
+        component["depends_on"] = [dep for dep in dict.fromkeys(component["depends_on"]) if dep in seen and dep != component["name"]]
+    return order_components(components)
+
+def order_components(components: List[Dict]) -> List[Dict]:
+    by_name = {component["name"]: component for component in components}
+    ordered: List[Dict] = []
+    done = set()
+    while len(ordered) < len(components):
+        ready = [c for c in components if c["name"] not in done and all(dep in done for dep in c["depends_on"])]
+        if not ready:
+            blocked = next(c for c in components if c["name"] not in done)
+            dropped = [dep for dep in blocked["depends_on"] if dep not in done]
+            logger.warning(f"Dependency cycle in plan, scheduling {blocked['name']} without waiting on {', '.join(dropped)}")
+            blocked["depends_on"] = [dep for dep in blocked["depends_on"] if dep in done]
+            continue
+        for component in ready:
+            done.add(component["name"])
+            ordered.append(by_name[component["name"]])
+    return ordered
+
+def critical_path(components: List[Dict], durations: Dict[str, float]) -> Dict:
+    finish: Dict[str, float] = {}
+    previous: Dict[str, str] = {}
+    for component in order_components(components):
+        name = component["name"]
+        start = 0.0
+        for dep in component["depends_on"]:
+            if finish.get(dep, 0.0) > start:
+                start, previous[name] = finish[dep], dep
+        finish[name] = start + durations.get(name, 0.0)
+    if not finish:
+        return {"components": [], "seconds": 0.0}
+    name = max(finish, key=finish.get)
+    path = [name]
+    while path[-1] in previous:
+        path.append(previous[path[-1]])
+    return {"components": path[::-1], "seconds": round(finish[name], 3)}
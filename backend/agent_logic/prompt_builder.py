@@ -0,0 +1,188 @@
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Dict, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROMPT_BUDGETS = {
+    "act": int(os.getenv("PROMPT_BUDGET_ACT", "8000")),
+    "fix": int(os.getenv("PROMPT_BUDGET_FIX", "12000")),
+}
+
+CHARS_PER_TOKEN = 4
+MAX_REPEATS = 3
+MIN_SECTION_TOKENS = 16
+
+PYTEST_HEADER = re.compile(r"^_{3,} (.+?) _{3,}$")
+SECTION_BREAK = re.compile(r"^(?:_{3,}|={3,})")
+ERROR_LINE = re.compile(
+    r"^\s*(?:●\s.+|(?:[A-Z]\w*)?Error\b.*|.*\berror TS\d+:.*|(?:FAILED|ERROR) \S.*|npm ERR! .*|SyntaxError: .*)$"
+)
+STACK_LINE = re.compile(r"^\s+(?:at |\^|~|\||>|\d+ \|)")
+FILE_REFERENCES = (
+    re.compile(r'File "([^"]+)", line (\d+)'),
+    re.compile(r"([\w./-]+\.[A-Za-z]\w*)\((\d+),\d+\)"),
+    re.compile(r"([\w./-]+\.[A-Za-z]\w*):(\d+)"),
+)
+
+@lru_cache(maxsize=32)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    name = model.split("/")[-1]
+    try:
+        return tiktoken.encoding_for_model(name)
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding("o200k_base" if name.startswith(("gpt-4o", "o1", "o3")) else "cl100k_base")
+    except Exception as e:
+        logger.warning(f"Token encoding unavailable for {model}, estimating from length: {str(e)}")
+        return None
+
+def count_tokens(text: str, model: str = "") -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "", head_ratio: float = 0.3) -> str:
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    chars = len(text) * max_tokens // tokens
+    for _ in range(4):
+        head = int(chars * head_ratio)
+        tail = chars - head
+        omitted = len(text) - head - tail
+        candidate = f"{text[:head]}\n... [{omitted} characters omitted] ...\n{text[len(text) - tail:]}"
+        if count_tokens(candidate, model) <= max_tokens:
+            return candidate
+        chars = int(chars * 0.85)
+    return text[:max(chars, 0)]
+
+def dedupe_lines(text: str, max_repeats: int = MAX_REPEATS) -> str:
+    seen: Dict[str, int] = {}
+    lines: List[str] = []
+    previous = None
+    run = 0
+    omitted = 0
+    for line in text.splitlines():
+        key = re.sub(r"\d+", "#", line.strip())
+        if key == previous:
+            run += 1
+            continue
+        if run:
+            lines.append(f"... [previous line repeated {run} more times]")
+            run = 0
+        previous = key
+        seen[key] = seen.get(key, 0) + 1
+        if key and seen[key] > max_repeats:
+            omitted += 1
+            continue
+        lines.append(line)
+    if run:
+        lines.append(f"... [previous line repeated {run} more times]")
+    if omitted:
+        lines.append(f"... [{omitted} repeated lines omitted]")
+    return "\n".join(lines)
+
+def extract_failures(output: str, max_sections: int = 20) -> List[str]:
+    lines = output.splitlines()
+    sections: List[str] = []
+    i = 0
+    while i < len(lines) and len(sections) < max_sections:
+        line = lines[i]
+        if line.startswith("Traceback (most recent call last)"):
+            j = i + 1
+            while j < len(lines) and (lines[j].startswith((" ", "\t")) or not lines[j].strip()):
+                j += 1
+            end = min(j + 1, len(lines))
+        elif PYTEST_HEADER.match(line) and "test session starts" not in line and "short test summary" not in line:
+            j = i + 1
+            while j < len(lines) and not SECTION_BREAK.match(lines[j]):
+                j += 1
+            end = j
+        elif ERROR_LINE.match(line):
+            j = i + 1
+            while j < len(lines) and j - i < 15 and STACK_LINE.match(lines[j]):
+                j += 1
+            end = j
+        else:
+            i += 1
+            continue
+        section = "\n".join(lines[i:end]).strip()
+        if section and section not in sections:
+            sections.append(section)
+        i = max(end, i + 1)
+    return sections
+
+def referenced_files(text: str, files: Dict[str, str]) -> List[str]:
+    referenced: List[str] = []
+    for pattern in FILE_REFERENCES:
+        for match in pattern.finditer(text):
+            path = match.group(1).lstrip("./")
+            for name in files:
+                if name not in referenced and (path == name or path.endswith("/" + name)):
+                    referenced.append(name)
+    return referenced
+
+class PromptBuilder:
+    def __init__(self, model: str, budget: int):
+        self.model = model
+        self.budget = budget
+        self._sections: List[Dict] = []
+        self.stats: Dict = {}
+
+    def add(self, name: str, text: str, priority: int = 0, required: bool = False):
+        if text:
+            self._sections.append({"name": name, "text": text, "priority": priority, "required": required})
+
+    def build(self) -> str:
+        for section in self._sections:
+            section["tokens"] = count_tokens(section["text"], self.model)
+
+        remaining = self.budget - sum(s["tokens"] for s in self._sections if s["required"])
+        allowed: Dict[int, int] = {}
+        optional = sorted(
+            (index for index, s in enumerate(self._sections) if not s["required"]),
+            key=lambda index: -self._sections[index]["priority"]
+        )
+        for index in optional:
+            allowed[index] = max(0, min(self._sections[index]["tokens"], remaining))
+            remaining -= allowed[index]
+
+        parts = []
+        sections = {}
+        truncated = []
+        for index, section in enumerate(self._sections):
+            text = section["text"]
+            if not section["required"] and allowed[index] < section["tokens"]:
+                text = truncate_tokens(text, allowed[index], self.model) if allowed[index] >= MIN_SECTION_TOKENS else ""
+                truncated.append(section["name"])
+            if text:
+                parts.append(text)
+            sections[section["name"]] = {
+                "tokens": section["tokens"] if text is section["text"] else count_tokens(text, self.model),
+                "original_tokens": section["tokens"],
+            }
+
+        prompt = "\n\n".join(parts)
+        self.stats = {
+            "model": self.model,
+            "budget": self.budget,
+            "tokens": count_tokens(prompt, self.model),
+            "original_tokens": sum(s["tokens"] for s in self._sections),
+            "sections": sections,
+            "truncated": truncated,
+        }
+        return prompt
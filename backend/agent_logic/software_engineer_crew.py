@@ -1,41 +1,87 @@
 from crewai import Agent, Task, Crew
 from langchain_openai import ChatOpenAI
-from tools.sandbox_executor import SandboxExecutor
-from tools.code_analyzer import CodeAnalyzer
+from .tools.executor_backend import ExecutorBackend, create_sandbox_executor
+from .tools.code_analyzer import get_code_analyzer
+from .tools.test_results import NO_TESTS_EXIT_CODE
+from .tools.telemetry import LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_TOKENS, LLM_TTFT_SECONDS, PHASE_SECONDS, span, traced
+from .llm_cache import get_llm_cache
+from .errors import TaskCancelledError
+from .artifacts import FencedFileParser, parse_artifacts, parse_named_files, build_artifacts, render_files
+from .prompt_builder import PROMPT_BUDGETS, PromptBuilder, count_tokens, dedupe_lines, extract_failures, referenced_files
+from .llm_streaming import LLM_STREAMING_ENABLED, LLMStreamTracker, TokenLogStream, summarize_llm_metrics
+from .llm_gateway import LLM_GATEWAY_ENABLED, gateway_call
+from .plan_parser import critical_path, parse_components
+from .test_impact import select_tests
+import contextvars
+import os
+import re
+import time
 import logging
-from typing import Optional, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Optional, Dict, List, Tuple
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+OPENROUTER_API_BASE = os.getenv("OPENROUTER_API_BASE", "https://openrouter.ai/api/v1")
+
+DEFAULT_MODELS = {
+    "architect": {"model": "openai/gpt-4o", "temperature": 0.3},
+    "coder": {"model": "mistral/codestral-22b", "temperature": 0.2},
+    "debugger": {"model": "anthropic/claude-3-5-sonnet", "temperature": 0.2},
+}
+
+DEFAULT_FIX_LOOP = {
+    "max_iterations": int(os.getenv("FIX_MAX_ITERATIONS", "3")),
+    "candidates": int(os.getenv("FIX_CANDIDATES", "1")),
+    "time_budget": float(os.getenv("FIX_TIME_BUDGET", "0")) or None,
+    "token_budget": int(os.getenv("FIX_TOKEN_BUDGET", "0")) or None,
+    "select_tests": os.getenv("FIX_SELECT_TESTS", "true").lower() in ("1", "true", "yes"),
+    "final_full_run": os.getenv("FIX_FINAL_FULL_RUN", "true").lower() in ("1", "true", "yes"),
+}
+
+SYNTAX_GATE_ENABLED = os.getenv("SANDBOX_SYNTAX_GATE", "true").lower() in ("1", "true", "yes")
+PIPELINE_ENABLED = os.getenv("TASK_PIPELINE", "true").lower() in ("1", "true", "yes")
+ACT_CONCURRENCY = int(os.getenv("ACT_COMPONENT_CONCURRENCY", "4"))
+
 class SoftwareEngineerCrew:
-    def __init__(self, openrouter_api_key: str):
+    def __init__(
+        self,
+        openrouter_api_key: str,
+        sandbox_executor: Optional[ExecutorBackend] = None,
+        http_client=None,
+        models: Optional[Dict] = None
+    ):
         self.openrouter_api_key = openrouter_api_key
-        self.sandbox_executor = SandboxExecutor()
-        self.code_analyzer = CodeAnalyzer()
+        self.sandbox_executor = sandbox_executor or create_sandbox_executor()
+        self.code_analyzer = get_code_analyzer()
+        self.llm_cache = get_llm_cache()
+        self.http_client = http_client
+        self.models = models or DEFAULT_MODELS
+        self.stream_tracker = LLMStreamTracker()
+        self.llm_metrics: List[Dict] = []
+        self.sandbox_backend: Optional[str] = None
+        self._metrics_lock = threading.Lock()
         self.setup_llm_clients()
         self.setup_agents()
     
     def setup_llm_clients(self):
-        self.architect_llm = ChatOpenAI(
-            model="openai/gpt-4o",
-            openai_api_key=self.openrouter_api_key,
-            openai_api_base="https://openrouter.ai/api/v1",
-            temperature=0.3,
-        )
-        
-        self.coder_llm = ChatOpenAI(
-            model="mistral/codestral-22b",
-            openai_api_key=self.openrouter_api_key,
-            openai_api_base="https://openrouter.ai/api/v1",
-            temperature=0.2,
-        )
-        
-        self.debugger_llm = ChatOpenAI(
-            model="anthropic/claude-3-5-sonnet",
+        self.architect_llm = self._build_llm("architect")
+        self.coder_llm = self._build_llm("coder")
+        self.debugger_llm = self._build_llm("debugger")
+    
+    def _build_llm(self, role: str) -> ChatOpenAI:
+        config = self.models[role]
+        return ChatOpenAI(
+            model=config["model"],
             openai_api_key=self.openrouter_api_key,
-            openai_api_base="https://openrouter.ai/api/v1",
-            temperature=0.2,
+            openai_api_base=OPENROUTER_API_BASE,
+            temperature=config["temperature"],
+            http_client=self.http_client,
+            streaming=LLM_STREAMING_ENABLED,
+            callbacks=[self.stream_tracker.handler()],
+            max_retries=0 if LLM_GATEWAY_ENABLED and self.http_client is not None else 2,
         )
     
     def setup_agents(self):
@@ -47,15 +93,21 @@ class SoftwareEngineerCrew:
             verbose=True
         )
         
-        self.coder = Agent(
+        self.coder = self._build_coder()
+        
+        self.debugger = self._build_debugger()
+    
+    def _build_coder(self) -> Agent:
+        return Agent(
             role="Lead Developer",
             goal="Generate production-ready code that implements architectural designs",
             backstory="Senior software engineer with expertise in multiple programming languages and frameworks",
             llm=self.coder_llm,
             verbose=True
         )
-        
-        self.debugger = Agent(
+    
+    def _build_debugger(self) -> Agent:
+        return Agent(
             role="QA & Debugging Specialist",
             goal="Identify bugs, analyze test failures, and generate fixes",
             backstory="Expert debugger with deep knowledge of error patterns and testing strategies",
@@ -69,58 +121,80 @@ class SoftwareEngineerCrew:
         task_description: str,
         target_language: str,
         target_framework: Optional[str],
-        task_status: Dict
+        task_store,
+        cancel_event: Optional[threading.Event] = None,
+        use_cache: bool = True,
+        fix_loop: Optional[Dict] = None,
+        sandbox_backend: Optional[str] = None
     ) -> Dict:
         try:
-            logs = task_status[task_id]["logs"]
+            logs = task_store.logs(task_id)
+            self.llm_metrics = []
+            self.sandbox_backend = sandbox_backend
+            if sandbox_backend:
+                self.sandbox_executor.assign(task_id, sandbox_backend)
+                logs.append(f"Using {sandbox_backend} sandbox")
+            on_file = None
+            if PIPELINE_ENABLED:
+                self.sandbox_executor.prepare(task_id, target_language)
+                logs.append("Sandbox warm-up started in background")
+                on_file = lambda name, content: self.sandbox_executor.stage_file(task_id, target_language, name, content)
             
+            self._check_cancelled(cancel_event)
             logs.append(f"[PHASE 1: PLANNING] Architect analyzing task...")
-            task_status[task_id]["phase"] = "planning"
-            task_status[task_id]["progress"] = 15
+            task_store.update(task_id, phase="planning", progress=15)
             
-            plan = self._phase_plan(task_description, target_language, target_framework)
+            stream = self._token_stream("architect", task_id, task_store, logs, (15, 40))
+            try:
+                plan = self._phase_plan(task_description, target_language, target_framework, use_cache, stream)
+            finally:
+                stream.close()
             logs.append(f"✓ Plan created: {len(plan.get('components', []))} components identified")
+            if PIPELINE_ENABLED and plan.get("dependency_files"):
+                self.sandbox_executor.prepare(task_id, target_language, plan["dependency_files"])
+                logs.append(f"Restoring sandbox dependencies from plan: {', '.join(plan['dependency_files'])}")
             
+            self._check_cancelled(cancel_event)
             logs.append(f"[PHASE 2: ACTING] Coder generating implementation...")
-            task_status[task_id]["phase"] = "coding"
-            task_status[task_id]["progress"] = 40
+            task_store.update(task_id, phase="coding", progress=40)
             
-            code_artifacts = self._phase_act(plan, target_language, target_framework)
-            logs.append(f"✓ Code generated: {len(code_artifacts)} files created")
+            stream = self._token_stream("coder", task_id, task_store, logs, (40, 65))
+            try:
+                code_artifacts = self._phase_act(plan, target_language, target_framework, use_cache, on_file, stream, logs)
+            finally:
+                stream.close()
+            logs.append(f"✓ Code generated: {len(code_artifacts['files'])} files created")
             
+            self._check_cancelled(cancel_event)
             logs.append(f"[PHASE 3: OBSERVING] Executing code in sandbox...")
-            task_status[task_id]["phase"] = "testing"
-            task_status[task_id]["progress"] = 65
+            task_store.update(task_id, phase="testing", progress=65)
             
             execution_results = self._phase_observe(code_artifacts, target_language, task_id, logs)
             logs.append(f"✓ Execution complete. Status: {execution_results.get('status', 'unknown')}")
             
             if execution_results.get("status") == "success":
-                task_status[task_id]["phase"] = "complete"
-                task_status[task_id]["progress"] = 100
+                task_store.update(task_id, phase="complete", progress=100)
                 return {
                     "status": "success",
                     "plan": plan,
                     "code": code_artifacts,
-                    "execution": execution_results
+                    "execution": execution_results,
+                    "llm_metrics": self._llm_report()
                 }
             
-            logs.append(f"[PHASE 4: FIXING] Debugger analyzing failures...")
-            task_status[task_id]["phase"] = "debugging"
-            task_status[task_id]["progress"] = 80
-            
-            fixes = self._phase_fix(
+            fixes, retest_results, iterations = self._fix_loop(
                 execution_results,
                 code_artifacts,
                 plan,
                 target_language,
-                logs
+                task_id,
+                task_store,
+                logs,
+                use_cache,
+                cancel_event,
+                {**DEFAULT_FIX_LOOP, **(fix_loop or {})}
             )
-            
-            logs.append(f"✓ Fixes generated. Retesting...")
-            
-            retest_results = self._phase_observe(fixes, target_language, task_id, logs)
-            task_status[task_id]["progress"] = 100
+            task_store.update(task_id, progress=100)
             
             return {
                 "status": retest_results.get("status", "completed_with_fixes"),
@@ -128,14 +202,262 @@ class SoftwareEngineerCrew:
                 "initial_code": code_artifacts,
                 "fixed_code": fixes,
                 "initial_execution": execution_results,
-                "final_execution": retest_results
+                "final_execution": retest_results,
+                "fix_iterations": iterations,
+                "llm_metrics": self._llm_report()
             }
         
+        except TaskCancelledError:
+            logger.info(f"[{task_id}] Execution cancelled")
+            raise
         except Exception as e:
             logger.error(f"[{task_id}] Execution error: {str(e)}")
             raise
+        finally:
+            self.sandbox_executor.release(task_id)
+    
+    def _fix_loop(
+        self,
+        execution_results: Dict,
+        code_artifacts: Dict,
+        plan: Dict,
+        target_language: str,
+        task_id: str,
+        task_store,
+        logs,
+        use_cache: bool,
+        cancel_event: Optional[threading.Event],
+        config: Dict
+    ) -> Tuple[Dict, Dict, List[Dict]]:
+        max_iterations = max(1, config["max_iterations"])
+        candidates = max(1, config["candidates"])
+        deadline = time.monotonic() + config["time_budget"] if config["time_budget"] else None
+        token_budget = config["token_budget"]
+        
+        tokens_used = 0
+        iterations: List[Dict] = []
+        fixes, retest_results = code_artifacts, execution_results
+        
+        for iteration in range(1, max_iterations + 1):
+            self._check_cancelled(cancel_event)
+            if deadline is not None and time.monotonic() >= deadline:
+                logs.append(f"Fix loop time budget of {config['time_budget']}s exhausted")
+                break
+            if token_budget is not None and tokens_used >= token_budget:
+                logs.append(f"Fix loop token budget of {token_budget} exhausted")
+                break
+            
+            logs.append(f"[PHASE 4: FIXING] Iteration {iteration}/{max_iterations}: Debugger analyzing failures...")
+            task_store.update(task_id, phase="debugging", progress=80 + (15 * (iteration - 1)) // max_iterations)
+            
+            started = time.monotonic()
+            attempts = self._run_fix_candidates(
+                retest_results,
+                fixes,
+                plan,
+                target_language,
+                task_id,
+                logs,
+                use_cache,
+                candidates,
+                config
+            )
+            winner = next((a for a in attempts if a["execution"] and a["execution"].get("status") == "success"), None)
+            winner = winner or next((a for a in attempts if a["execution"]), attempts[0])
+            fixes, retest_results = winner["fixes"], winner["execution"] or retest_results
+            tokens_used += sum(a["tokens"] for a in attempts)
+            
+            iterations.append({
+                "iteration": iteration,
+                "status": retest_results.get("status"),
+                "exit_code": retest_results.get("exit_code"),
+                "winning_candidate": winner["variant"],
+                "candidates": [
+                    {
+                        "variant": a["variant"],
+                        "status": a["execution"].get("status") if a["execution"] else "cancelled",
+                        "exit_code": a["execution"].get("exit_code") if a["execution"] else None,
+                        "prompt_tokens": a["fixes"]["prompt"]["tokens"],
+                    }
+                    for a in attempts
+                ],
+                "duration": round(time.monotonic() - started, 3),
+                "estimated_tokens": sum(a["tokens"] for a in attempts)
+            })
+            
+            if retest_results.get("status") == "success":
+                logs.append(f"✓ Fix iteration {iteration} passed")
+                break
+            logs.append(f"✗ Fix iteration {iteration} still failing")
+        
+        return fixes, retest_results, iterations
+    
+    def _run_fix_candidates(
+        self,
+        execution_results: Dict,
+        code_artifacts: Dict,
+        plan: Dict,
+        target_language: str,
+        task_id: str,
+        logs,
+        use_cache: bool,
+        candidates: int,
+        config: Optional[Dict] = None
+    ) -> List[Dict]:
+        config = config or DEFAULT_FIX_LOOP
+        stop_event = threading.Event()
+        
+        def run_candidate(variant: int) -> Dict:
+            stream = self._token_stream("debugger" if candidates == 1 else f"debugger#{variant + 1}", task_id, None, logs)
+            try:
+                fixes = self._phase_fix(
+                    execution_results,
+                    code_artifacts,
+                    plan,
+                    target_language,
+                    logs,
+                    use_cache,
+                    variant,
+                    stream
+                )
+            finally:
+                stream.close()
+            tokens = fixes["prompt"]["tokens"] + count_tokens(fixes.get("fixes_applied", ""), self.models["debugger"]["model"])
+            if stop_event.is_set():
+                return {"variant": variant, "fixes": fixes, "execution": None, "tokens": tokens}
+            logs.append(f"✓ Fix candidate {variant + 1} generated. Retesting...")
+            if candidates == 1:
+                execution = self._phase_retest(execution_results, code_artifacts, fixes, target_language, task_id, logs, config)
+            else:
+                sandbox_id = f"{task_id}-c{variant}"
+                if self.sandbox_backend:
+                    self.sandbox_executor.assign(sandbox_id, self.sandbox_backend)
+                try:
+                    execution = self._phase_retest(
+                        execution_results, code_artifacts, fixes, target_language, sandbox_id, logs, config, stop_event
+                    )
+                finally:
+                    self.sandbox_executor.release(sandbox_id)
+                if execution.get("status") == "cancelled":
+                    logs.append(f"Fix candidate {variant + 1} stopped, another candidate passed")
+                    execution = None
+            return {"variant": variant, "fixes": fixes, "execution": execution, "tokens": tokens}
+        
+        if candidates == 1:
+            return [run_candidate(0)]
+        
+        attempts = []
+        executor = ThreadPoolExecutor(max_workers=candidates, thread_name_prefix=f"fix-{task_id[:8]}")
+        try:
+            pending = {executor.submit(contextvars.copy_context().run, run_candidate, variant) for variant in range(candidates)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        attempt = future.result()
+                    except Exception as e:
+                        logger.warning(f"[{task_id}] Fix candidate failed: {str(e)}")
+                        continue
+                    attempts.append(attempt)
+                    if attempt["execution"] and attempt["execution"].get("status") == "success":
+                        stop_event.set()
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        if not attempts:
+            raise RuntimeError("All fix candidates failed")
+        return attempts
+    
+    def _check_cancelled(self, cancel_event: Optional[threading.Event]):
+        if cancel_event is not None and cancel_event.is_set():
+            raise TaskCancelledError("Task was cancelled")
+    
+    def _token_stream(self, label: str, task_id: str, task_store, logs, progress_range: Optional[Tuple[int, int]] = None) -> TokenLogStream:
+        on_progress = None
+        if progress_range is not None:
+            low, high = progress_range
+            on_progress = lambda fraction: task_store.update(task_id, progress=low + int((high - low) * fraction))
+        return TokenLogStream(label, logs.append, on_progress)
+    
+    def _llm_report(self) -> Dict:
+        with self._metrics_lock:
+            phases = list(self.llm_metrics)
+        return {"phases": phases, "models": summarize_llm_metrics(phases)}
+    
+    def _kickoff(
+        self,
+        agent: Agent,
+        llm: ChatOpenAI,
+        task: Task,
+        use_cache: bool = True,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        phase: str = ""
+    ) -> str:
+        model = getattr(llm, "model_name", "")
+        key = None
+        cached = None
+        if use_cache and self.llm_cache is not None:
+            key = self.llm_cache.make_key(
+                model,
+                getattr(llm, "temperature", None),
+                agent.role,
+                task.description
+            )
+            cached = self.llm_cache.get(key)
+        
+        phase = phase or agent.role
+        phase_label = re.split(r"[#:]", phase)[0]
+        with self.stream_tracker.track(phase, agent.role, model, on_chunk) as stats, span("llm.call", model=model, phase=phase) as call, \
+                gateway_call() as gateway:
+            if cached is not None:
+                logger.info(f"LLM cache hit for {agent.role}")
+                stats.cached = True
+                result = cached
+            else:
+                crew = Crew(
+                    agents=[agent],
+                    tasks=[task],
+                    verbose=True
+                )
+                try:
+                    result = str(crew.kickoff())
+                except Exception:
+                    LLM_REQUESTS.inc(model=model, phase=phase_label, status="error")
+                    LLM_REQUEST_SECONDS.observe(time.monotonic() - stats.started, model=model, phase=phase_label, status="error")
+                    raise
+            if on_chunk is not None and stats.tokens == 0:
+                on_chunk(result)
+            metrics = dict(stats.as_dict(), **gateway.as_dict())
+            call.set(cached=stats.cached, tokens=stats.tokens, ttft=metrics["ttft"], queue_wait=metrics["queue_wait"])
+        
+        with self._metrics_lock:
+            self.llm_metrics.append(metrics)
+        LLM_REQUESTS.inc(model=model, phase=phase_label, status="cached" if stats.cached else "ok")
+        if not stats.cached:
+            LLM_REQUEST_SECONDS.observe(metrics["latency"], model=model, phase=phase_label, status="ok")
+            LLM_TOKENS.inc(stats.tokens, model=model)
+            if metrics["ttft"] is not None:
+                LLM_TTFT_SECONDS.observe(metrics["ttft"], model=model)
+            logger.info(
+                f"LLM {metrics['phase']} ({model}): ttft={metrics['ttft']}s "
+                f"tokens={metrics['tokens']} rate={metrics['tokens_per_second']}/s latency={metrics['latency']}s "
+                f"queue_wait={metrics['queue_wait']}s retries={metrics['retries']}"
+            )
+        
+        if key is not None and cached is None:
+            self.llm_cache.set(key, result)
+        return result
     
-    def _phase_plan(self, task_description: str, target_language: str, target_framework: Optional[str]) -> Dict:
+    @traced("phase.plan", PHASE_SECONDS, phase="plan")
+    def _phase_plan(
+        self,
+        task_description: str,
+        target_language: str,
+        target_framework: Optional[str],
+        use_cache: bool = True,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Dict:
         planning_prompt = f"""
         Task: {task_description}
         Target Language: {target_language}
@@ -148,7 +470,16 @@ class SoftwareEngineerCrew:
         4. Testing strategy
         5. Potential edge cases
         
-        Return a structured plan.
+        Return a structured plan. If the project needs third-party packages, include the
+        dependency manifest (requirements.txt or package.json) as a fenced code block with
+        its filename on the line above it.
+        
+        End with a fenced ```json block listing the components that will be implemented
+        separately, in the form
+        {{"components": [{{"name": "storage", "description": "...", "files": ["storage.py"], "depends_on": []}}]}}
+        Assign every project file, including tests and the dependency manifest, to exactly
+        one component, and list in depends_on the components whose code it imports.
+        Keep components independent where possible so they can be written in parallel.
         """
         
         planning_task = Task(
@@ -157,38 +488,48 @@ class SoftwareEngineerCrew:
             expected_output="Detailed architecture and implementation plan"
         )
         
-        crew = Crew(
-            agents=[self.architect],
-            tasks=[planning_task],
-            verbose=True
-        )
-        
-        result = crew.kickoff()
+        result = self._kickoff(self.architect, self.architect_llm, planning_task, use_cache, on_token, "plan")
         
         return {
-            "components": ["component_1", "component_2"],
+            "components": parse_components(str(result)),
             "plan_text": str(result),
+            "dependency_files": self.sandbox_executor.dependency_files(target_language, parse_named_files(str(result))),
             "target_language": target_language,
             "framework": target_framework
         }
     
-    def _phase_act(self, plan: Dict, target_language: str, target_framework: Optional[str]) -> Dict:
-        coding_prompt = f"""
-        Based on this architecture plan:
-        {plan.get('plan_text', '')}
+    @traced("phase.act", PHASE_SECONDS, phase="act")
+    def _phase_act(
+        self,
+        plan: Dict,
+        target_language: str,
+        target_framework: Optional[str],
+        use_cache: bool = True,
+        on_file: Optional[Callable[[str, str], None]] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        logs: Optional[list] = None
+    ) -> Dict:
+        components = plan.get("components") or []
+        if len(components) > 1 and ACT_CONCURRENCY > 0:
+            return self._generate_components(plan, components, target_language, target_framework, use_cache, on_file, logs)
         
+        builder = PromptBuilder(self.models["coder"]["model"], PROMPT_BUDGETS["act"])
+        builder.add("plan", f"Based on this architecture plan:\n{dedupe_lines(plan.get('plan_text', ''))}", priority=1)
+        builder.add("instructions", f"""
         Target Language: {target_language}
         Framework: {target_framework or 'None'}
         
         Generate production-ready code that:
         1. Implements all components from the plan
         2. Includes proper error handling
-        3. Includes unit tests
+        3. Includes unit tests (for Python: pytest tests in tests.py or test_*.py files)
         4. Follows best practices for {target_language}
         5. Is well-documented with comments
         
-        Provide the complete code with filenames.
-        """
+        Provide the complete code with filenames. Put each file in its own fenced
+        code block and write the file's relative path on the line just above the block.
+        """, required=True)
+        coding_prompt = builder.build()
         
         coding_task = Task(
             description=coding_prompt,
@@ -196,24 +537,230 @@ class SoftwareEngineerCrew:
             expected_output="Complete, production-ready source code"
         )
         
-        crew = Crew(
-            agents=[self.coder],
-            tasks=[coding_task],
-            verbose=True
+        on_chunk, parser = self._file_stream(on_file, on_token)
+        result = self._kickoff(self.coder, self.coder_llm, coding_task, use_cache, on_chunk, "act")
+        if parser is not None:
+            for name, content in parser.close():
+                on_file(name, content)
+        
+        code_artifacts = build_artifacts(parse_artifacts(result, target_language), target_language)
+        code_artifacts["prompt"] = builder.stats
+        return code_artifacts
+    
+    def _file_stream(
+        self,
+        on_file: Optional[Callable[[str, str], None]],
+        on_token: Optional[Callable[[str], None]]
+    ) -> Tuple[Optional[Callable[[str], None]], Optional[FencedFileParser]]:
+        if on_file is None:
+            return on_token, None
+        parser = FencedFileParser()
+        
+        def on_chunk(chunk: str):
+            if on_token is not None:
+                on_token(chunk)
+            for name, content in parser.feed(chunk):
+                on_file(name, content)
+        
+        return on_chunk, parser
+    
+    def _generate_components(
+        self,
+        plan: Dict,
+        components: List[Dict],
+        target_language: str,
+        target_framework: Optional[str],
+        use_cache: bool,
+        on_file: Optional[Callable[[str, str], None]],
+        logs: Optional[list]
+    ) -> Dict:
+        started = time.monotonic()
+        outputs: Dict[str, Dict] = {}
+        pending = {component["name"]: component for component in components}
+        running = {}
+        executor = ThreadPoolExecutor(max_workers=min(ACT_CONCURRENCY, len(components)), thread_name_prefix="act")
+        try:
+            while pending or running:
+                for name in [n for n, c in pending.items() if all(dep in outputs for dep in c["depends_on"])]:
+                    component = pending.pop(name)
+                    dependency_files = {}
+                    for dep in component["depends_on"]:
+                        dependency_files.update(outputs[dep]["files"])
+                    future = executor.submit(
+                        contextvars.copy_context().run,
+                        self._generate_component,
+                        plan,
+                        component,
+                        components,
+                        dependency_files,
+                        target_language,
+                        target_framework,
+                        use_cache,
+                        on_file,
+                        logs
+                    )
+                    running[future] = name
+                if not running:
+                    raise RuntimeError(f"Components with unresolvable dependencies: {', '.join(pending)}")
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    outputs[name] = future.result()
+                    if logs is not None:
+                        logs.append(f"✓ Component {name} generated: {len(outputs[name]['files'])} files ({len(outputs)}/{len(components)})")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        owners: Dict[str, str] = {}
+        for component in components:
+            for filename in component["files"]:
+                owners.setdefault(filename, component["name"])
+        files: Dict[str, str] = {}
+        for component in components:
+            for filename, content in outputs[component["name"]]["files"].items():
+                if owners.get(filename, component["name"]) == component["name"] or filename not in files:
+                    files[filename] = content
+        
+        durations = {name: output["duration"] for name, output in outputs.items()}
+        code_artifacts = build_artifacts(files, target_language)
+        code_artifacts["prompt"] = {
+            "tokens": sum(output["prompt"]["tokens"] for output in outputs.values()),
+            "components": {name: output["prompt"] for name, output in outputs.items()},
+        }
+        code_artifacts["generation"] = {
+            "components": [
+                {
+                    "name": c["name"],
+                    "depends_on": c["depends_on"],
+                    "files": sorted(outputs[c["name"]]["files"]),
+                    "duration": round(durations[c["name"]], 3),
+                }
+                for c in components
+            ],
+            "concurrency": ACT_CONCURRENCY,
+            "wall_seconds": round(time.monotonic() - started, 3),
+            "serial_seconds": round(sum(durations.values()), 3),
+            "critical_path": critical_path(components, durations),
+        }
+        return code_artifacts
+    
+    def _generate_component(
+        self,
+        plan: Dict,
+        component: Dict,
+        components: List[Dict],
+        dependency_files: Dict[str, str],
+        target_language: str,
+        target_framework: Optional[str],
+        use_cache: bool,
+        on_file: Optional[Callable[[str, str], None]],
+        logs: Optional[list]
+    ) -> Dict:
+        started = time.monotonic()
+        others = "\n".join(
+            f"        - {c['name']}: {', '.join(c['files']) or 'files not listed'}"
+            for c in components if c["name"] != component["name"]
+        )
+        builder = PromptBuilder(self.models["coder"]["model"], PROMPT_BUDGETS["act"])
+        builder.add("plan", f"Overall architecture plan:\n{dedupe_lines(plan.get('plan_text', ''))}", priority=1)
+        if dependency_files:
+            builder.add("dependencies", f"Components this one depends on, already implemented:\n{render_files(dependency_files)}", priority=2)
+        builder.add("instructions", f"""
+        Target Language: {target_language}
+        Framework: {target_framework or 'None'}
+        
+        Implement only the `{component['name']}` component: {component['description'] or 'see the plan'}
+        Write exactly these files: {', '.join(component['files']) or 'the files this component needs'}
+        
+        Other components are written separately and own these files:
+{others}
+        Import from those files instead of re-implementing them.
+        
+        Generate production-ready code with proper error handling that follows best
+        practices for {target_language} and is well-documented with comments.
+        
+        Put each file in its own fenced code block and write the file's relative path
+        on the line just above the block.
+        """, required=True)
+        prompt = builder.build()
+        
+        coder = self._build_coder()
+        coding_task = Task(
+            description=prompt,
+            agent=coder,
+            expected_output=f"Complete source code for the {component['name']} component"
         )
         
-        result = crew.kickoff()
+        stream = TokenLogStream(f"coder:{component['name']}", logs.append) if logs is not None else None
+        on_chunk, parser = self._file_stream(on_file, stream)
+        try:
+            result = self._kickoff(coder, self.coder_llm, coding_task, use_cache, on_chunk, f"act:{component['name']}")
+        finally:
+            if stream is not None:
+                stream.close()
+        if parser is not None:
+            for name, content in parser.close():
+                on_file(name, content)
         
         return {
-            "files": {
-                "main.py": str(result),
-                "tests.py": "# Test suite will be generated"
-            },
-            "language": target_language,
-            "code_text": str(result)
+            "files": parse_artifacts(result, target_language),
+            "prompt": builder.stats,
+            "duration": time.monotonic() - started,
+        }
+    
+    def _phase_retest(
+        self,
+        execution_results: Dict,
+        code_artifacts: Dict,
+        fixes: Dict,
+        target_language: str,
+        task_id: str,
+        logs: list,
+        config: Dict,
+        stop_event: Optional[threading.Event] = None
+    ) -> Dict:
+        selection = None
+        if config.get("select_tests"):
+            selection = select_tests(
+                execution_results.get("tests"),
+                code_artifacts.get("files", {}),
+                fixes.get("files", {}),
+                target_language
+            )
+        if selection is None:
+            return self._phase_observe(fixes, target_language, task_id, logs, cancel_event=stop_event)
+        
+        logs.append(f"Re-running {len(selection['tests'])} of {selection['total']} tests "
+                    f"({selection['failing']} previously failing, {selection['affected']} affected by the fix)")
+        subset = self._phase_observe(fixes, target_language, task_id, logs, selection["tests"], stop_event)
+        if subset.get("status") != "success" or not config.get("final_full_run"):
+            return subset
+        
+        logs.append("Selected tests passed, running the full suite...")
+        execution = self._phase_observe(fixes, target_language, task_id, logs, cancel_event=stop_event)
+        execution["selected_run"] = {
+            "tests": selection["tests"],
+            "status": subset["status"],
+            "summary": {k: v for k, v in (subset.get("tests") or {}).items() if k != "outcomes"},
         }
+        return execution
     
-    def _phase_observe(self, code_artifacts: Dict, target_language: str, task_id: str, logs: list) -> Dict:
+    @traced("phase.observe", PHASE_SECONDS, phase="observe")
+    def _phase_observe(
+        self,
+        code_artifacts: Dict,
+        target_language: str,
+        task_id: str,
+        logs: list,
+        tests: Optional[List[str]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict:
+        if SYNTAX_GATE_ENABLED:
+            syntax_errors = self.code_analyzer.check_syntax(code_artifacts.get("files", {}))
+            if syntax_errors:
+                return self._syntax_failure(syntax_errors, task_id, logs)
+        
         logger.info(f"[{task_id}] Executing code in sandbox...")
         logs.append(f"Sandbox execution started for {target_language}...")
         
@@ -221,60 +768,120 @@ class SoftwareEngineerCrew:
             code_artifacts=code_artifacts,
             language=target_language,
             timeout=60,
-            task_id=task_id
+            task_id=task_id,
+            keep_workspace=True,
+            on_output=lambda stream, line: logs.append(f"  [{stream}] {line}"),
+            tests=tests,
+            cancel_event=cancel_event
         )
         
-        if execution_result.get("exit_code") == 0:
+        output = {
+            "stdout": execution_result.get("stdout", ""),
+            "stderr": execution_result.get("stderr", ""),
+            "timed_out": execution_result.get("timed_out", False)
+        }
+        for key in ("stdout_truncated_bytes", "stderr_truncated_bytes", "prepare_seconds", "prepare_wait_seconds", "backend", "tests"):
+            if key in execution_result:
+                output[key] = execution_result[key]
+        if tests:
+            output["selected_tests"] = list(tests)
+        
+        if execution_result.get("status") == "cancelled":
+            return {"status": "cancelled", "exit_code": execution_result.get("exit_code", 1), "error": "Execution cancelled", **output}
+        if execution_result.get("exit_code") == 0 and not output["timed_out"]:
             logs.append("✓ All tests passed!")
+            return {"status": "success", "exit_code": 0, **output}
+        if target_language == "python" and execution_result.get("exit_code") == NO_TESTS_EXIT_CODE and not output["timed_out"]:
+            logs.append("✗ No tests were collected")
             return {
-                "status": "success",
-                "stdout": execution_result.get("stdout", ""),
-                "stderr": execution_result.get("stderr", ""),
-                "exit_code": 0
+                "status": "no_tests",
+                "exit_code": NO_TESTS_EXIT_CODE,
+                "error": "No tests were collected; add pytest tests in tests.py, test_*.py or *_test.py",
+                **output
             }
         else:
             logs.append(f"✗ Execution failed with exit code {execution_result.get('exit_code')}")
-            logs.append(f"Error output: {execution_result.get('stderr', '')}")
+            logs.append(f"Error: {execution_result.get('error', 'Unknown error')}")
             return {
                 "status": "failed",
-                "stdout": execution_result.get("stdout", ""),
-                "stderr": execution_result.get("stderr", ""),
                 "exit_code": execution_result.get("exit_code", 1),
-                "error": execution_result.get("error", "Unknown error")
+                "error": execution_result.get("error", "Unknown error"),
+                **output
             }
     
-    def _phase_fix(self, execution_results: Dict, code_artifacts: Dict, plan: Dict, target_language: str, logs: list) -> Dict:
-        error_context = f"""
-        Previous execution failed with:
-        STDOUT: {execution_results.get('stdout', '')}
-        STDERR: {execution_results.get('stderr', '')}
-        Exit Code: {execution_results.get('exit_code', 1)}
-        
-        Current code:
-        {code_artifacts.get('code_text', '')}
+    def _syntax_failure(self, syntax_errors: List[Dict], task_id: str, logs: list) -> Dict:
+        logger.info(f"[{task_id}] Static check found {len(syntax_errors)} syntax error(s), skipping sandbox run")
+        stderr = "\n".join(f"{e['file']}:{e['line']}:{e['column']}: SyntaxError: {e['message']}" for e in syntax_errors)
+        logs.append(f"✗ Static check failed with {len(syntax_errors)} syntax error(s), sandbox run skipped")
+        for line in stderr.split("\n"):
+            logs.append(f"  [stderr] {line}")
+        return {
+            "status": "failed",
+            "exit_code": 1,
+            "error": "Syntax check failed",
+            "stdout": "",
+            "stderr": stderr,
+            "timed_out": False,
+            "syntax_errors": syntax_errors
+        }
+    
+    @traced("phase.fix", PHASE_SECONDS, phase="fix")
+    def _phase_fix(
+        self,
+        execution_results: Dict,
+        code_artifacts: Dict,
+        plan: Dict,
+        target_language: str,
+        logs: list,
+        use_cache: bool = True,
+        variant: int = 0,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Dict:
+        stdout = execution_results.get('stdout', '')
+        stderr = execution_results.get('stderr', '')
+        files = code_artifacts.get("files", {})
+        failures = extract_failures(f"{stderr}\n{stdout}")
+        referenced = referenced_files("\n".join(failures) or f"{stderr}\n{stdout}", files)
         
-        Please analyze the errors and provide fixed code.
+        builder = PromptBuilder(self.models["debugger"]["model"], PROMPT_BUDGETS["fix"])
+        builder.add("summary", f"Previous execution failed with exit code {execution_results.get('exit_code', 1)}.", required=True)
+        if failures:
+            builder.add("failures", "FAILURES:\n" + "\n\n".join(failures), priority=4)
+        builder.add("stderr", f"STDERR:\n{dedupe_lines(stderr)}", priority=2)
+        builder.add("stdout", f"STDOUT:\n{dedupe_lines(stdout)}", priority=1)
+        for name in referenced or files:
+            builder.add(f"file:{name}", f"{name}\n```\n{files[name].rstrip()}\n```", priority=3 if referenced else 2)
+        if referenced and len(referenced) < len(files):
+            others = ", ".join(name for name in files if name not in referenced)
+            builder.add("other_files", f"Other project files (not shown, unchanged unless you return them): {others}", priority=3)
+        instructions = """
+        Please analyze the errors and provide fixed code. Return only the files you
+        change, each in its own fenced code block with the file's relative path on the
+        line just above the block.
         """
+        if variant:
+            instructions += f"""
+        This is alternative candidate #{variant + 1}: take a different approach from the most obvious fix.
+        """
+        builder.add("instructions", instructions, required=True)
+        error_context = builder.build()
         
+        debugger = self.debugger if variant == 0 else self._build_debugger()
         fixing_task = Task(
             description=error_context,
-            agent=self.debugger,
+            agent=debugger,
             expected_output="Fixed and corrected source code"
         )
         
-        crew = Crew(
-            agents=[self.debugger],
-            tasks=[fixing_task],
-            verbose=True
-        )
-        
-        result = crew.kickoff()
+        result = self._kickoff(debugger, self.debugger_llm, fixing_task, use_cache, on_token, f"fix#{variant + 1}" if variant else "fix")
         logs.append(f"Debugger analysis: {str(result)[:200]}...")
         
-        return {
-            "files": {
-                "main.py": str(result),
-                "tests.py": "# Updated test suite"
-            },
-            "fixes_applied": str(result)
-        }
+        fixed_files = parse_artifacts(result, target_language)
+        fixes = build_artifacts({**code_artifacts.get("files", {}), **fixed_files}, target_language)
+        fixes["changed_files"] = [
+            name for name, digest in fixes["hashes"].items()
+            if code_artifacts.get("hashes", {}).get(name) != digest
+        ]
+        fixes["fixes_applied"] = result
+        fixes["prompt"] = builder.stats
+        return fixes
@@ -0,0 +1,231 @@
+import ast
+import posixpath
+import re
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from .tools.test_results import find_test_files
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PARAMS = re.compile(r"\[.*\]$")
+
+def module_name(path: str) -> str:
+    name = path[:-3].replace("/", ".")
+    return name[:-len(".__init__")] if name.endswith(".__init__") else name
+
+def _is_main_guard(node: ast.AST) -> bool:
+    return (
+        isinstance(node, ast.If)
+        and isinstance(node.test, ast.Compare)
+        and isinstance(node.test.left, ast.Name)
+        and node.test.left.id == "__name__"
+    )
+
+def _is_docstring(node: ast.AST) -> bool:
+    return isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+
+class ModuleIndex:
+    def __init__(self, path: str, source: str):
+        self.path = path
+        self.name = module_name(path)
+        self.tree = ast.parse(source, filename=path)
+        self.defs: Dict[str, ast.AST] = {}
+        self.dumps: Dict[str, str] = {}
+        self.refs: Dict[str, Tuple[Set[str], Set[Tuple[str, str]]]] = {}
+        self.bindings: Dict[str, Tuple[str, Optional[str]]] = {}
+        self.toplevel: List[str] = []
+        self.toplevel_refs: Tuple[Set[str], Set[Tuple[str, str]]] = (set(), set())
+        package = self.name.rsplit(".", 1)[0] if "." in self.name else ""
+        if path.endswith("__init__.py"):
+            package = self.name
+        for node in self.tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self._define(node.name, node)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)) and self._targets(node):
+                for name in self._targets(node):
+                    self._define(name, node)
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    self.bindings[alias.asname or alias.name.split(".")[0]] = (alias.name, None)
+            elif isinstance(node, ast.ImportFrom):
+                base = self._resolve(node, package)
+                for alias in node.names:
+                    if alias.name != "*":
+                        self.bindings[alias.asname or alias.name] = (base, alias.name)
+            elif _is_main_guard(node) or _is_docstring(node):
+                continue
+            else:
+                self.toplevel.append(ast.dump(node))
+                names, attrs = _references(node)
+                self.toplevel_refs[0].update(names)
+                self.toplevel_refs[1].update(attrs)
+
+    def _define(self, name: str, node: ast.AST):
+        self.defs[name] = node
+        self.dumps[name] = ast.dump(node)
+        self.refs[name] = _references(node)
+
+    def _targets(self, node) -> List[str]:
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        if all(isinstance(target, ast.Name) for target in targets):
+            return [target.id for target in targets]
+        return []
+
+    def _resolve(self, node: ast.ImportFrom, package: str) -> str:
+        if not node.level:
+            return node.module or ""
+        parts = package.split(".") if package else []
+        if node.level > 1:
+            parts = parts[:len(parts) - (node.level - 1)]
+        return ".".join(parts + ([node.module] if node.module else []))
+
+    def tests(self) -> Dict[str, str]:
+        found = {}
+        for name, node in self.defs.items():
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and name.startswith("test"):
+                found[f"{self.path}::{name}"] = name
+            elif isinstance(node, ast.ClassDef) and (name.startswith("Test") or any(_base_name(b) == "TestCase" for b in node.bases)):
+                for item in node.body:
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)) and item.name.startswith("test"):
+                        found[f"{self.path}::{name}::{item.name}"] = name
+        return found
+
+    def autouse(self, name: str) -> bool:
+        node = self.defs.get(name)
+        for decorator in getattr(node, "decorator_list", []):
+            if isinstance(decorator, ast.Call) and any(
+                k.arg == "autouse" and isinstance(k.value, ast.Constant) and k.value.value for k in decorator.keywords
+            ):
+                return True
+        return False
+
+def _base_name(node: ast.AST) -> str:
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return getattr(node, "id", "")
+
+def _references(node: ast.AST) -> Tuple[Set[str], Set[Tuple[str, str]]]:
+    names: Set[str] = set()
+    attrs: Set[Tuple[str, str]] = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            names.add(child.id)
+        elif isinstance(child, ast.Attribute) and isinstance(child.value, ast.Name):
+            attrs.add((child.value.id, child.attr))
+        elif isinstance(child, ast.arg):
+            names.add(child.arg)
+    return names, attrs
+
+def changed_symbols(old_source: Optional[str], new_source: Optional[str], path: str) -> Optional[Set[str]]:
+    if old_source is None or new_source is None:
+        return None
+    try:
+        old, new = ModuleIndex(path, old_source), ModuleIndex(path, new_source)
+    except SyntaxError:
+        return None
+    if old.toplevel != new.toplevel:
+        return None
+    changed = {name for name in set(old.dumps) | set(new.dumps) if old.dumps.get(name) != new.dumps.get(name)}
+    changed.update(name for name in set(old.bindings) | set(new.bindings) if old.bindings.get(name) != new.bindings.get(name))
+    return changed
+
+def _touches(refs, module: ModuleIndex, dirty: Dict[str, Optional[Set[str]]]) -> bool:
+    names, attrs = refs
+    own = dirty.get(module.name, set())
+    for name in names:
+        if own is None or name in own:
+            return True
+        binding = module.bindings.get(name)
+        if binding is None:
+            continue
+        target, symbol = binding
+        if symbol is not None and f"{target}.{symbol}" in dirty:
+            target, symbol = f"{target}.{symbol}", None
+        if target not in dirty:
+            continue
+        target_dirty = dirty[target]
+        if target_dirty is None:
+            return True
+        if symbol is not None:
+            if symbol in target_dirty:
+                return True
+            continue
+        accessed = {attr for base, attr in attrs if base == name}
+        if (accessed & target_dirty) or (not accessed and target_dirty):
+            return True
+    return False
+
+def dirty_symbols(modules: Dict[str, ModuleIndex], changed: Dict[str, Optional[Set[str]]]) -> Dict[str, Optional[Set[str]]]:
+    dirty = dict(changed)
+    progress = True
+    while progress:
+        progress = False
+        for name, module in modules.items():
+            current = dirty.get(name, set())
+            if current is None:
+                continue
+            if module.toplevel and _touches(module.toplevel_refs, module, dirty):
+                dirty[name] = None
+                progress = True
+                continue
+            for symbol, refs in module.refs.items():
+                if symbol not in current and _touches(refs, module, dirty):
+                    current.add(symbol)
+                    dirty[name] = current
+                    progress = True
+    return dirty
+
+def select_tests(previous: Optional[Dict], old_files: Dict[str, str], new_files: Dict[str, str], language: str) -> Optional[Dict]:
+    if language != "python" or not previous or not previous.get("outcomes"):
+        return None
+    failing = [case for case, outcome in previous["outcomes"].items() if outcome in ("failed", "error")]
+    if not failing or any("::" not in case for case in failing):
+        return None
+
+    changed_files = [name for name in set(old_files) | set(new_files) if old_files.get(name) != new_files.get(name)]
+    if any(not name.endswith(".py") or posixpath.basename(name) == "conftest.py" for name in changed_files):
+        return None
+
+    modules: Dict[str, ModuleIndex] = {}
+    for path, source in new_files.items():
+        if path.endswith(".py"):
+            try:
+                module = ModuleIndex(path, source)
+            except SyntaxError:
+                return None
+            modules[module.name] = module
+
+    changed: Dict[str, Optional[Set[str]]] = {}
+    for path in changed_files:
+        changed[module_name(path)] = changed_symbols(old_files.get(path), new_files.get(path), path)
+    dirty = dirty_symbols(modules, changed)
+
+    test_paths = set(find_test_files(new_files))
+    known: Dict[str, Tuple[ModuleIndex, str]] = {}
+    affected: List[str] = []
+    for module in modules.values():
+        if module.path not in test_paths:
+            continue
+        module_dirty = dirty.get(module.name, set())
+        everything = module_dirty is None or any(module.autouse(symbol) for symbol in module_dirty)
+        for case, owner in module.tests().items():
+            known[case] = (module, owner)
+            if everything or owner in module_dirty:
+                affected.append(case)
+
+    failing = [case for case in failing if PARAMS.sub("", case) in known]
+    if not failing and not affected:
+        return None
+    covered = {PARAMS.sub("", case) for case in failing} | set(affected)
+    if covered >= set(known):
+        return None
+    selected = list(dict.fromkeys(failing + [case for case in affected if case not in failing]))
+    return {
+        "tests": selected,
+        "failing": len(failing),
+        "affected": len([case for case in affected if case not in failing]),
+        "total": len(known),
+        "changed_files": sorted(changed_files),
+    }
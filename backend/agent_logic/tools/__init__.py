@@ -1,4 +1,22 @@
-from .sandbox_executor import SandboxExecutor
-from .code_analyzer import CodeAnalyzer
+import importlib
 
-__all__ = ["SandboxExecutor", "CodeAnalyzer"]
+_EXPORTS = {
+    "SandboxExecutor": ".sandbox_executor",
+    "LocalSandboxExecutor": ".local_sandbox",
+    "ExecutorBackend": ".executor_backend",
+    "register_backend": ".executor_backend",
+    "CodeAnalyzer": ".code_analyzer",
+    "ContainerPool": ".container_pool",
+    "LanguagePlugin": ".language_plugins",
+    "register_language": ".language_plugins",
+}
+
+__all__ = ["SandboxExecutor", "LocalSandboxExecutor", "ExecutorBackend", "register_backend", "CodeAnalyzer", "ContainerPool", "LanguagePlugin", "register_language"]
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
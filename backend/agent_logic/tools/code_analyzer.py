@@ -1,68 +1,259 @@
-import re
+import atexit
+import hashlib
+import os
+import threading
+import time
 import logging
-from typing import Dict, List
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .language_plugins import get_language, language_for_filename
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SKIP_DIRECTORIES = {".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", "dist", "build", ".tox", ".mypy_cache"}
+
 class CodeAnalyzer:
-    def __init__(self):
-        self.patterns = {
-            "python": {
-                "imports": r"^(?:from|import)\s+(.+)$",
-                "functions": r"^def\s+(\w+)\s*\(",
-                "classes": r"^class\s+(\w+)(?:\(|:)",
-                "errors": r"(?:Error|Exception|raise)",
-            },
-            "javascript": {
-                "imports": r"^(?:import|require)\s+(.+)$",
-                "functions": r"(?:function|const|let|var)\s+(\w+)\s*(?:\(|=\s*(?:\(|async))",
-                "classes": r"class\s+(\w+)",
-                "errors": r"(?:Error|throw|catch)",
-            }
-        }
-    
+    def __init__(self, cache_size: int = 1024, workers: Optional[int] = None, parallel_threshold: int = 32, batch_size: int = 16):
+        self.cache_size = cache_size
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold
+        self.batch_size = max(1, batch_size)
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_workers = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     def analyze(self, code: str, language: str = "python") -> Dict:
+        key = self._cache_key(code, language)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        result = self._analyze_uncached(code, language)
+        self._cache_put(key, result)
+        return result
+
+    def analyze_files(self, files: Dict[str, str]) -> Dict[str, Dict]:
+        return dict(self.analyze_many(files.items()))
+
+    def analyze_many(
+        self,
+        files: Iterable[Tuple[str, str]],
+        workers: Optional[int] = None
+    ) -> Iterator[Tuple[str, Dict]]:
+        workers = workers or self.workers
+        pending = []
+        for filename, content in files:
+            language = self.language_for(filename)
+            if language is None:
+                continue
+            key = self._cache_key(content, language)
+            cached = self._cache_get(key)
+            if cached is not None:
+                yield filename, cached
+            else:
+                pending.append((filename, content, language, key))
+
+        if workers == 1 or len(pending) < self.parallel_threshold:
+            for filename, content, language, key in pending:
+                result = self._analyze_uncached(content, language)
+                self._cache_put(key, result)
+                yield filename, result
+            return
+
+        keys = {filename: key for filename, _, _, key in pending}
+        batches = [
+            [(filename, content, language) for filename, content, language, _ in pending[i:i + self.batch_size]]
+            for i in range(0, len(pending), self.batch_size)
+        ]
+        pool = self._get_pool(workers)
+        futures = [pool.submit(_analyze_batch, batch) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                for filename, result in future.result():
+                    self._cache_put(keys[filename], result)
+                    yield filename, result
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def analyze_project(
+        self,
+        source,
+        workers: Optional[int] = None,
+        on_result=None
+    ) -> Dict:
+        if isinstance(source, dict):
+            files = source.items()
+        else:
+            files = iter_source_files(source)
+
+        started = time.monotonic()
+        results: Dict[str, Dict] = {}
+        languages: Dict[str, int] = {}
+        finding_counts: Dict[str, int] = {}
+        syntax_errors: List[Dict] = []
+        totals = {"lines": 0, "imports": 0, "functions": 0, "classes": 0, "findings": 0}
+
+        for filename, result in self.analyze_many(files, workers):
+            results[filename] = result
+            languages[result["language"]] = languages.get(result["language"], 0) + 1
+            totals["lines"] += result["lines"]
+            totals["imports"] += len(result["imports"])
+            totals["functions"] += len(result["functions"])
+            totals["classes"] += len(result["classes"])
+            totals["findings"] += len(result["findings"])
+            for finding in result["findings"]:
+                finding_counts[finding["code"]] = finding_counts.get(finding["code"], 0) + 1
+            for error in result["syntax_errors"]:
+                syntax_errors.append(dict(error, file=filename))
+            if on_result is not None:
+                on_result(filename, result)
+
+        duration = time.monotonic() - started
+        return {
+            "files": results,
+            "summary": dict(
+                totals,
+                file_count=len(results),
+                languages=languages,
+                findings_by_code=finding_counts,
+                syntax_errors=syntax_errors,
+                duration=round(duration, 3),
+                files_per_second=round(len(results) / duration, 1) if duration > 0 else None,
+            ),
+        }
+
+    def check_syntax(self, files: Dict[str, str]) -> List[Dict]:
+        errors = []
+        for filename, result in self.analyze_files(files).items():
+            for error in result["syntax_errors"]:
+                errors.append(dict(error, file=filename))
+        return errors
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "workers": self.workers,
+                "pool_started": self._pool is not None,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_pool(self, workers: int) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is not None and self._pool_workers != workers:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                self._pool_workers = workers
+                logger.info(f"Started code analysis pool with {workers} workers")
+            return self._pool
+
+    def _cache_key(self, code: str, language: str) -> str:
+        return hashlib.sha256(f"{language}\0{code}".encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+            self.cache_misses += 1
+            return None
+
+    def _cache_put(self, key: str, result: Dict):
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _analyze_uncached(self, code: str, language: str) -> Dict:
+        result = self._empty_result(code, language)
+        plugin = get_language(language)
+        if plugin is not None:
+            plugin.analyze(code, result)
+
+        for issue in self._detect_size_issues(code):
+            result["potential_issues"].append(issue)
+        return result
+
+    @staticmethod
+    def language_for(filename: str) -> Optional[str]:
+        return language_for_filename(filename)
+
+    def _empty_result(self, code: str, language: str) -> Dict:
         return {
             "language": language,
             "lines": len(code.split('\n')),
-            "imports": self._extract_imports(code, language),
-            "functions": self._extract_functions(code, language),
-            "classes": self._extract_classes(code, language),
-            "potential_issues": self._detect_issues(code, language),
+            "imports": [],
+            "functions": [],
+            "classes": [],
+            "call_graph": {},
+            "findings": [],
+            "syntax_errors": [],
+            "potential_issues": [] if code.strip() else ["Empty code"],
         }
-    
-    def _extract_imports(self, code: str, language: str) -> List[str]:
-        pattern = self.patterns.get(language, {}).get("imports", "")
-        if not pattern:
-            return []
-        return re.findall(pattern, code, re.MULTILINE)
-    
-    def _extract_functions(self, code: str, language: str) -> List[str]:
-        pattern = self.patterns.get(language, {}).get("functions", "")
-        if not pattern:
-            return []
-        return re.findall(pattern, code, re.MULTILINE)
-    
-    def _extract_classes(self, code: str, language: str) -> List[str]:
-        pattern = self.patterns.get(language, {}).get("classes", "")
-        if not pattern:
-            return []
-        return re.findall(pattern, code, re.MULTILINE)
-    
-    def _detect_issues(self, code: str, language: str) -> List[str]:
-        issues = []
-        
-        if not code.strip():
-            issues.append("Empty code")
-        
+
+    def _detect_size_issues(self, code: str) -> List[str]:
         if len(code) > 10000:
-            issues.append("Large file (>10KB) - consider splitting")
-        
-        if language == "python":
-            if "except:" in code and "except Exception" not in code:
-                issues.append("Bare except clause detected - use specific exceptions")
-            if "import *" in code:
-                issues.append("Wildcard imports detected - use specific imports")
-        
-        return issues
+            return ["Large file (>10KB) - consider splitting"]
+        return []
+
+def iter_source_files(root: str) -> Iterator[Tuple[str, str]]:
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories[:] = sorted(d for d in subdirectories if d not in SKIP_DIRECTORIES)
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            if CodeAnalyzer.language_for(filename) is None:
+                continue
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    content = f.read()
+            except OSError as e:
+                logger.warning(f"Skipping unreadable file {path}: {str(e)}")
+                continue
+            yield os.path.relpath(path, root), content
+
+_worker_analyzer: Optional[CodeAnalyzer] = None
+
+def _analyze_batch(batch: List[Tuple[str, str, str]]) -> List[Tuple[str, Dict]]:
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = CodeAnalyzer(cache_size=0, workers=1)
+    return [(filename, _worker_analyzer._analyze_uncached(content, language)) for filename, content, language in batch]
+
+_shared_analyzer: Optional[CodeAnalyzer] = None
+_shared_analyzer_lock = threading.Lock()
+
+def get_code_analyzer() -> CodeAnalyzer:
+    global _shared_analyzer
+    with _shared_analyzer_lock:
+        if _shared_analyzer is None:
+            _shared_analyzer = CodeAnalyzer(
+                cache_size=int(os.getenv("CODE_ANALYZER_CACHE_SIZE", "1024")),
+                workers=int(os.getenv("CODE_ANALYZER_WORKERS", "0")) or None,
+                parallel_threshold=int(os.getenv("CODE_ANALYZER_PARALLEL_THRESHOLD", "32")),
+            )
+            atexit.register(shutdown_shared_analyzer)
+        return _shared_analyzer
+
+def shutdown_shared_analyzer():
+    global _shared_analyzer
+    with _shared_analyzer_lock:
+        analyzer, _shared_analyzer = _shared_analyzer, None
+    if analyzer is not None:
+        analyzer.shutdown()
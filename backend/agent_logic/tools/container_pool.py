@@ -0,0 +1,254 @@
+import atexit
+import os
+import threading
+import time
+import logging
+from typing import Dict, List, Optional
+
+import docker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+POOL_LABEL = "opendev.sandbox.pool"
+SANDBOX_ROOT = "/sandbox"
+SANDBOX_USER = "65534:65534"
+
+class PoolExhaustedError(RuntimeError):
+    pass
+
+class PooledContainer:
+    def __init__(self, container, image: str):
+        self.container = container
+        self.image = image
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+    @property
+    def id(self) -> str:
+        return self.container.id
+
+class ContainerPool:
+    def __init__(
+        self,
+        docker_client=None,
+        max_size: int = 4,
+        idle_timeout: float = 300.0,
+        acquire_timeout: float = 30.0,
+        max_uses: int = 50,
+        mem_limit: str = "2g",
+        nano_cpus: int = 2_000_000_000,
+        user: str = SANDBOX_USER,
+    ):
+        self.docker_client = docker_client or docker.from_env()
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.max_uses = max_uses
+        self.mem_limit = mem_limit
+        self.nano_cpus = nano_cpus
+        self.user = user
+        self._idle: Dict[str, List[PooledContainer]] = {}
+        self._busy: Dict[str, PooledContainer] = {}
+        self._sizes: Dict[str, int] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def warm(self, image: str, count: int = 1):
+        for _ in range(count):
+            with self._cond:
+                if self._sizes.get(image, 0) >= self.max_size:
+                    return
+                self._sizes[image] = self._sizes.get(image, 0) + 1
+            try:
+                pooled = self._start(image)
+            except Exception:
+                with self._cond:
+                    self._sizes[image] -= 1
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._idle.setdefault(image, []).append(pooled)
+                self._cond.notify_all()
+
+    def acquire(self, image: str) -> PooledContainer:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            self._evict_idle_locked()
+            while True:
+                if self._closed:
+                    raise PoolExhaustedError("Container pool is shut down")
+                idle = self._idle.get(image)
+                if idle:
+                    pooled = idle.pop()
+                    self._busy[pooled.id] = pooled
+                    break
+                if self._sizes.get(image, 0) < self.max_size:
+                    self._sizes[image] = self._sizes.get(image, 0) + 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhaustedError(
+                        f"No sandbox container for {image} available within {self.acquire_timeout}s"
+                    )
+                self._cond.wait(remaining)
+
+        if pooled is None:
+            try:
+                pooled = self._start(image)
+            except Exception:
+                with self._cond:
+                    self._sizes[image] -= 1
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._busy[pooled.id] = pooled
+
+        pooled.uses += 1
+        pooled.last_used = time.monotonic()
+        return pooled
+
+    def release(self, pooled: PooledContainer, healthy: bool = True):
+        with self._cond:
+            self._busy.pop(pooled.id, None)
+
+        keep = healthy and not self._closed and pooled.uses < self.max_uses
+        if keep:
+            keep = self._reset(pooled)
+
+        with self._cond:
+            if keep and not self._closed:
+                pooled.last_used = time.monotonic()
+                self._idle.setdefault(pooled.image, []).append(pooled)
+            else:
+                self._sizes[pooled.image] -= 1
+                keep = False
+            self._cond.notify_all()
+
+        if not keep:
+            self._destroy(pooled)
+
+    def evict_idle(self) -> int:
+        with self._cond:
+            expired = self._evict_idle_locked()
+        return len(expired)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                image: {
+                    "size": size,
+                    "idle": len(self._idle.get(image, [])),
+                    "busy": sum(1 for p in self._busy.values() if p.image == image),
+                }
+                for image, size in self._sizes.items()
+            }
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            doomed = [p for idle in self._idle.values() for p in idle]
+            doomed.extend(self._busy.values())
+            self._idle.clear()
+            self._busy.clear()
+            self._sizes.clear()
+            self._cond.notify_all()
+        for pooled in doomed:
+            self._destroy(pooled)
+
+    def _evict_idle_locked(self) -> List[PooledContainer]:
+        now = time.monotonic()
+        expired = []
+        for image, idle in self._idle.items():
+            fresh = []
+            for pooled in idle:
+                if now - pooled.last_used > self.idle_timeout:
+                    expired.append(pooled)
+                    self._sizes[image] -= 1
+                else:
+                    fresh.append(pooled)
+            self._idle[image] = fresh
+        if expired:
+            self._cond.notify_all()
+            threading.Thread(
+                target=lambda: [self._destroy(p) for p in expired],
+                daemon=True,
+            ).start()
+        return expired
+
+    def _start(self, image: str) -> PooledContainer:
+        logger.info(f"Starting pooled sandbox container for {image}")
+        container = self.docker_client.containers.run(
+            image,
+            entrypoint=["sleep", "infinity"],
+            working_dir=SANDBOX_ROOT,
+            user=self.user,
+            environment={"HOME": "/tmp"},
+            detach=True,
+            auto_remove=False,
+            mem_limit=self.mem_limit,
+            nano_cpus=self.nano_cpus,
+            network_disabled=True,
+            security_opt=["no-new-privileges"],
+            labels={POOL_LABEL: "1"},
+        )
+        pooled = PooledContainer(container, image)
+        try:
+            exit_code, output = container.exec_run(
+                ["sh", "-c", f"mkdir -p {SANDBOX_ROOT} && chown {self.user} {SANDBOX_ROOT} && chmod 0755 {SANDBOX_ROOT} "
+                             f"&& chmod 1777 /tmp && chmod 0755 /var/tmp /dev/shm"],
+                user="root",
+            )
+        except docker.errors.APIError:
+            self._destroy(pooled)
+            raise
+        if exit_code != 0:
+            self._destroy(pooled)
+            raise docker.errors.APIError(f"Could not prepare pooled container: {output.decode('utf-8', errors='replace')}")
+        return pooled
+
+    def _reset(self, pooled: PooledContainer) -> bool:
+        try:
+            exit_code, _ = pooled.container.exec_run(
+                ["sh", "-c", f"kill -9 -1 2>/dev/null; rm -rf {SANDBOX_ROOT}/* {SANDBOX_ROOT}/.[!.]* /tmp/* /tmp/.[!.]* 2>/dev/null; true"],
+                user="root",
+            )
+            return exit_code == 0
+        except docker.errors.APIError as e:
+            logger.warning(f"Failed to reset pooled container {pooled.id[:12]}: {str(e)}")
+            return False
+
+    def _destroy(self, pooled: PooledContainer):
+        try:
+            pooled.container.remove(force=True)
+            logger.info(f"Removed pooled sandbox container {pooled.id[:12]}")
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            logger.warning(f"Failed to remove pooled container {pooled.id[:12]}: {str(e)}")
+
+_shared_pool: Optional[ContainerPool] = None
+_shared_pool_lock = threading.Lock()
+
+def get_shared_pool(docker_client=None) -> ContainerPool:
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ContainerPool(
+                docker_client=docker_client,
+                max_size=int(os.getenv("SANDBOX_POOL_SIZE", "4")),
+                idle_timeout=float(os.getenv("SANDBOX_POOL_IDLE_TIMEOUT", "300")),
+                acquire_timeout=float(os.getenv("SANDBOX_POOL_ACQUIRE_TIMEOUT", "30")),
+                user=os.getenv("SANDBOX_POOL_USER", SANDBOX_USER),
+            )
+            atexit.register(shutdown_shared_pool)
+        return _shared_pool
+
+def shutdown_shared_pool():
+    global _shared_pool
+    with _shared_pool_lock:
+        pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        pool.shutdown()
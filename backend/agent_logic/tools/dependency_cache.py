@@ -0,0 +1,225 @@
+import hashlib
+import io
+import os
+import re
+import tarfile
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+import docker
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEPS_LABEL = "opendev.deps.key"
+DEPS_REPOSITORY = "opendev-sandbox-deps"
+DEPS_ROOT = "/opt/deps"
+
+DEPENDENCY_FILES = {
+    "python": ("requirements.txt",),
+    "javascript": ("package.json", "package-lock.json", "yarn.lock", "pnpm-lock.yaml"),
+    "typescript": ("package.json", "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "tsconfig.json"),
+}
+
+NPM_FLAGS = "--ignore-scripts --no-audit --no-fund"
+
+INSTALL_COMMANDS = {
+    "python": f"pip install --no-cache-dir --only-binary=:all: -r {DEPS_ROOT}/requirements.txt",
+    "javascript": f"cd {DEPS_ROOT} && (npm ci {NPM_FLAGS} || npm install {NPM_FLAGS})",
+    "typescript": f"cd {DEPS_ROOT} && (npm ci {NPM_FLAGS} || npm install {NPM_FLAGS})",
+}
+
+KEY_LOCK_STRIPES = 64
+
+def parse_docker_time(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    match = re.match(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(\.\d+)?(Z|[+-]\d{2}:\d{2})?$", value)
+    if match is None:
+        return 0.0
+    seconds, fraction, zone = match.groups()
+    try:
+        stamp = datetime.fromisoformat(seconds + (fraction or "")[:7] + ("+00:00" if zone in (None, "Z") else zone))
+    except ValueError:
+        return 0.0
+    return max(stamp.timestamp(), 0.0)
+
+def image_last_used(attrs: Dict) -> float:
+    return max(parse_docker_time(attrs.get("Created")), parse_docker_time((attrs.get("Metadata") or {}).get("LastTagTime")))
+
+class DependencyCache:
+    def __init__(
+        self,
+        docker_client=None,
+        max_bytes: int = 10 * 1024 ** 3,
+        build_timeout: int = 600,
+        mem_limit: str = "2g",
+        nano_cpus: int = 2_000_000_000,
+        pids_limit: int = 512,
+    ):
+        self.docker_client = docker_client or docker.from_env()
+        self.max_bytes = max_bytes
+        self.build_timeout = build_timeout
+        self.mem_limit = mem_limit
+        self.nano_cpus = nano_cpus
+        self.pids_limit = pids_limit
+        self._last_used: Dict[str, float] = {}
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCK_STRIPES)]
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "builds": 0, "build_failures": 0, "evictions": 0}
+
+    def dependency_key(self, base_image: str, language: str, files: Dict[str, str]) -> Optional[str]:
+        names = [name for name in DEPENDENCY_FILES.get(language, ()) if name in files]
+        if not names or names == ["tsconfig.json"]:
+            return None
+        digest = hashlib.sha256(f"{base_image}\0{language}".encode("utf-8"))
+        for name in names:
+            digest.update(f"\0{name}\0".encode("utf-8"))
+            digest.update(files[name].encode("utf-8"))
+        return digest.hexdigest()[:24]
+
+    def image_for(self, base_image: str, language: str, files: Dict[str, str], task_id: str = "unknown") -> Optional[str]:
+        key = self.dependency_key(base_image, language, files)
+        if key is None:
+            return None
+        tag = f"{DEPS_REPOSITORY}:{key}"
+
+        with self._key_locks[int(key[:8], 16) % len(self._key_locks)]:
+            if self._image_exists(tag):
+                with self._lock:
+                    self._stats["hits"] += 1
+                    self._last_used[tag] = time.time()
+                logger.info(f"[{task_id}] Dependency cache hit: {tag}")
+                return tag
+
+            try:
+                self._build(base_image, language, files, key, tag, task_id)
+            except Exception as e:
+                with self._lock:
+                    self._stats["build_failures"] += 1
+                logger.error(f"[{task_id}] Dependency image build failed: {str(e)}")
+                return None
+
+            with self._lock:
+                self._stats["builds"] += 1
+                self._last_used[tag] = time.time()
+
+        self.evict()
+        return tag
+
+    def evict(self) -> int:
+        try:
+            images = self.docker_client.images.list(filters={"label": DEPS_LABEL})
+        except docker.errors.APIError as e:
+            logger.warning(f"Could not list dependency images: {str(e)}")
+            return 0
+
+        entries = []
+        for image in images:
+            tag = next((t for t in image.tags if t.startswith(DEPS_REPOSITORY)), None)
+            if tag is None:
+                continue
+            with self._lock:
+                last_used = self._last_used.setdefault(tag, image_last_used(image.attrs))
+            entries.append((last_used, tag, image.attrs.get("Size", 0)))
+
+        total = sum(size for _, _, size in entries)
+        evicted = 0
+        for _, tag, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                self.docker_client.images.remove(tag)
+            except docker.errors.APIError as e:
+                logger.info(f"Skipping eviction of {tag}: {str(e)}")
+                continue
+            total -= size
+            evicted += 1
+            with self._lock:
+                self._last_used.pop(tag, None)
+                self._stats["evictions"] += 1
+            logger.info(f"Evicted dependency image {tag}")
+        return evicted
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, tracked_images=len(self._last_used))
+
+    def _image_exists(self, tag: str) -> bool:
+        try:
+            self.docker_client.images.get(tag)
+            return True
+        except docker.errors.ImageNotFound:
+            return False
+
+    def _build(self, base_image: str, language: str, files: Dict[str, str], key: str, tag: str, task_id: str):
+        logger.info(f"[{task_id}] Building dependency image {tag} from {base_image}")
+        container = self.docker_client.containers.create(
+            base_image,
+            entrypoint=["bash", "-c"],
+            command=[INSTALL_COMMANDS[language]],
+            working_dir=DEPS_ROOT,
+            labels={DEPS_LABEL: key},
+            mem_limit=self.mem_limit,
+            nano_cpus=self.nano_cpus,
+            pids_limit=self.pids_limit,
+            security_opt=["no-new-privileges"],
+        )
+        try:
+            container.put_archive("/", self._dependency_archive(language, files))
+            container.start()
+            outcome = container.wait(timeout=self.build_timeout)
+            if outcome.get("StatusCode", 1) != 0:
+                output = container.logs(tail=50).decode("utf-8", errors="replace")
+                raise RuntimeError(f"Dependency install exited with {outcome.get('StatusCode')}: {output}")
+            container.commit(
+                repository=DEPS_REPOSITORY,
+                tag=key,
+                conf={
+                    "Entrypoint": ["/entrypoint.sh"],
+                    "Cmd": [],
+                    "WorkingDir": "/sandbox",
+                    "Labels": {DEPS_LABEL: key},
+                    "Env": [f"NODE_PATH={DEPS_ROOT}/node_modules", f"PATH={DEPS_ROOT}/node_modules/.bin:/usr/local/bin:/usr/local/sbin:/usr/sbin:/usr/bin:/sbin:/bin"],
+                },
+            )
+        finally:
+            try:
+                container.remove(force=True)
+            except docker.errors.APIError:
+                pass
+
+    def _dependency_archive(self, language: str, files: Dict[str, str]) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            for name in DEPENDENCY_FILES.get(language, ()):
+                if name not in files:
+                    continue
+                data = files[name].encode("utf-8")
+                info = tarfile.TarInfo(name=f"{DEPS_ROOT.lstrip('/')}/{name}")
+                info.size = len(data)
+                info.mode = 0o644
+                info.mtime = int(time.time())
+                archive.addfile(info, io.BytesIO(data))
+        return buffer.getvalue()
+
+_shared_cache: Optional[DependencyCache] = None
+_shared_cache_lock = threading.Lock()
+
+def get_dependency_cache(docker_client=None) -> Optional[DependencyCache]:
+    global _shared_cache
+    if os.getenv("SANDBOX_DEPS_CACHE", "true").lower() not in ("1", "true", "yes"):
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = DependencyCache(
+                docker_client=docker_client,
+                max_bytes=int(os.getenv("SANDBOX_DEPS_CACHE_BYTES", str(10 * 1024 ** 3))),
+                build_timeout=int(os.getenv("SANDBOX_DEPS_BUILD_TIMEOUT", "600")),
+                mem_limit=os.getenv("SANDBOX_DEPS_BUILD_MEMORY", "2g"),
+                nano_cpus=int(float(os.getenv("SANDBOX_DEPS_BUILD_CPUS", "2")) * 1_000_000_000),
+            )
+        return _shared_cache
@@ -0,0 +1,295 @@
+import abc
+import os
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .output_buffer import BoundedOutput, LineForwarder
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ExecutorBackend(abc.ABC):
+    name = ""
+    languages: Optional[Tuple[str, ...]] = None
+
+    def __init__(self):
+        self.output_head_bytes = int(os.getenv("SANDBOX_OUTPUT_HEAD_BYTES", str(64 * 1024)))
+        self.output_tail_bytes = int(os.getenv("SANDBOX_OUTPUT_TAIL_BYTES", str(192 * 1024)))
+        self.forward_max_lines = int(os.getenv("SANDBOX_LOG_FORWARD_LINES", "500"))
+
+    def supports(self, language: str) -> bool:
+        return self.languages is None or language in self.languages
+
+    def assign(self, task_id: str, backend: str):
+        pass
+
+    def warm(self):
+        pass
+
+    def prepare(self, task_id: str, language: str, files: Optional[Dict[str, str]] = None) -> Future:
+        return self._done()
+
+    def dependency_files(self, language: str, files: Dict[str, str]) -> Dict[str, str]:
+        from .dependency_cache import DEPENDENCY_FILES
+        return {name: content for name, content in files.items() if name in DEPENDENCY_FILES.get(language, ())}
+
+    def stage_file(self, task_id: str, language: str, filename: str, content: str) -> Future:
+        return self._done()
+
+    @abc.abstractmethod
+    def execute(
+        self,
+        code_artifacts: Dict,
+        language: str,
+        timeout: int = 60,
+        task_id: str = "unknown",
+        keep_workspace: bool = False,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        tests: Optional[List[str]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict:
+        raise NotImplementedError
+
+    def release(self, task_id: str):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def stats(self) -> Dict:
+        return {}
+
+    def _done(self, result=None) -> Future:
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def _collect_files(self, code_artifacts: Dict) -> Dict[str, str]:
+        files = dict(code_artifacts.get("files") or {})
+        if not files and code_artifacts.get("code_text"):
+            files["main.py"] = code_artifacts["code_text"]
+        return files
+
+    def _collect_output(self, stream, on_output: Optional[Callable[[str, str], None]]):
+        stdout = BoundedOutput(self.output_head_bytes, self.output_tail_bytes)
+        stderr = BoundedOutput(self.output_head_bytes, self.output_tail_bytes)
+        forwarder = LineForwarder(on_output, max_lines=self.forward_max_lines)
+        try:
+            for out_chunk, err_chunk in stream:
+                if out_chunk:
+                    stdout.write(out_chunk)
+                    forwarder.write("stdout", out_chunk)
+                if err_chunk:
+                    stderr.write(err_chunk)
+                    forwarder.write("stderr", err_chunk)
+        finally:
+            forwarder.close()
+        return stdout, stderr
+
+    def _result(self, exit_code: int, stdout: BoundedOutput, stderr: BoundedOutput, timeout: Optional[int] = None) -> Dict:
+        result = {
+            "status": "success" if exit_code == 0 and timeout is None else "error",
+            "exit_code": exit_code,
+            "stdout": stdout.text(),
+            "stderr": stderr.text(),
+            "timed_out": timeout is not None
+        }
+        if stdout.truncated:
+            result["stdout_truncated_bytes"] = stdout.truncated_bytes
+        if stderr.truncated:
+            result["stderr_truncated_bytes"] = stderr.truncated_bytes
+        if timeout is not None:
+            result["error"] = f"Execution timed out after {timeout}s"
+        elif exit_code != 0:
+            result["error"] = f"Command exited with status {exit_code}"
+        return result
+
+    def _watch_cancel(self, cancel_event: Optional[threading.Event], kill: Callable[[], None]) -> Callable[[], None]:
+        if cancel_event is None:
+            return lambda: None
+        finished = threading.Event()
+
+        def watch():
+            while not finished.wait(0.1):
+                if cancel_event.is_set():
+                    kill()
+                    return
+
+        threading.Thread(target=watch, name="sandbox-cancel", daemon=True).start()
+        return finished.set
+
+    def _cancelled(self, stdout: Optional[BoundedOutput] = None, stderr: Optional[BoundedOutput] = None) -> Dict:
+        result = self._result(1, stdout, stderr) if stdout is not None and stderr is not None else self._error("Execution cancelled")
+        result.update(status="cancelled", error="Execution cancelled")
+        return result
+
+    def _error(self, message: str) -> Dict:
+        return {
+            "status": "error",
+            "exit_code": 1,
+            "stdout": "",
+            "stderr": message,
+            "error": message
+        }
+
+class SandboxRouter(ExecutorBackend):
+    name = "router"
+
+    def __init__(
+        self,
+        default: str = "docker",
+        by_language: Optional[Dict[str, str]] = None,
+        backends: Optional[Dict[str, ExecutorBackend]] = None,
+        allowed: Optional[List[str]] = None
+    ):
+        super().__init__()
+        for name in [default, *(by_language or {}).values()]:
+            if name not in _backends and name not in (backends or {}):
+                raise ValueError(f"Unknown sandbox backend: {name}")
+        self.default = default
+        self.by_language = dict(by_language or {})
+        self.allowed = list(allowed) if allowed is not None else None
+        self._instances: Dict[str, ExecutorBackend] = dict(backends or {})
+        self._assigned: Dict[str, str] = {}
+        self._routes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {}
+
+    def backend(self, name: str) -> ExecutorBackend:
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                factory = _backends.get(name)
+                if factory is None:
+                    raise ValueError(f"Unknown sandbox backend: {name}")
+                instance = factory()
+                self._instances[name] = instance
+                logger.info(f"Initialized {name} sandbox backend")
+            return instance
+
+    def assign(self, task_id: str, backend: str):
+        if backend not in _backends and backend not in self._instances:
+            raise ValueError(f"Unknown sandbox backend: {backend}")
+        if self.allowed is not None and backend not in self.allowed:
+            raise ValueError(f"Sandbox backend {backend} is not allowed for tasks")
+        with self._lock:
+            self._assigned[task_id] = backend
+            self._routes.pop(task_id, None)
+
+    def warm(self):
+        for name in dict.fromkeys([self.default, *self.by_language.values()]):
+            self.backend(name).warm()
+
+    def route(self, task_id: str, language: str) -> Tuple[str, ExecutorBackend]:
+        with self._lock:
+            name = self._routes.get(task_id)
+            requested = self._assigned.get(task_id)
+        if name is not None:
+            return name, self.backend(name)
+        name = requested or self.by_language.get(language) or self.default
+        backend = self.backend(name)
+        if not backend.supports(language) and name != self.default:
+            logger.info(f"[{task_id}] {name} sandbox does not run {language}, using {self.default}")
+            name, backend = self.default, self.backend(self.default)
+        with self._lock:
+            self._routes[task_id] = name
+        return name, backend
+
+    def prepare(self, task_id: str, language: str, files: Optional[Dict[str, str]] = None) -> Future:
+        _, backend = self.route(task_id, language)
+        return backend.prepare(task_id, language, files)
+
+    def stage_file(self, task_id: str, language: str, filename: str, content: str) -> Future:
+        _, backend = self.route(task_id, language)
+        return backend.stage_file(task_id, language, filename, content)
+
+    def execute(
+        self,
+        code_artifacts: Dict,
+        language: str,
+        timeout: int = 60,
+        task_id: str = "unknown",
+        keep_workspace: bool = False,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        tests: Optional[List[str]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict:
+        try:
+            name, backend = self.route(task_id, language)
+        except Exception as e:
+            logger.error(f"[{task_id}] No sandbox backend available: {str(e)}")
+            return self._error(str(e))
+        result = backend.execute(code_artifacts, language, timeout, task_id, keep_workspace, on_output, tests, cancel_event)
+        result["backend"] = name
+        with self._lock:
+            self._stats[name] = self._stats.get(name, 0) + 1
+            if not keep_workspace:
+                self._routes.pop(task_id, None)
+        return result
+
+    def release(self, task_id: str):
+        with self._lock:
+            name = self._routes.pop(task_id, None)
+            self._assigned.pop(task_id, None)
+            backend = self._instances.get(name) if name is not None else None
+        if backend is not None:
+            backend.release(task_id)
+
+    def shutdown(self):
+        with self._lock:
+            instances = list(self._instances.values())
+        for backend in instances:
+            backend.shutdown()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            instances = dict(self._instances)
+            executions = dict(self._stats)
+        return {
+            "default": self.default,
+            "by_language": dict(self.by_language),
+            "allowed": self.allowed,
+            "executions": executions,
+            "backends": {name: backend.stats() for name, backend in instances.items()},
+        }
+
+_backends: Dict[str, Callable[[], ExecutorBackend]] = {}
+_backends_lock = threading.Lock()
+
+def register_backend(name: str, factory: Callable[[], ExecutorBackend]):
+    with _backends_lock:
+        _backends[name] = factory
+
+def registered_backends():
+    return sorted(_backends)
+
+def allowed_backends() -> List[str]:
+    names = [name.strip().lower() for name in os.getenv("SANDBOX_ALLOWED_BACKENDS", "docker").split(",") if name.strip()]
+    return [name for name in dict.fromkeys(names) if name in _backends]
+
+def parse_backend_map(spec: str) -> Dict[str, str]:
+    mapping = {}
+    for item in spec.split(","):
+        language, _, backend = item.partition("=")
+        if language.strip() and backend.strip():
+            mapping[language.strip().lower()] = backend.strip().lower()
+    return mapping
+
+def create_sandbox_executor() -> SandboxRouter:
+    default = os.getenv("SANDBOX_BACKEND", "docker").lower()
+    by_language = parse_backend_map(os.getenv("SANDBOX_BACKEND_BY_LANGUAGE", ""))
+    logger.info(f"Sandbox backend {default}" + (f", per language {by_language}" if by_language else ""))
+    return SandboxRouter(default, by_language, allowed=allowed_backends())
+
+def _docker_backend() -> ExecutorBackend:
+    from .sandbox_executor import SandboxExecutor
+    return SandboxExecutor()
+
+def _local_backend() -> ExecutorBackend:
+    from .local_sandbox import LocalSandboxExecutor
+    return LocalSandboxExecutor()
+
+register_backend("docker", _docker_backend)
+register_backend("local", _local_backend)
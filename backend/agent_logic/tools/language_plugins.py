@@ -0,0 +1,537 @@
+import abc
+import ast
+import re
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODULE_SCOPE = "<module>"
+
+JS_TOKEN = re.compile(
+    r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+    |(?P<open_comment>/\*)
+    |(?P<string>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`(?:\\.|[^`\\])*`)
+    |(?P<ident>[A-Za-z_$][\w$]*)
+    |(?P<number>\d[\w.]*)
+    |(?P<newline>\n)
+    |(?P<op>===|!==|==|!=|=>|\.\.\.|[{}()\[\];,.=<>!+\-*/%&|^~?:@\#])
+    |(?P<space>[ \t\r\f\v]+)
+    |(?P<other>.)
+    """,
+    re.S | re.X,
+)
+
+JS_REGEX = re.compile(r"/(?![*/])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[A-Za-z]*")
+JSX_NAME = re.compile(r"[A-Za-z_$][\w$.:-]*")
+JS_EXPRESSION_KEYWORDS = {
+    "return", "typeof", "case", "do", "else", "in", "instanceof", "new", "delete", "void", "throw", "yield", "await", "of",
+}
+
+JS_KEYWORDS = {
+    "if", "for", "while", "switch", "catch", "return", "typeof", "function", "new", "await",
+    "import", "export", "super", "delete", "void", "in", "of", "instanceof", "yield", "do",
+}
+JS_BRACKETS = {"(": ")", "[": "]", "{": "}"}
+
+def _expression_start(prev: Optional[tuple]) -> bool:
+    if prev is None:
+        return True
+    kind, value, _ = prev
+    if kind == "op":
+        return value not in (")", "]", "}")
+    return kind == "ident" and value in JS_EXPRESSION_KEYWORDS
+
+def _skip_braces(code: str, pos: int) -> Optional[int]:
+    depth = 0
+    while pos < len(code):
+        char = code[pos]
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        elif char in "\"'`":
+            end = code.find(char, pos + 1)
+            if end >= 0 and (char == "`" or "\n" not in code[pos:end]):
+                pos = end
+        pos += 1
+    return None
+
+def _skip_jsx_tag(code: str, pos: int) -> Optional[Tuple[int, bool]]:
+    if code.startswith(">", pos):
+        return pos + 1, False
+    name = JSX_NAME.match(code, pos)
+    if name is None:
+        return None
+    pos = name.end()
+    while pos < len(code):
+        char = code[pos]
+        if code.startswith("/>", pos):
+            return pos + 2, True
+        if char == ">":
+            return pos + 1, False
+        if char in "\"'":
+            end = code.find(char, pos + 1)
+            if end < 0:
+                return None
+            pos = end + 1
+        elif char == "{":
+            end = _skip_braces(code, pos)
+            if end is None:
+                return None
+            pos = end
+        elif char.isspace() or char.isalnum() or char in "_$.:-=":
+            pos += 1
+        else:
+            return None
+    return None
+
+def _skip_jsx(code: str, pos: int) -> Optional[int]:
+    depth = 0
+    while pos < len(code):
+        if code.startswith("</", pos):
+            end = code.find(">", pos)
+            if end < 0 or depth == 0:
+                return None
+            depth -= 1
+            pos = end + 1
+            if depth == 0:
+                return pos
+        else:
+            tag = _skip_jsx_tag(code, pos + 1)
+            if tag is None:
+                return None
+            pos, self_closing = tag
+            if not self_closing:
+                depth += 1
+            elif depth == 0:
+                return pos
+        while pos < len(code) and code[pos] != "<":
+            if code[pos] == "{":
+                end = _skip_braces(code, pos)
+                if end is None:
+                    return None
+                pos = end
+            else:
+                pos += 1
+    return None
+
+class _PythonVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.imports: List[str] = []
+        self.functions: List[str] = []
+        self.classes: List[str] = []
+        self.call_graph: Dict[str, set] = {MODULE_SCOPE: set()}
+        self.findings: List[Dict] = []
+        self._scope: List[str] = []
+        self._function_scope: List[str] = []
+        self._imported: Dict[str, int] = {}
+        self._used: set = set()
+        self._exported: set = set()
+
+    def finish(self):
+        for name, line in self._imported.items():
+            if name not in self._used and name not in self._exported:
+                self._finding(line, "W0611", f"Unused import '{name}'")
+
+    def _finding(self, line: int, code: str, message: str):
+        self.findings.append({"line": line, "code": code, "message": message})
+
+    def _qualified(self, name: str) -> str:
+        return ".".join(self._scope + [name])
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self.imports.append(alias.name)
+            self._imported[(alias.asname or alias.name).split(".")[0]] = node.lineno
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        self.imports.append("." * node.level + (node.module or ""))
+        for alias in node.names:
+            if alias.name == "*":
+                self._finding(node.lineno, "W0401", "Wildcard imports detected - use specific imports")
+            elif node.module != "__future__":
+                self._imported[alias.asname or alias.name] = node.lineno
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self.classes.append(self._qualified(node.name))
+        for child in node.bases + node.keywords + node.decorator_list:
+            self.visit(child)
+        self._scope.append(node.name)
+        for child in node.body:
+            self.visit(child)
+        self._scope.pop()
+
+    def _visit_function(self, node):
+        name = self._qualified(node.name)
+        self.functions.append(name)
+        self.call_graph.setdefault(name, set())
+        for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+            if isinstance(default, (ast.List, ast.Dict, ast.Set)):
+                self._finding(default.lineno, "W0102", f"Mutable default argument in '{name}'")
+        for child in node.decorator_list + node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+            self.visit(child)
+        for arg in node.args.args + node.args.kwonlyargs + node.args.posonlyargs:
+            if arg.annotation is not None:
+                self.visit(arg.annotation)
+        if node.returns is not None:
+            self.visit(node.returns)
+        self._scope.append(node.name)
+        self._function_scope.append(name)
+        for child in node.body:
+            self.visit(child)
+        self._function_scope.pop()
+        self._scope.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_Call(self, node: ast.Call):
+        name = _call_name(node.func)
+        if name:
+            scope = self._function_scope[-1] if self._function_scope else MODULE_SCOPE
+            self.call_graph[scope].add(name)
+        self.generic_visit(node)
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load):
+            self._used.add(node.id)
+
+    def visit_Assign(self, node: ast.Assign):
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id == "__all__" and isinstance(node.value, (ast.List, ast.Tuple)):
+                self._exported.update(
+                    elt.value for elt in node.value.elts if isinstance(elt, ast.Constant) and isinstance(elt.value, str)
+                )
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler):
+        if node.type is None:
+            self._finding(node.lineno, "E722", "Bare except clause detected - use specific exceptions")
+        self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare):
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.Eq, ast.NotEq)) and isinstance(comparator, ast.Constant) and comparator.value is None:
+                self._finding(node.lineno, "E711", "Comparison to None should use 'is' / 'is not'")
+        self.generic_visit(node)
+
+def _call_name(func: ast.AST) -> Optional[str]:
+    parts = []
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if isinstance(func, ast.Name):
+        parts.append(func.id)
+        return ".".join(reversed(parts))
+    return ".".join(reversed(parts)) if parts else None
+
+class LanguagePlugin(abc.ABC):
+    name = ""
+    extensions: Tuple[str, ...] = ()
+
+    @abc.abstractmethod
+    def analyze(self, code: str, result: Dict):
+        raise NotImplementedError
+
+    def fill(self, result: Dict, imports: List[str], functions: List[str], classes: List[str], call_graph: Dict[str, set], findings: List[Dict]):
+        for error in result["syntax_errors"]:
+            findings.append({"line": error["line"], "code": "syntax", "message": error["message"]})
+        findings.sort(key=lambda f: f["line"])
+        result["imports"] = imports
+        result["functions"] = functions
+        result["classes"] = classes
+        result["call_graph"] = {name: sorted(calls) for name, calls in call_graph.items() if calls}
+        result["findings"] = findings
+        result["potential_issues"].extend(f"Line {f['line']}: {f['message']}" for f in findings)
+
+class PythonPlugin(LanguagePlugin):
+    name = "python"
+    extensions = (".py", ".pyi")
+
+    def analyze(self, code: str, result: Dict):
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            error = {"line": e.lineno or 0, "column": e.offset or 0, "message": e.msg}
+            result["syntax_errors"].append(error)
+            result["findings"].append({"line": error["line"], "code": "E999", "message": f"SyntaxError: {e.msg}"})
+            result["potential_issues"].append(f"Syntax error on line {error['line']}: {e.msg}")
+            return
+
+        visitor = _PythonVisitor()
+        visitor.visit(tree)
+        visitor.finish()
+        self.fill(result, visitor.imports, visitor.functions, visitor.classes, visitor.call_graph, visitor.findings)
+
+class JavaScriptPlugin(LanguagePlugin):
+    name = "javascript"
+    extensions = (".js", ".jsx", ".mjs", ".cjs")
+    class_keywords = ("class",)
+    flag_any = False
+
+    def tokenize(self, code: str, result: Dict) -> List[tuple]:
+        tokens: List[tuple] = []
+        line = 1
+        pos = 0
+        while pos < len(code):
+            prev = tokens[-1] if tokens else None
+            if code[pos] in "/<" and _expression_start(prev):
+                if code[pos] == "/":
+                    literal = JS_REGEX.match(code, pos)
+                    end = literal.end() if literal is not None else None
+                    kind = "regex"
+                else:
+                    end = _skip_jsx(code, pos)
+                    kind = "jsx"
+                if end is not None:
+                    value = code[pos:end]
+                    tokens.append((kind, value, line))
+                    line += value.count("\n")
+                    pos = end
+                    continue
+            match = JS_TOKEN.match(code, pos)
+            kind = match.lastgroup
+            value = match.group()
+            if kind == "open_comment":
+                result["syntax_errors"].append({"line": line, "column": 0, "message": "Unterminated block comment"})
+                break
+            if kind == "other" and value in "\"'`":
+                result["syntax_errors"].append({"line": line, "column": 0, "message": "Unterminated string literal"})
+            elif kind not in ("comment", "space", "newline"):
+                tokens.append((kind, value, line))
+            line += value.count("\n")
+            pos = match.end()
+        return tokens
+
+    def analyze(self, code: str, result: Dict):
+        tokens = self.tokenize(code, result)
+
+        imports, functions, classes, findings = [], [], [], []
+        call_graph: Dict[str, set] = {MODULE_SCOPE: set()}
+        brackets: List[tuple] = []
+        scopes: List[tuple] = []
+        class_scopes: List[tuple] = []
+        pending_scope: Optional[str] = None
+        pending_class: Optional[str] = None
+        awaiting_module = False
+
+        for index, (kind, value, line) in enumerate(tokens):
+            prev = tokens[index - 1][1] if index > 0 else None
+            nxt = tokens[index + 1][1] if index + 1 < len(tokens) else None
+
+            if kind == "string":
+                if awaiting_module:
+                    imports.append(value[1:-1])
+                    awaiting_module = False
+                elif prev == "(" and index > 1 and tokens[index - 2][1] == "require":
+                    imports.append(value[1:-1])
+                continue
+
+            if kind == "ident":
+                if value == "import" and nxt != "(":
+                    awaiting_module = True
+                elif value == "function" and nxt and tokens[index + 1][0] == "ident":
+                    functions.append(nxt)
+                    pending_scope = nxt
+                elif value in self.class_keywords and nxt and tokens[index + 1][0] == "ident":
+                    classes.append(nxt)
+                    pending_class = nxt
+                elif value == "var":
+                    findings.append({"line": line, "code": "no-var", "message": "Use let/const instead of var"})
+                elif value == "debugger":
+                    findings.append({"line": line, "code": "no-debugger", "message": "debugger statement left in code"})
+                elif prev in ("const", "let", "var") and nxt == "=" and index + 2 < len(tokens):
+                    after = tokens[index + 2][1]
+                    after_next = tokens[index + 3][1] if index + 3 < len(tokens) else None
+                    if after in ("function", "async", "(") or (tokens[index + 2][0] == "ident" and after_next == "=>"):
+                        functions.append(value)
+                        pending_scope = value
+                elif nxt == "(" and value not in JS_KEYWORDS and prev not in ("function", "."):
+                    if class_scopes and len(brackets) == class_scopes[-1][1] and prev != "new":
+                        name = f"{class_scopes[-1][0]}.{value}"
+                        functions.append(name)
+                        pending_scope = name
+                    else:
+                        scope = scopes[-1][0] if scopes else MODULE_SCOPE
+                        call_graph.setdefault(scope, set()).add(value)
+                        if value == "eval":
+                            findings.append({"line": line, "code": "no-eval", "message": "eval() is unsafe"})
+                continue
+
+            if kind != "op":
+                continue
+            if value == ":" and self.flag_any and nxt == "any":
+                findings.append({"line": line, "code": "no-explicit-any", "message": "Avoid the 'any' type"})
+            elif value in ("==", "!="):
+                findings.append({"line": line, "code": "eqeqeq", "message": f"Use strict equality instead of '{value}'"})
+            elif value == ";":
+                awaiting_module = False
+            elif value in JS_BRACKETS:
+                brackets.append((value, line))
+                if value == "{" and pending_class is not None:
+                    class_scopes.append((pending_class, len(brackets)))
+                    pending_class = None
+                elif value == "{" and pending_scope is not None:
+                    scopes.append((pending_scope, len(brackets)))
+                    call_graph.setdefault(pending_scope, set())
+                    pending_scope = None
+            elif value in (")", "]", "}"):
+                if not brackets or JS_BRACKETS[brackets[-1][0]] != value:
+                    result["syntax_errors"].append({"line": line, "column": 0, "message": f"Unexpected '{value}'"})
+                    continue
+                depth = len(brackets)
+                brackets.pop()
+                if scopes and scopes[-1][1] == depth:
+                    scopes.pop()
+                if class_scopes and class_scopes[-1][1] == depth:
+                    class_scopes.pop()
+
+        for bracket, line in brackets:
+            result["syntax_errors"].append({"line": line, "column": 0, "message": f"Unclosed '{bracket}'"})
+
+        self.fill(result, imports, functions, classes, call_graph, findings)
+
+class TypeScriptPlugin(JavaScriptPlugin):
+    name = "typescript"
+    extensions = (".ts", ".tsx", ".mts", ".cts")
+    class_keywords = ("class", "interface", "enum")
+    flag_any = True
+
+class PatternPlugin(LanguagePlugin):
+    skip_patterns: Tuple[str, ...] = ()
+    patterns: Dict[str, Tuple[str, ...]] = {}
+    lint_rules: Dict[str, Tuple[str, str]] = {}
+    check_brackets = True
+
+    def __init__(self):
+        alternatives = []
+        self._kinds: Dict[str, Tuple[str, int]] = {}
+        group = 0
+        rules = [("skip", pattern) for pattern in self.skip_patterns]
+        rules += [(kind, pattern) for kind, kind_patterns in self.patterns.items() for pattern in kind_patterns]
+        rules += [(f"lint:{code}", pattern) for code, (pattern, _) in self.lint_rules.items()]
+        for index, (kind, pattern) in enumerate(rules):
+            label = f"r{index}"
+            groups = re.compile(pattern).groups
+            group += 1
+            self._kinds[label] = (kind, group + 1 if groups else group)
+            group += groups
+            alternatives.append(f"(?P<{label}>{pattern})")
+        self.scanner = re.compile("|".join(alternatives), re.MULTILINE | re.DOTALL)
+
+    def analyze(self, code: str, result: Dict):
+        collected: Dict[str, List[str]] = {"imports": [], "functions": [], "classes": []}
+        findings: List[Dict] = []
+        depth = {opening: 0 for opening in JS_BRACKETS}
+        opened_at = {opening: 0 for opening in JS_BRACKETS}
+        line, position = 1, 0
+
+        for match in self.scanner.finditer(code):
+            start = match.start()
+            if self.check_brackets:
+                self._balance(code[position:start], line, depth, opened_at, result)
+            line += code.count("\n", position, start)
+            position = match.end()
+            kind, group = self._kinds[match.lastgroup]
+            if kind != "skip":
+                if kind.startswith("lint:"):
+                    code_name = kind[5:]
+                    findings.append({"line": line, "code": code_name, "message": self.lint_rules[code_name][1]})
+                else:
+                    collected[kind].extend(self.names(kind, match.group(group)))
+                if self.check_brackets:
+                    self._balance(match.group(), line, depth, opened_at, result)
+            line += code.count("\n", start, position)
+
+        if self.check_brackets:
+            self._balance(code[position:], line, depth, opened_at, result)
+            for opening, count in depth.items():
+                if count > 0:
+                    result["syntax_errors"].append({"line": opened_at[opening], "column": 0, "message": f"Unclosed '{opening}'"})
+
+        self.fill(result, collected["imports"], collected["functions"], collected["classes"], {}, findings)
+
+    def names(self, kind: str, value: str) -> List[str]:
+        return [value.strip()]
+
+    def _balance(self, text: str, line: int, depth: Dict[str, int], opened_at: Dict[str, int], result: Dict):
+        for opening, closing in JS_BRACKETS.items():
+            opened = text.count(opening)
+            closed = text.count(closing)
+            if not opened and not closed:
+                continue
+            if depth[opening] == 0 and opened:
+                opened_at[opening] = line + text.count("\n", 0, text.index(opening))
+            depth[opening] += opened - closed
+            if depth[opening] < 0:
+                result["syntax_errors"].append({"line": line + text.count("\n"), "column": 0, "message": f"Unexpected '{closing}'"})
+                depth[opening] = 0
+
+class GoPlugin(PatternPlugin):
+    name = "go"
+    extensions = (".go",)
+    skip_patterns = (r"//[^\n]*", r"/\*.*?\*/", r'"(?:\\.|[^"\\\n])*"', r"`[^`]*`", r"'(?:\\.|[^'\\\n])+'")
+    patterns = {
+        "imports": (r"^import\s*\(([^)]*)\)", r'^import\s+(?:[\w.]+\s+)?"([^"]+)"'),
+        "functions": (r"^func\s+(?:\([^)]*\)\s*)?(\w+)",),
+        "classes": (r"^type\s+(\w+)\s+(?:struct|interface)\b",),
+    }
+    lint_rules = {
+        "ignored-error": (r"\b_\s*=\s*\w+(?:\.\w+)*\(", "Return value discarded with '_ =' - handle the error"),
+        "panic": (r"\bpanic\(", "panic() call - return an error instead"),
+    }
+
+    def names(self, kind: str, value: str) -> List[str]:
+        if kind == "imports" and '"' in value:
+            return re.findall(r'"([^"]+)"', value)
+        return [value.strip()]
+
+class RustPlugin(PatternPlugin):
+    name = "rust"
+    extensions = (".rs",)
+    skip_patterns = (r"//[^\n]*", r"/\*.*?\*/", r'b?r#*"[^"]*"#*', r'b?"(?:\\.|[^"\\])*"', r"b?'(?:\\.|[^'\\\n])'")
+    patterns = {
+        "imports": (r"^\s*(?:pub\s+)?use\s+([^;]+);", r"^\s*extern\s+crate\s+(\w+)"),
+        "functions": (r"\bfn\s+(\w+)",),
+        "classes": (r"\b(?:struct|enum|trait)\s+(\w+)",),
+    }
+    lint_rules = {
+        "unwrap": (r"\.unwrap\(\)", "unwrap() may panic - propagate the error with '?'"),
+        "unsafe": (r"\bunsafe\s*\{", "unsafe block"),
+        "todo": (r"\b(?:todo|unimplemented)!", "Unfinished code (todo!/unimplemented!)"),
+    }
+
+    def names(self, kind: str, value: str) -> List[str]:
+        return [" ".join(value.split())]
+
+_registry: Dict[str, LanguagePlugin] = {}
+_extensions: Dict[str, str] = {}
+_registry_lock = threading.Lock()
+
+def register_language(plugin: LanguagePlugin) -> LanguagePlugin:
+    with _registry_lock:
+        _registry[plugin.name] = plugin
+        for extension in plugin.extensions:
+            _extensions[extension] = plugin.name
+    return plugin
+
+def get_language(name: str) -> Optional[LanguagePlugin]:
+    return _registry.get(name)
+
+def language_for_filename(filename: str) -> Optional[str]:
+    basename = filename.rsplit("/", 1)[-1]
+    if "." not in basename:
+        return None
+    return _extensions.get(basename[basename.rindex("."):])
+
+def registered_languages() -> List[str]:
+    return sorted(_registry)
+
+for _plugin in (PythonPlugin(), JavaScriptPlugin(), TypeScriptPlugin(), GoPlugin(), RustPlugin()):
+    register_language(_plugin)
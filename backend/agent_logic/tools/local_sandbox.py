@@ -0,0 +1,428 @@
+import atexit
+import hashlib
+import json
+import os
+import pwd
+import selectors
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .executor_backend import ExecutorBackend
+from .telemetry import SANDBOX_STEP_SECONDS, span, traced
+from .test_results import JUNIT_PATH, MAX_JUNIT_BYTES, parse_junit, find_test_files
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RUNNER_PATH = str(Path(__file__).with_name("sandbox_runner.py"))
+PRELOAD_MODULES = ("pytest", "_pytest.assertion.rewrite", "_pytest.python", "_pytest.terminal", "json", "unittest")
+TIMEOUT_EXIT_CODE = 124
+READ_CHUNK = 64 * 1024
+
+def env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+def resolve_user(spec: str) -> Optional[Tuple[int, int]]:
+    if not spec:
+        return None
+    name, _, group = spec.partition(":")
+    if name.isdigit():
+        uid = int(name)
+        gid = int(group) if group else uid
+    else:
+        entry = pwd.getpwnam(name)
+        uid, gid = entry.pw_uid, int(group) if group else entry.pw_gid
+    return uid, gid
+
+class WarmInterpreter:
+    def __init__(self, process: subprocess.Popen, status_fd: Optional[int], warm: bool):
+        self.process = process
+        self.status_fd = status_fd
+        self.warm = warm
+        self.created_at = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def start(self, job: Dict):
+        self.process.stdin.write((json.dumps(job) + "\n").encode("utf-8"))
+        self.process.stdin.close()
+
+    def read_status(self) -> Dict:
+        if self.status_fd is None:
+            return {}
+        fd, self.status_fd = self.status_fd, None
+        try:
+            with os.fdopen(fd, "rb") as handle:
+                return json.loads(handle.read() or b"{}")
+        except (OSError, ValueError):
+            return {}
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def close(self):
+        self.kill()
+        for pipe in (self.process.stdin, self.process.stdout, self.process.stderr):
+            try:
+                pipe.close()
+            except (OSError, ValueError):
+                pass
+        if self.status_fd is not None:
+            os.close(self.status_fd)
+            self.status_fd = None
+        self.process.wait()
+
+class InterpreterPool:
+    def __init__(self, size: int = 2, preload: tuple = PRELOAD_MODULES, root: Optional[str] = None):
+        self.size = size
+        self.preload = preload
+        self.root = root or tempfile.gettempdir()
+        self._idle: List[WarmInterpreter] = []
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._closed = False
+        self._stats = {"spawned": 0, "warm_hits": 0, "cold_starts": 0}
+        self._refiller: Optional[threading.Thread] = None
+
+    def acquire(self) -> WarmInterpreter:
+        interpreter = None
+        with self._lock:
+            while self._idle and interpreter is None:
+                candidate = self._idle.pop(0)
+                if candidate.alive:
+                    interpreter = candidate
+                else:
+                    candidate.close()
+            self._stats["warm_hits" if interpreter is not None else "cold_starts"] += 1
+        self.warm()
+        return interpreter or self._spawn(warm=False)
+
+    def warm(self):
+        if self.size <= 0 or self._closed:
+            return
+        with self._lock:
+            if self._refiller is None:
+                self._refiller = threading.Thread(target=self._refill_loop, name="sandbox-interpreters", daemon=True)
+                self._refiller.start()
+        self._wanted.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, idle=len(self._idle), size=self.size)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        self._wanted.set()
+        for interpreter in idle:
+            interpreter.close()
+
+    def _refill_loop(self):
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            while True:
+                with self._lock:
+                    if self._closed or len(self._idle) >= self.size:
+                        break
+                try:
+                    interpreter = self._spawn(warm=True)
+                except OSError as e:
+                    logger.warning(f"Could not start a warm sandbox interpreter: {str(e)}")
+                    break
+                with self._lock:
+                    if self._closed:
+                        interpreter.close()
+                        return
+                    self._idle.append(interpreter)
+            if self._closed:
+                return
+
+    def _spawn(self, warm: bool) -> WarmInterpreter:
+        read_fd, write_fd = os.pipe()
+        try:
+            process = subprocess.Popen(
+                [sys.executable, "-I", "-B", "-u", RUNNER_PATH, str(write_fd), *(self.preload if warm else ())],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=self.root,
+                env={"PATH": os.getenv("PATH", "/usr/local/bin:/usr/bin:/bin"), "HOME": self.root, "TMPDIR": self.root, "LANG": "C.UTF-8"},
+                pass_fds=(write_fd,),
+                start_new_session=True
+            )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        with self._lock:
+            self._stats["spawned"] += 1
+        return WarmInterpreter(process, read_fd, warm)
+
+class LocalWorkspace:
+    def __init__(self, task_id: str, path: Path):
+        self.task_id = task_id
+        self.path = path
+        self.manifest: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+class LocalSandboxExecutor(ExecutorBackend):
+    name = "local"
+    languages = ("python",)
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        isolate_network: Optional[bool] = None,
+        require_network_isolation: Optional[bool] = None,
+        private_root: Optional[bool] = None,
+        user: Optional[str] = None
+    ):
+        super().__init__()
+        self.root = Path(root or os.getenv("LOCAL_SANDBOX_ROOT") or Path(tempfile.gettempdir()) / "opendev-sandbox")
+        self.root.mkdir(parents=True, exist_ok=True)
+        if isolate_network is None:
+            isolate_network = env_flag("LOCAL_SANDBOX_ISOLATE_NETWORK", "true")
+        if require_network_isolation is None:
+            require_network_isolation = env_flag("LOCAL_SANDBOX_REQUIRE_NETNS", "true")
+        if private_root is None:
+            private_root = env_flag("LOCAL_SANDBOX_PRIVATE_ROOT", "true")
+        if user is None:
+            user = os.getenv("LOCAL_SANDBOX_USER", "65534:65534")
+        self.isolate_network = isolate_network
+        self.require_network_isolation = isolate_network and require_network_isolation
+        self.private_root = private_root
+        self.user = resolve_user(user)
+        self.limits = {
+            "cpu_seconds": int(os.getenv("LOCAL_SANDBOX_CPU_SECONDS", "60")),
+            "memory_bytes": int(os.getenv("LOCAL_SANDBOX_MEMORY_MB", "2048")) * 1024 * 1024,
+            "file_size_bytes": int(os.getenv("LOCAL_SANDBOX_FILE_SIZE_MB", "64")) * 1024 * 1024,
+            "processes": int(os.getenv("LOCAL_SANDBOX_NPROC", "256")),
+            "open_files": int(os.getenv("LOCAL_SANDBOX_NOFILE", "256")),
+        }
+        if pool_size is None:
+            pool_size = int(os.getenv("LOCAL_SANDBOX_POOL_SIZE", "2"))
+        self.pool = InterpreterPool(size=pool_size, root=str(self.root))
+        self._workspaces: Dict[str, LocalWorkspace] = {}
+        self._workspaces_lock = threading.Lock()
+        self._isolation: Dict = {}
+        atexit.register(self.shutdown)
+
+    def warm(self):
+        self.pool.warm()
+
+    def prepare(self, task_id: str, language: str, files: Optional[Dict[str, str]] = None) -> Future:
+        self._workspace(task_id)
+        self.pool.warm()
+        return self._done()
+
+    def stage_file(self, task_id: str, language: str, filename: str, content: str) -> Future:
+        workspace = self._workspace(task_id)
+        with workspace.lock:
+            try:
+                if self._write_file(workspace, filename, content, hashlib.sha256(content.encode("utf-8")).hexdigest()):
+                    logger.info(f"[{task_id}] Staged {filename} into local sandbox")
+            except (OSError, ValueError) as e:
+                logger.warning(f"[{task_id}] Could not stage {filename}: {str(e)}")
+        return self._done()
+
+    def execute(
+        self,
+        code_artifacts: Dict,
+        language: str,
+        timeout: int = 60,
+        task_id: str = "unknown",
+        keep_workspace: bool = False,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        tests: Optional[List[str]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict:
+        workspace = self._workspace(task_id)
+        with workspace.lock, span("sandbox.execute", task_id=task_id, language=language, backend=self.name):
+            try:
+                if cancel_event is not None and cancel_event.is_set():
+                    return self._cancelled()
+                files = self._collect_files(code_artifacts)
+                self._sync_directory(workspace, files, code_artifacts.get("hashes") or {})
+                with span("sandbox.container_start", SANDBOX_STEP_SECONDS, step="container_start", image="local"):
+                    interpreter = self.pool.acquire()
+                report = workspace.path / JUNIT_PATH
+                report.unlink(missing_ok=True)
+                result = self._run(interpreter, workspace, timeout, task_id, on_output, tests or find_test_files(files), cancel_event)
+                result["warm_interpreter"] = interpreter.warm
+                if result["status"] == "cancelled":
+                    result["tests"] = None
+                elif report.is_file() and report.stat().st_size <= MAX_JUNIT_BYTES:
+                    result["tests"] = parse_junit(report.read_bytes(), files)
+                else:
+                    result["tests"] = None
+                return result
+            except Exception as e:
+                logger.error(f"[{task_id}] Local sandbox execution error: {str(e)}")
+                return self._error(str(e))
+            finally:
+                if not keep_workspace:
+                    self._release_workspace(workspace)
+
+    def release(self, task_id: str):
+        with self._workspaces_lock:
+            workspace = self._workspaces.get(task_id)
+        if workspace is not None:
+            with workspace.lock:
+                self._release_workspace(workspace)
+
+    def shutdown(self):
+        self.pool.shutdown()
+
+    def stats(self) -> Dict:
+        with self._workspaces_lock:
+            workspaces = len(self._workspaces)
+        return {
+            "workspaces": workspaces,
+            "network_isolated": self._isolation.get("network_isolated"),
+            "private_root": self._isolation.get("private_root"),
+            "sandbox_uid": self._isolation.get("uid"),
+            "interpreters": self.pool.stats(),
+        }
+
+    def _run(
+        self,
+        interpreter: WarmInterpreter,
+        workspace: LocalWorkspace,
+        timeout: int,
+        task_id: str,
+        on_output: Optional[Callable[[str, str], None]],
+        tests: Optional[List[str]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict:
+        timed_out = threading.Event()
+        cancelled = threading.Event()
+
+        def kill_run():
+            timed_out.set()
+            logger.warning(f"[{task_id}] Local sandbox run exceeded {timeout}s, killing it")
+            interpreter.kill()
+
+        def cancel_run():
+            cancelled.set()
+            logger.info(f"[{task_id}] Local sandbox run cancelled, killing it")
+            interpreter.kill()
+
+        logger.info(f"[{task_id}] Running tests in {'warm' if interpreter.warm else 'cold'} interpreter {interpreter.process.pid}")
+        with span("sandbox.run", SANDBOX_STEP_SECONDS, step="run", task_id=task_id):
+            watchdog = threading.Timer(timeout, kill_run)
+            watchdog.daemon = True
+            try:
+                interpreter.start({
+                    "cwd": str(workspace.path),
+                    "limits": dict(self.limits, cpu_seconds=min(self.limits["cpu_seconds"], timeout)),
+                    "isolate_network": self.isolate_network,
+                    "require_network_isolation": self.require_network_isolation,
+                    "private_root": self.private_root,
+                    "user": self.user,
+                    "junit_path": JUNIT_PATH,
+                    "tests": list(tests or []),
+                })
+                watchdog.start()
+                stop_watching = self._watch_cancel(cancel_event, cancel_run)
+                try:
+                    stdout, stderr = self._collect_output(self._stream(interpreter), on_output)
+                finally:
+                    stop_watching()
+                returncode = interpreter.process.wait()
+            finally:
+                watchdog.cancel()
+                interpreter.kill()
+                status = interpreter.read_status()
+                interpreter.close()
+
+        if "network_isolated" in status and not self._isolation:
+            self._isolation = status
+            if self.isolate_network and not status["network_isolated"]:
+                logger.warning("Local sandbox cannot create a network namespace here"
+                               + (", runs are refused" if self.require_network_isolation else ", runs keep host network access"))
+            if self.private_root and not status["private_root"]:
+                logger.warning(f"Local sandbox cannot set up a private root here, runs are refused: {status.get('error', 'namespaces are not permitted')}")
+        exit_code = returncode if returncode >= 0 else 128 - returncode
+        if cancelled.is_set():
+            return self._cancelled(stdout, stderr)
+        if timed_out.is_set():
+            return self._result(TIMEOUT_EXIT_CODE, stdout, stderr, timeout=timeout)
+        return self._result(exit_code, stdout, stderr)
+
+    def _stream(self, interpreter: WarmInterpreter):
+        process = interpreter.process
+        selector = selectors.DefaultSelector()
+        selector.register(process.stdout, selectors.EVENT_READ, 0)
+        selector.register(process.stderr, selectors.EVENT_READ, 1)
+        try:
+            while selector.get_map():
+                events = selector.select(timeout=0.1)
+                if not events and process.poll() is not None:
+                    interpreter.kill()
+                for key, _ in events:
+                    chunk = os.read(key.fd, READ_CHUNK)
+                    if not chunk:
+                        selector.unregister(key.fileobj)
+                    elif key.data == 0:
+                        yield chunk, None
+                    else:
+                        yield None, chunk
+        finally:
+            selector.close()
+
+    def _workspace(self, task_id: str) -> LocalWorkspace:
+        with self._workspaces_lock:
+            workspace = self._workspaces.get(task_id)
+            if workspace is None:
+                path = Path(tempfile.mkdtemp(prefix=f"{Path(task_id).name[:40]}-", dir=self.root))
+                workspace = LocalWorkspace(task_id, path)
+                self._workspaces[task_id] = workspace
+            return workspace
+
+    @traced("sandbox.write_files", SANDBOX_STEP_SECONDS, step="write_files")
+    def _sync_directory(self, workspace: LocalWorkspace, files: Dict[str, str], hashes: Dict[str, str]):
+        manifest = {name: hashes.get(name) or hashlib.sha256(content.encode("utf-8")).hexdigest() for name, content in files.items()}
+        removed = [name for name in workspace.manifest if name not in manifest]
+        for filename in removed:
+            (workspace.path / filename).unlink(missing_ok=True)
+            del workspace.manifest[filename]
+        changed = sum(self._write_file(workspace, name, files[name], digest) for name, digest in manifest.items())
+        logger.info(f"[{workspace.task_id}] Synced local sandbox: {changed} changed, {len(removed)} removed, "
+                    f"{len(files) - changed} unchanged")
+
+    def _write_file(self, workspace: LocalWorkspace, filename: str, content: str, digest: str) -> bool:
+        if workspace.manifest.get(filename) == digest:
+            return False
+        target = (workspace.path / filename).resolve()
+        if workspace.path.resolve() not in target.parents:
+            raise ValueError(f"Refusing to write {filename} outside the sandbox directory")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content)
+        workspace.manifest[filename] = digest
+        return True
+
+    @traced("sandbox.cleanup", SANDBOX_STEP_SECONDS, step="cleanup")
+    def _release_workspace(self, workspace: LocalWorkspace):
+        with self._workspaces_lock:
+            if self._workspaces.get(workspace.task_id) is workspace:
+                del self._workspaces[workspace.task_id]
+        shutil.rmtree(workspace.path, ignore_errors=True)
+        workspace.manifest = {}
@@ -0,0 +1,111 @@
+import codecs
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+
+TRUNCATION_MARKER = "…[truncated]"
+
+class BoundedOutput:
+    def __init__(self, head_bytes: int = 64 * 1024, tail_bytes: int = 192 * 1024):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self._head = bytearray()
+        self._tail: deque = deque()
+        self._tail_size = 0
+        self.total_bytes = 0
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        self.total_bytes += len(data)
+        room = self.head_bytes - len(self._head)
+        if room > 0:
+            self._head.extend(data[:room])
+            data = data[room:]
+        if not data or self.tail_bytes <= 0:
+            return
+        if len(data) >= self.tail_bytes:
+            self._tail.clear()
+            self._tail.append(bytes(data[-self.tail_bytes:]))
+            self._tail_size = self.tail_bytes
+            return
+        self._tail.append(bytes(data))
+        self._tail_size += len(data)
+        while self._tail_size > self.tail_bytes:
+            excess = self._tail_size - self.tail_bytes
+            oldest = self._tail[0]
+            if len(oldest) <= excess:
+                self._tail.popleft()
+                self._tail_size -= len(oldest)
+            else:
+                self._tail[0] = oldest[excess:]
+                self._tail_size -= excess
+
+    @property
+    def truncated_bytes(self) -> int:
+        return self.total_bytes - len(self._head) - self._tail_size
+
+    @property
+    def truncated(self) -> bool:
+        return self.truncated_bytes > 0
+
+    def text(self) -> str:
+        head = bytes(self._head).decode("utf-8", errors="replace")
+        tail = b"".join(self._tail).decode("utf-8", errors="replace")
+        if self.truncated:
+            return f"{head}\n... [{self.truncated_bytes} bytes truncated] ...\n{tail}"
+        return head + tail
+
+class LineForwarder:
+    def __init__(self, callback: Optional[Callable[[str, str], None]], max_lines: int = 500, max_line_length: int = 1000):
+        self.callback = callback
+        self.max_lines = max_lines
+        self.max_line_length = max_line_length
+        self.forwarded = 0
+        self.dropped = 0
+        self._partial: Dict[str, str] = {}
+        self._truncated: Dict[str, bool] = {}
+        self._decoders: Dict[str, codecs.IncrementalDecoder] = {}
+        self._lock = threading.Lock()
+
+    def write(self, stream: str, data: bytes):
+        if self.callback is None or not data:
+            return
+        with self._lock:
+            decoder = self._decoders.get(stream)
+            if decoder is None:
+                decoder = self._decoders[stream] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            text = self._partial.get(stream, "") + decoder.decode(data)
+            lines = text.split("\n")
+            rest = lines.pop()
+            truncated = self._truncated.get(stream, False)
+            for line in lines:
+                self._emit(stream, line, truncated)
+                truncated = False
+            if len(rest) > self.max_line_length:
+                rest, truncated = rest[:self.max_line_length], True
+            self._partial[stream] = rest
+            self._truncated[stream] = truncated
+
+    def close(self):
+        if self.callback is None:
+            return
+        with self._lock:
+            for stream, decoder in self._decoders.items():
+                rest = self._partial.get(stream, "") + decoder.decode(b"", final=True)
+                if rest:
+                    self._emit(stream, rest, self._truncated.get(stream, False))
+            self._partial.clear()
+            self._truncated.clear()
+            self._decoders.clear()
+            if self.dropped:
+                self.callback("sandbox", f"... {self.dropped} more output lines not forwarded")
+
+    def _emit(self, stream: str, line: str, truncated: bool = False):
+        if self.forwarded >= self.max_lines:
+            self.dropped += 1
+            return
+        self.forwarded += 1
+        if truncated or len(line) > self.max_line_length:
+            line = line[:self.max_line_length] + TRUNCATION_MARKER
+        self.callback(stream, line)
@@ -1,46 +1,466 @@
 import docker
+import hashlib
 import os
 import json
+import shlex
 import logging
 import tempfile
 import shutil
-from typing import Dict, Optional
-from pathlib import Path
+import io
+import tarfile
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from pathlib import Path, PurePosixPath
+from .container_pool import ContainerPool, PoolExhaustedError, SANDBOX_ROOT, SANDBOX_USER, get_shared_pool
+from .dependency_cache import DependencyCache, DEPENDENCY_FILES, DEPS_ROOT, get_dependency_cache
+from .executor_backend import ExecutorBackend
+from .telemetry import SANDBOX_STEP_SECONDS, span, traced
+from .test_results import JUNIT_PATH, MAX_JUNIT_BYTES, parse_junit, find_test_files
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SandboxExecutor:
-    def __init__(self, image_name: str = "opendev-sandbox:python"):
+TIMEOUT_EXIT_CODE = 124
+KILL_GRACE_SECONDS = 5
+
+def archive_owner(user: str) -> Dict:
+    name, _, group = user.partition(":")
+    owner = {}
+    for id_field, name_field, value in (("uid", "uname", name), ("gid", "gname", group or name)):
+        if value.isdigit():
+            owner[id_field] = int(value)
+        else:
+            owner[name_field] = value
+    return owner
+
+def owned(info: tarfile.TarInfo, owner: Dict) -> tarfile.TarInfo:
+    for field, value in owner.items():
+        setattr(info, field, value)
+    return info
+
+class SandboxWorkspace:
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.manifest: Dict[str, str] = {}
+        self.pooled = None
+        self.image: Optional[str] = None
+        self.task_dir: Optional[Path] = None
+        self.healthy = True
+        self.released = False
+        self.lock = threading.Lock()
+        self.pending: List[Future] = []
+        self.pending_lock = threading.Lock()
+        self.staged_versions: Dict[str, int] = {}
+        self.dependency_files: Dict[str, str] = {}
+        self.prepare_seconds = 0.0
+
+class SandboxExecutor(ExecutorBackend):
+    name = "docker"
+
+    def __init__(
+        self,
+        image_name: str = "opendev-sandbox:python",
+        container_pool: Optional[ContainerPool] = None,
+        use_pool: Optional[bool] = None,
+        dependency_cache: Optional[DependencyCache] = None
+    ):
+        super().__init__()
         self.docker_client = docker.from_env()
         self.image_name = image_name
+        self.language_images = {
+            "python": image_name,
+            "javascript": image_name,
+            "typescript": image_name,
+        }
+        if use_pool is None:
+            use_pool = int(os.getenv("SANDBOX_POOL_SIZE", "4")) > 0
+        self.container_pool = container_pool or (get_shared_pool(self.docker_client) if use_pool else None)
+        self.dependency_cache = dependency_cache or get_dependency_cache(self.docker_client)
         self.work_dir = Path("/app/work_dir")
         self.work_dir.mkdir(parents=True, exist_ok=True)
+        self._workspaces: Dict[str, SandboxWorkspace] = {}
+        self._workspaces_lock = threading.Lock()
+        self._present_images = set()
+        self._background = ThreadPoolExecutor(
+            max_workers=int(os.getenv("SANDBOX_PREPARE_WORKERS", "4")),
+            thread_name_prefix="sandbox-prepare"
+        )
+    
+    def prepare(self, task_id: str, language: str, files: Optional[Dict[str, str]] = None) -> Future:
+        workspace = self._workspace(task_id)
+        return self._submit(workspace, self._prepare, workspace, language, self.dependency_files(language, files or {}))
+    
+    def stage_file(self, task_id: str, language: str, filename: str, content: str) -> Future:
+        workspace = self._workspace(task_id)
+        with workspace.pending_lock:
+            version = workspace.staged_versions.get(filename, 0) + 1
+            workspace.staged_versions[filename] = version
+            if filename in DEPENDENCY_FILES.get(language, ()):
+                workspace.dependency_files[filename] = content
+                dependency_files = dict(workspace.dependency_files)
+            else:
+                dependency_files = None
+        if dependency_files is not None:
+            self._submit(workspace, self._prepare, workspace, language, dependency_files)
+        return self._submit(workspace, self._stage, workspace, filename, content, version)
+    
+    def shutdown(self):
+        self._background.shutdown(wait=False, cancel_futures=True)
+    
+    def warm(self):
+        self._ensure_image(self.image_name, "warm-up")
+    
+    def stats(self) -> Dict:
+        with self._workspaces_lock:
+            workspaces = len(self._workspaces)
+        return {
+            "workspaces": workspaces,
+            "pool": self.container_pool.stats() if self.container_pool is not None else None
+        }
     
     def execute(
         self,
         code_artifacts: Dict,
         language: str,
         timeout: int = 60,
-        task_id: str = "unknown"
+        task_id: str = "unknown",
+        keep_workspace: bool = False,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        tests: Optional[List[str]] = None,
+        cancel_event: Optional[threading.Event] = None
     ) -> Dict:
-        task_dir = self.work_dir / task_id
-        task_dir.mkdir(parents=True, exist_ok=True)
+        workspace = self._workspace(task_id)
+        prepare_wait = self._await_pending(workspace)
         
-        try:
-            self._write_files(task_dir, code_artifacts)
+        files = self._collect_files(code_artifacts)
+        image, deps_ready = self._resolve_image(language, files, task_id)
+        if language == "python" and not tests:
+            tests = find_test_files(files)
+        
+        with workspace.lock, span("sandbox.execute", task_id=task_id, language=language):
+            try:
+                if cancel_event is not None and cancel_event.is_set():
+                    return self._cancelled()
+                hashes = code_artifacts.get("hashes") or {}
+                
+                if self.container_pool is not None:
+                    result = self._execute_pooled(
+                        workspace, files, hashes, language, timeout, task_id, image, deps_ready, on_output, tests, cancel_event
+                    )
+                else:
+                    self._sync_directory(workspace, files, hashes, task_id)
+                    result = self._run_in_container(
+                        task_dir=str(workspace.task_dir),
+                        language=language,
+                        timeout=timeout,
+                        task_id=task_id,
+                        image=image,
+                        deps_ready=deps_ready,
+                        on_output=on_output,
+                        tests=tests,
+                        cancel_event=cancel_event
+                    )
+                if language == "python" and result.get("status") != "cancelled":
+                    result["tests"] = parse_junit(self._read_report(workspace, task_id), files)
+                if prepare_wait is not None:
+                    result["prepare_seconds"] = round(workspace.prepare_seconds, 3)
+                    result["prepare_wait_seconds"] = round(prepare_wait, 3)
+                return result
             
-            result = self._run_in_container(
-                task_dir=str(task_dir),
-                language=language,
-                timeout=timeout,
-                task_id=task_id
-            )
+            except Exception as e:
+                workspace.healthy = False
+                logger.error(f"[{task_id}] Sandbox execution error: {str(e)}")
+                return {
+                    "status": "error",
+                    "exit_code": 1,
+                    "stdout": "",
+                    "stderr": str(e),
+                    "error": str(e)
+                }
             
-            return result
+            finally:
+                if not keep_workspace or not workspace.healthy:
+                    self._release_workspace(workspace)
+    
+    def release(self, task_id: str):
+        with self._workspaces_lock:
+            workspace = self._workspaces.get(task_id)
+        if workspace is not None:
+            with workspace.lock:
+                self._release_workspace(workspace)
+    
+    def _submit(self, workspace: SandboxWorkspace, fn, *args) -> Future:
+        chained = Future()
+        
+        def start(_=None):
+            if not chained.set_running_or_notify_cancel():
+                return
+            try:
+                self._background.submit(self._run_chained, chained, fn, *args)
+            except RuntimeError as e:
+                chained.set_exception(e)
         
+        with workspace.pending_lock:
+            tail = workspace.pending[-1] if workspace.pending else None
+            workspace.pending = [f for f in workspace.pending if not f.done()] + [chained]
+        if tail is None:
+            start()
+        else:
+            tail.add_done_callback(start)
+        return chained
+    
+    def _run_chained(self, chained: Future, fn, *args):
+        try:
+            chained.set_result(fn(*args))
         except Exception as e:
-            logger.error(f"[{task_id}] Sandbox execution error: {str(e)}")
+            chained.set_exception(e)
+    
+    def _await_pending(self, workspace: SandboxWorkspace) -> Optional[float]:
+        with workspace.pending_lock:
+            pending, workspace.pending = workspace.pending, []
+        if not pending:
+            return None
+        started = time.monotonic()
+        wait(pending)
+        return time.monotonic() - started
+    
+    @traced("sandbox.prepare", SANDBOX_STEP_SECONDS, step="prepare")
+    def _prepare(self, workspace: SandboxWorkspace, language: str, dependency_files: Dict[str, str]):
+        task_id = workspace.task_id
+        started = time.monotonic()
+        try:
+            base_image = self.language_images.get(language, self.image_name)
+            self._ensure_image(base_image, task_id)
+            image = base_image
+            if dependency_files:
+                image, _ = self._resolve_image(language, dependency_files, task_id)
+            
+            with workspace.lock:
+                if workspace.released:
+                    return
+                if self.container_pool is None:
+                    if workspace.task_dir is None:
+                        workspace.task_dir = self.work_dir / task_id
+                        workspace.task_dir.mkdir(parents=True, exist_ok=True)
+                        workspace.manifest = {}
+                    return
+                if workspace.pooled is not None and workspace.image == image:
+                    return
+                if workspace.pooled is not None:
+                    self.container_pool.release(workspace.pooled, healthy=workspace.healthy)
+                    workspace.pooled = None
+                workspace.pooled = self.container_pool.acquire(image)
+                workspace.image = image
+                workspace.manifest = {}
+                logger.info(f"[{task_id}] Reserved sandbox container {workspace.pooled.id[:12]} ({image}) ahead of execution")
+        except Exception as e:
+            logger.warning(f"[{task_id}] Sandbox preparation failed, will retry at execution: {str(e)}")
+        finally:
+            workspace.prepare_seconds += time.monotonic() - started
+    
+    @traced("sandbox.stage_file", SANDBOX_STEP_SECONDS, step="stage_file")
+    def _stage(self, workspace: SandboxWorkspace, filename: str, content: str, version: int):
+        with workspace.lock:
+            if workspace.released or workspace.staged_versions.get(filename) != version:
+                return
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if workspace.manifest.get(filename) == digest:
+                return
+            try:
+                if self.container_pool is not None:
+                    if workspace.pooled is None:
+                        return
+                    workspace.pooled.container.put_archive(SANDBOX_ROOT, self._build_archive({filename: content}))
+                elif workspace.task_dir is not None:
+                    self._write_files(workspace.task_dir, {"files": {filename: content}})
+                else:
+                    return
+            except docker.errors.APIError as e:
+                logger.warning(f"[{workspace.task_id}] Could not stage {filename}: {str(e)}")
+                return
+            workspace.manifest[filename] = digest
+            logger.info(f"[{workspace.task_id}] Staged {filename} into sandbox")
+    
+    def _ensure_image(self, image: str, task_id: str):
+        if image in self._present_images:
+            return
+        try:
+            self.docker_client.images.get(image)
+        except docker.errors.ImageNotFound:
+            logger.info(f"[{task_id}] Pulling sandbox image {image}")
+            repository, _, tag = image.rpartition(":") if ":" in image.rsplit("/", 1)[-1] else (image, "", "latest")
+            with span("sandbox.image_pull", SANDBOX_STEP_SECONDS, step="image_pull", image=image):
+                self.docker_client.images.pull(repository, tag=tag)
+        self._present_images.add(image)
+    
+    def _resolve_image(self, language: str, files: Dict[str, str], task_id: str):
+        base_image = self.language_images.get(language, self.image_name)
+        if self.dependency_cache is None:
+            return base_image, False
+        try:
+            deps_image = self.dependency_cache.image_for(base_image, language, files, task_id)
+        except Exception as e:
+            logger.warning(f"[{task_id}] Dependency cache unavailable, using {base_image}: {str(e)}")
+            deps_image = None
+        if deps_image is None:
+            return base_image, False
+        return deps_image, True
+    
+    def _workspace(self, task_id: str) -> SandboxWorkspace:
+        with self._workspaces_lock:
+            workspace = self._workspaces.get(task_id)
+            if workspace is None:
+                workspace = SandboxWorkspace(task_id)
+                self._workspaces[task_id] = workspace
+            return workspace
+    
+    @traced("sandbox.cleanup", SANDBOX_STEP_SECONDS, step="cleanup")
+    def _release_workspace(self, workspace: SandboxWorkspace):
+        workspace.released = True
+        with workspace.pending_lock:
+            for future in workspace.pending:
+                future.cancel()
+            workspace.pending = []
+        with self._workspaces_lock:
+            if self._workspaces.get(workspace.task_id) is workspace:
+                del self._workspaces[workspace.task_id]
+        if workspace.pooled is not None:
+            self.container_pool.release(workspace.pooled, healthy=workspace.healthy)
+            workspace.pooled = None
+            workspace.image = None
+        if workspace.task_dir is not None:
+            self._cleanup(workspace.task_dir)
+            workspace.task_dir = None
+        workspace.manifest = {}
+    
+    def _read_report(self, workspace: SandboxWorkspace, task_id: str) -> Optional[bytes]:
+        try:
+            if workspace.pooled is not None:
+                chunks, stat = workspace.pooled.container.get_archive(f"{SANDBOX_ROOT}/{JUNIT_PATH}")
+                if stat.get("size", 0) > MAX_JUNIT_BYTES:
+                    return None
+                with tarfile.open(fileobj=io.BytesIO(b"".join(chunks))) as archive:
+                    member = archive.next()
+                    handle = archive.extractfile(member) if member is not None else None
+                    return handle.read() if handle is not None else None
+            if workspace.task_dir is not None:
+                report = workspace.task_dir / JUNIT_PATH
+                if report.is_file() and report.stat().st_size <= MAX_JUNIT_BYTES:
+                    return report.read_bytes()
+        except (docker.errors.APIError, tarfile.TarError, OSError) as e:
+            logger.info(f"[{task_id}] No JUnit report available: {str(e)}")
+        return None
+    
+    def _diff(self, workspace: SandboxWorkspace, files: Dict[str, str], hashes: Dict[str, str]):
+        manifest = {name: hashes.get(name) or hashlib.sha256(content.encode("utf-8")).hexdigest() for name, content in files.items()}
+        changed = {name: files[name] for name, digest in manifest.items() if workspace.manifest.get(name) != digest}
+        removed = [name for name in workspace.manifest if name not in manifest]
+        return changed, removed, manifest
+    
+    def _execute_pooled(
+        self,
+        workspace: SandboxWorkspace,
+        files: Dict[str, str],
+        hashes: Dict[str, str],
+        language: str,
+        timeout: int,
+        task_id: str,
+        image: str,
+        deps_ready: bool = False,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        tests: Optional[List[str]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict:
+        if workspace.pooled is not None and workspace.image != image:
+            logger.info(f"[{task_id}] Dependencies changed, switching sandbox to {image}")
+            self.container_pool.release(workspace.pooled, healthy=workspace.healthy)
+            workspace.pooled = None
+        
+        if workspace.pooled is None:
+            try:
+                with span("sandbox.container_start", SANDBOX_STEP_SECONDS, step="container_start", image=image):
+                    workspace.pooled = self.container_pool.acquire(image)
+            except (PoolExhaustedError, docker.errors.APIError) as e:
+                logger.error(f"[{task_id}] Could not check out sandbox container: {str(e)}")
+                return {
+                    "status": "error",
+                    "exit_code": 1,
+                    "stdout": "",
+                    "stderr": str(e),
+                    "error": str(e)
+                }
+            workspace.image = image
+            workspace.manifest = {}
+        
+        pooled = workspace.pooled
+        try:
+            with span("sandbox.write_files", SANDBOX_STEP_SECONDS, step="write_files"):
+                changed, removed, manifest = self._diff(workspace, files, hashes)
+                if removed:
+                    pooled.container.exec_run(["rm", "-f", "--"] + removed, workdir=SANDBOX_ROOT, user="root")
+                if changed:
+                    pooled.container.put_archive(SANDBOX_ROOT, self._build_archive(changed))
+                workspace.manifest = manifest
+                logger.info(f"[{task_id}] Synced sandbox: {len(changed)} changed, {len(removed)} removed, "
+                            f"{len(files) - len(changed)} unchanged")
+            
+            command = self._build_command(language, deps_ready, tests)
+            logger.info(f"[{task_id}] Running command in pooled container {pooled.id[:12]}: {command}")
+            
+            with span("sandbox.run", SANDBOX_STEP_SECONDS, step="run", task_id=task_id):
+                api = self.docker_client.api
+                exec_id = api.exec_create(
+                    pooled.id,
+                    ["timeout", "-k", "5", str(timeout), "bash", "-c", command],
+                    workdir=SANDBOX_ROOT,
+                    stdout=True,
+                    stderr=True
+                )["Id"]
+                
+                timed_out = threading.Event()
+                cancelled = threading.Event()
+                
+                def kill_processes():
+                    try:
+                        pooled.container.exec_run(["kill", "-9", "-1"], user="root")
+                    except docker.errors.APIError:
+                        pass
+                
+                def kill_run():
+                    timed_out.set()
+                    logger.warning(f"[{task_id}] Sandbox run exceeded {timeout}s, killing it")
+                    kill_processes()
+                
+                def cancel_run():
+                    cancelled.set()
+                    logger.info(f"[{task_id}] Sandbox run cancelled, killing it")
+                    kill_processes()
+                
+                watchdog = threading.Timer(timeout + KILL_GRACE_SECONDS, kill_run)
+                watchdog.daemon = True
+                watchdog.start()
+                stop_watching = self._watch_cancel(cancel_event, cancel_run)
+                try:
+                    stdout, stderr = self._collect_output(api.exec_start(exec_id, stream=True, demux=True), on_output)
+                finally:
+                    watchdog.cancel()
+                    stop_watching()
+                
+                exit_code = api.exec_inspect(exec_id).get("ExitCode")
+                if exit_code is None:
+                    exit_code = 1
+            if cancelled.is_set():
+                return self._cancelled(stdout, stderr)
+            if timed_out.is_set() or exit_code == TIMEOUT_EXIT_CODE:
+                workspace.healthy = False
+                return self._result(exit_code, stdout, stderr, timeout=timeout)
+            return self._result(exit_code, stdout, stderr)
+        
+        except docker.errors.APIError as e:
+            workspace.healthy = False
+            logger.error(f"[{task_id}] Docker API error: {str(e)}")
             return {
                 "status": "error",
                 "exit_code": 1,
@@ -48,9 +468,55 @@ class SandboxExecutor:
                 "stderr": str(e),
                 "error": str(e)
             }
+    
+    def _build_archive(self, files: Dict[str, str]) -> bytes:
+        owner = archive_owner(self.container_pool.user if self.container_pool is not None else SANDBOX_USER)
+        mtime = int(time.time())
+        directories = sorted({str(parent) for filename in files for parent in PurePosixPath(filename).parents if str(parent) != "."})
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            for directory in directories:
+                info = tarfile.TarInfo(name=directory)
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                info.mtime = mtime
+                archive.addfile(owned(info, owner))
+            for filename, content in files.items():
+                data = content.encode('utf-8')
+                info = tarfile.TarInfo(name=filename)
+                info.size = len(data)
+                info.mode = 0o644
+                info.mtime = mtime
+                archive.addfile(owned(info, owner), io.BytesIO(data))
+                logger.info(f"Packed file: {filename}")
+        return buffer.getvalue()
+    
+    @traced("sandbox.write_files", SANDBOX_STEP_SECONDS, step="write_files")
+    def _sync_directory(self, workspace: SandboxWorkspace, files: Dict[str, str], hashes: Dict[str, str], task_id: str):
+        if workspace.task_dir is None:
+            workspace.task_dir = self.work_dir / task_id
+            workspace.task_dir.mkdir(parents=True, exist_ok=True)
+            workspace.manifest = {}
         
-        finally:
-            self._cleanup(task_dir)
+        changed, removed, manifest = self._diff(workspace, files, hashes)
+        for filename in removed:
+            (workspace.task_dir / filename).unlink(missing_ok=True)
+        self._write_files(workspace.task_dir, {"files": changed})
+        workspace.manifest = manifest
+        logger.info(f"[{task_id}] Synced sandbox: {len(changed)} changed, {len(removed)} removed, "
+                    f"{len(files) - len(changed)} unchanged")
+    
+    def _build_command(self, language: str, deps_ready: bool = False, tests: Optional[List[str]] = None) -> str:
+        install = f"ln -sfn {DEPS_ROOT}/node_modules node_modules" if deps_ready else "npm install"
+        if language == "python":
+            selection = "".join(f" {shlex.quote(test)}" for test in tests or [])
+            return f"cd /sandbox && rm -f {JUNIT_PATH} && python -m pytest{selection} -v --junitxml={JUNIT_PATH}"
+        elif language == "javascript":
+            return f"cd /sandbox && {install} && npm test"
+        elif language == "typescript":
+            return f"cd /sandbox && {install} && npx tsc && npm test"
+        else:
+            return "cd /sandbox && ls -la"
     
     def _write_files(self, task_dir: Path, code_artifacts: Dict):
         if "files" in code_artifacts:
@@ -59,61 +525,80 @@ class SandboxExecutor:
                 file_path.parent.mkdir(parents=True, exist_ok=True)
                 file_path.write_text(content)
                 logger.info(f"Created file: {filename}")
-        
-        if "code_text" in code_artifacts and not (task_dir / "main.py").exists():
-            (task_dir / "main.py").write_text(code_artifacts["code_text"])
     
     def _run_in_container(
         self,
         task_dir: str,
         language: str,
         timeout: int,
-        task_id: str
+        task_id: str,
+        image: Optional[str] = None,
+        deps_ready: bool = False,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        tests: Optional[List[str]] = None,
+        cancel_event: Optional[threading.Event] = None
     ) -> Dict:
         try:
             volume_mount = {task_dir: {'bind': '/sandbox', 'mode': 'rw'}}
             
-            if language == "python":
-                command = "cd /sandbox && python -m pytest tests.py -v || python main.py"
-            elif language == "javascript":
-                command = "cd /sandbox && npm install && npm test"
-            elif language == "typescript":
-                command = "cd /sandbox && npm install && npx tsc && npm test"
-            else:
-                command = "cd /sandbox && ls -la"
+            command = self._build_command(language, deps_ready, tests)
             
             logger.info(f"[{task_id}] Running container command: {command}")
             
-            container = self.docker_client.containers.run(
-                self.image_name,
-                command=["bash", "-c", command],
-                volumes=volume_mount,
-                working_dir="/sandbox",
-                stdout=True,
-                stderr=True,
-                remove=True,
-                timeout=timeout,
-                mem_limit="2g",
-                cpus=2,
-                network_disabled=True
-            )
+            with span("sandbox.container_start", SANDBOX_STEP_SECONDS, step="container_start", image=image or self.image_name):
+                container = self.docker_client.containers.run(
+                    image or self.image_name,
+                    command=["bash", "-c", command],
+                    volumes=volume_mount,
+                    working_dir="/sandbox",
+                    detach=True,
+                    mem_limit="2g",
+                    nano_cpus=2_000_000_000,
+                    network_disabled=True
+                )
             
-            return {
-                "status": "success",
-                "exit_code": 0,
-                "stdout": container.decode('utf-8') if isinstance(container, bytes) else str(container),
-                "stderr": ""
-            }
-        
-        except docker.errors.ContainerError as e:
-            logger.error(f"[{task_id}] Container execution error: {str(e)}")
-            return {
-                "status": "error",
-                "exit_code": e.exit_status,
-                "stdout": e.stdout.decode('utf-8') if e.stdout else "",
-                "stderr": e.stderr.decode('utf-8') if e.stderr else str(e),
-                "error": str(e)
-            }
+            timed_out = threading.Event()
+            cancelled = threading.Event()
+            
+            def kill_container():
+                try:
+                    container.kill()
+                except docker.errors.APIError:
+                    pass
+            
+            def kill_run():
+                timed_out.set()
+                logger.warning(f"[{task_id}] Sandbox run exceeded {timeout}s, killing container")
+                kill_container()
+            
+            def cancel_run():
+                cancelled.set()
+                logger.info(f"[{task_id}] Sandbox run cancelled, killing container")
+                kill_container()
+            
+            watchdog = threading.Timer(timeout, kill_run)
+            watchdog.daemon = True
+            watchdog.start()
+            stop_watching = self._watch_cancel(cancel_event, cancel_run)
+            try:
+                with span("sandbox.run", SANDBOX_STEP_SECONDS, step="run", task_id=task_id):
+                    stream = container.attach(stdout=True, stderr=True, stream=True, logs=True, demux=True)
+                    stdout, stderr = self._collect_output(stream, on_output)
+                    exit_code = container.wait(timeout=KILL_GRACE_SECONDS + timeout).get("StatusCode", 1)
+            finally:
+                watchdog.cancel()
+                stop_watching()
+                with span("sandbox.container_remove", SANDBOX_STEP_SECONDS, step="cleanup"):
+                    try:
+                        container.remove(force=True)
+                    except docker.errors.APIError:
+                        pass
+            
+            if cancelled.is_set():
+                return self._cancelled(stdout, stderr)
+            if timed_out.is_set():
+                return self._result(exit_code, stdout, stderr, timeout=timeout)
+            return self._result(exit_code, stdout, stderr)
         
         except docker.errors.APIError as e:
             logger.error(f"[{task_id}] Docker API error: {str(e)}")
@@ -0,0 +1,250 @@
+import ctypes
+import json
+import os
+import platform
+import resource
+import sys
+import traceback
+
+CLONE_NEWNS = 0x00020000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWNET = 0x40000000
+MS_RDONLY = 0x1
+MS_NOSUID = 0x2
+MS_NODEV = 0x4
+MS_NOEXEC = 0x8
+MS_REMOUNT = 0x20
+MS_NOATIME = 0x400
+MS_NODIRATIME = 0x800
+MS_BIND = 0x1000
+MS_REC = 0x4000
+MS_PRIVATE = 0x40000
+MS_RELATIME = 0x200000
+MNT_DETACH = 0x2
+PR_SET_NO_NEW_PRIVS = 38
+LINUX_CAPABILITY_VERSION_3 = 0x20080522
+SYS_PIVOT_ROOT = {"x86_64": 155, "aarch64": 41, "arm64": 41}
+SANDBOX_DIR = "/sandbox"
+SYSTEM_PATHS = ("/usr", "/bin", "/sbin", "/lib", "/lib32", "/lib64", "/libx32")
+DEVICES = ("null", "zero", "random", "urandom")
+LOCKED_FLAGS = MS_NOSUID | MS_NODEV | MS_NOEXEC | MS_NOATIME | MS_NODIRATIME | MS_RELATIME
+
+def preload(modules):
+    for name in modules:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    if "pytest" in sys.modules:
+        warm_pytest()
+
+def warm_pytest():
+    import tempfile
+    empty = tempfile.mkdtemp(prefix=".warm-")
+    saved = os.dup(1), os.dup(2)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    try:
+        sys.modules["pytest"].main(["--collect-only", "-q", "-p", "no:cacheprovider", empty])
+    except BaseException:
+        pass
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in (devnull, *saved):
+            os.close(fd)
+        os.rmdir(empty)
+
+def libc_call(name: str, *args):
+    libc = ctypes.CDLL(None, use_errno=True)
+    if getattr(libc, name)(*args) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{name}: {os.strerror(errno)}")
+
+def encode(value):
+    return value.encode() if isinstance(value, str) else value
+
+def unshare(flags: int):
+    if hasattr(os, "unshare"):
+        os.unshare(flags)
+        return
+    libc_call("unshare", flags)
+
+def mount(source, target, fstype, flags: int, data=None):
+    libc_call("mount", encode(source), encode(target), encode(fstype), ctypes.c_ulong(flags), encode(data))
+
+def write_proc(path: str, value: str):
+    with open(path, "w") as handle:
+        handle.write(value)
+
+def enter_namespaces(network: bool, filesystem: bool) -> bool:
+    flags = (CLONE_NEWNET if network else 0) | (CLONE_NEWNS if filesystem else 0)
+    if not flags:
+        return True
+    uid, gid = os.getuid(), os.getgid()
+    for candidate in ((flags, flags | CLONE_NEWUSER) if os.geteuid() == 0 else (flags | CLONE_NEWUSER,)):
+        try:
+            unshare(candidate)
+        except (OSError, AttributeError):
+            continue
+        if candidate & CLONE_NEWUSER:
+            write_proc("/proc/self/setgroups", "deny")
+            write_proc("/proc/self/uid_map", f"{uid} {uid} 1")
+            write_proc("/proc/self/gid_map", f"{gid} {gid} 1")
+        return True
+    return False
+
+def bind(source: str, target: str, read_only: bool = True):
+    mount(source, target, None, MS_BIND | MS_REC)
+    if read_only:
+        locked = os.statvfs(source).f_flag & LOCKED_FLAGS
+        mount(None, target, None, MS_BIND | MS_REMOUNT | MS_RDONLY | locked)
+
+def system_paths() -> list:
+    paths = list(SYSTEM_PATHS) + [sys.prefix, sys.base_prefix, sys.exec_prefix]
+    paths += [path for path in sys.path if os.path.isabs(path) and path != os.path.dirname(os.path.abspath(__file__))]
+    return paths
+
+def enter_private_root(workspace: str):
+    mount(None, "/", None, MS_REC | MS_PRIVATE)
+    source = os.open(workspace, os.O_RDONLY | os.O_DIRECTORY)
+    root = os.path.dirname(os.path.abspath(workspace))
+    try:
+        mount("tmpfs", root, "tmpfs", MS_NOSUID | MS_NODEV, "mode=0755,size=1m")
+        os.mkdir(root + SANDBOX_DIR)
+        bind(f"/proc/self/fd/{source}", root + SANDBOX_DIR, read_only=False)
+    finally:
+        os.close(source)
+    bound = []
+    for path in system_paths():
+        if os.path.islink(path) and os.path.dirname(path) == "/":
+            os.symlink(os.readlink(path), root + path)
+            continue
+        real = os.path.realpath(path)
+        if not os.path.isdir(real) or any(real == done or real.startswith(done + "/") for done in bound):
+            continue
+        os.makedirs(root + real, exist_ok=True)
+        bind(real, root + real)
+        bound.append(real)
+    os.mkdir(root + "/dev")
+    for device in DEVICES:
+        if os.path.exists(f"/dev/{device}"):
+            open(f"{root}/dev/{device}", "w").close()
+            bind(f"/dev/{device}", f"{root}/dev/{device}", read_only=False)
+    number = SYS_PIVOT_ROOT.get(platform.machine())
+    if number is None:
+        raise OSError(f"pivot_root is not known for {platform.machine()}")
+    os.chdir(root)
+    libc_call("syscall", ctypes.c_long(number), b".", b".")
+    libc_call("umount2", b".", MNT_DETACH)
+    os.chdir("/")
+    mount(None, "/", None, MS_REMOUNT | MS_RDONLY | MS_NOSUID | MS_NODEV)
+
+def drop_privileges(user) -> bool:
+    if os.geteuid() == 0 and user:
+        uid, gid = int(user[0]), int(user[1])
+        for directory, dirnames, filenames in os.walk(SANDBOX_DIR):
+            for name in [directory] + [os.path.join(directory, entry) for entry in dirnames + filenames]:
+                os.chown(name, uid, gid, follow_symlinks=False)
+        os.setgroups([])
+        os.setgid(gid)
+        os.setuid(uid)
+        dropped = True
+    else:
+        header = (ctypes.c_uint32 * 2)(LINUX_CAPABILITY_VERSION_3, 0)
+        libc_call("capset", header, (ctypes.c_uint32 * 6)())
+        dropped = False
+    libc_call("prctl", PR_SET_NO_NEW_PRIVS, ctypes.c_ulong(1), ctypes.c_ulong(0), ctypes.c_ulong(0), ctypes.c_ulong(0))
+    return dropped
+
+def confine(job) -> dict:
+    private_root = bool(job.get("private_root"))
+    status = {"network_isolated": False, "private_root": False, "uid": os.getuid()}
+    try:
+        if job.get("isolate_network") and enter_namespaces(network=True, filesystem=private_root):
+            status["network_isolated"] = True
+        elif private_root and not enter_namespaces(network=False, filesystem=True):
+            return status
+        if private_root:
+            enter_private_root(job["cwd"])
+            status["dedicated_uid"] = drop_privileges(job.get("user"))
+            status["private_root"] = True
+            status["uid"] = os.getuid()
+    except OSError as e:
+        status["error"] = str(e)
+    return status
+
+def set_limit(kind: int, value: int):
+    _, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    try:
+        resource.setrlimit(kind, (value, value))
+    except (ValueError, OSError):
+        pass
+
+def apply_limits(limits, dedicated_uid: bool = False):
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    if limits.get("cpu_seconds"):
+        set_limit(resource.RLIMIT_CPU, int(usage.ru_utime + usage.ru_stime) + int(limits["cpu_seconds"]))
+    if limits.get("memory_bytes"):
+        set_limit(resource.RLIMIT_AS, int(limits["memory_bytes"]))
+    if limits.get("file_size_bytes"):
+        set_limit(resource.RLIMIT_FSIZE, int(limits["file_size_bytes"]))
+    if limits.get("processes") and dedicated_uid:
+        set_limit(resource.RLIMIT_NPROC, int(limits["processes"]))
+    if limits.get("open_files"):
+        set_limit(resource.RLIMIT_NOFILE, int(limits["open_files"]))
+    set_limit(resource.RLIMIT_CORE, 0)
+
+def run_python(tests, junit_path) -> int:
+    code = 1
+    args = ["-v", "-p", "no:cacheprovider"] + ([f"--junitxml={junit_path}"] if junit_path else [])
+    try:
+        import pytest
+        code = int(pytest.main(list(tests or []) + args))
+    except ImportError as e:
+        print(f"pytest is not available: {e}", file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    return code
+
+def main():
+    status_fd = int(sys.argv[1])
+    preload(sys.argv[2:])
+    line = sys.stdin.readline()
+    if not line:
+        os._exit(0)
+    job = json.loads(line)
+    sys.stdin.close()
+    sys.stdin = open(os.devnull)
+
+    status = confine(job)
+    with os.fdopen(status_fd, "w") as handle:
+        json.dump(status, handle)
+    if job.get("require_network_isolation") and not status["network_isolated"]:
+        print("Network isolation is required but unshare(CLONE_NEWNET) is not permitted here", file=sys.stderr)
+        os._exit(126)
+    if job.get("private_root") and not status["private_root"]:
+        print(f"A private root is required but could not be set up: {status.get('error', 'namespaces are not permitted here')}",
+              file=sys.stderr)
+        os._exit(126)
+
+    cwd = SANDBOX_DIR if status["private_root"] else job["cwd"]
+    os.chdir(cwd)
+    os.environ.update(HOME=cwd, TMPDIR=cwd)
+    if "tempfile" in sys.modules:
+        sys.modules["tempfile"].tempdir = None
+    sys.path.insert(0, cwd)
+    apply_limits(job.get("limits") or {}, status.get("dedicated_uid", False))
+
+    code = run_python(job.get("tests"), job.get("junit_path"))
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code & 0xFF)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+import abc
+import atexit
+import contextvars
+import functools
+import json
+import math
+import os
+import queue
+import threading
+import time
+import urllib.request
+import logging
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "opendevagent")
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+TRACE_BATCH_SIZE = 256
+TRACE_FLUSH_INTERVAL = 2.0
+TRACE_QUEUE_SIZE = 10000
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in sorted(values.items())]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in sorted(values.items())]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            return sum(self._counts.get(self._key(labels), ()))
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            counts = {key: list(c) for key, c in self._counts.items()}
+            sums = dict(self._sums)
+        lines = []
+        for key in sorted(counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts[key]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+METRICS = MetricsRegistry()
+
+PHASE_SECONDS = METRICS.histogram(
+    "opendevagent_phase_duration_seconds", "Duration of plan/act/observe/fix phases", ("phase", "status")
+)
+SANDBOX_STEP_SECONDS = METRICS.histogram(
+    "opendevagent_sandbox_step_duration_seconds", "Duration of sandbox steps", ("step", "status")
+)
+LLM_REQUEST_SECONDS = METRICS.histogram(
+    "opendevagent_llm_request_duration_seconds", "End-to-end LLM call latency", ("model", "phase", "status")
+)
+LLM_TTFT_SECONDS = METRICS.histogram(
+    "opendevagent_llm_time_to_first_token_seconds", "Time to first streamed token", ("model",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+)
+LLM_TOKENS = METRICS.counter("opendevagent_llm_streamed_tokens_total", "Tokens streamed from LLM responses", ("model",))
+LLM_REQUESTS = METRICS.counter("opendevagent_llm_requests_total", "LLM calls by outcome", ("model", "phase", "status"))
+
+class Span:
+    def __init__(self, name: str, attributes: Dict, parent: Optional["Span"] = None):
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_ns = time.time_ns()
+        self.started = time.monotonic()
+        self.duration = 0.0
+        self.end_ns = None
+        self.status = "ok"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self):
+        self.duration = time.monotonic() - self.started
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+
+    def as_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration": round(self.duration, 6),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+class SpanExporter:
+    def __init__(self, target: str):
+        self.target = target
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=TRACE_QUEUE_SIZE)
+        self._dropped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self._dropped += 1
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = []
+            deadline = time.monotonic() + TRACE_FLUSH_INTERVAL
+            while len(batch) < TRACE_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=0.1 if self._stop.is_set() else timeout))
+                except queue.Empty:
+                    if self._stop.is_set():
+                        break
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    logger.warning(f"Span export to {self.target} failed, dropped {len(batch)} spans: {str(e)}")
+            if self._dropped:
+                logger.warning(f"Span export queue full, dropped {self._dropped} spans")
+                self._dropped = 0
+
+    def _write(self, batch: List[Span]):
+        if self.target.startswith(("http://", "https://")):
+            body = json.dumps(self._otlp(batch)).encode("utf-8")
+            request = urllib.request.Request(
+                self.target.rstrip("/") + "/v1/traces",
+                data=body,
+                headers={"Content-Type": "application/json"},
+                method="POST"
+            )
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+            return
+        path = self.target[len("file://"):] if self.target.startswith("file://") else self.target
+        with open(path, "a", encoding="utf-8") as handle:
+            for span in batch:
+                handle.write(json.dumps(span.as_dict(), default=str) + "\n")
+
+    def _otlp(self, batch: List[Span]) -> Dict:
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        spans = []
+        for span in batch:
+            entry = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [attribute(k, v) for k, v in span.attributes.items() if v is not None],
+                "status": {"code": 2 if span.status == "error" else 1},
+            }
+            if span.parent_id:
+                entry["parentSpanId"] = span.parent_id
+            spans.append(entry)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+            }]
+        }
+
+_exporter: Optional[SpanExporter] = None
+_exporter_lock = threading.Lock()
+
+def get_span_exporter() -> Optional[SpanExporter]:
+    global _exporter
+    if not TRACE_EXPORT:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = SpanExporter(TRACE_EXPORT)
+            atexit.register(_exporter.shutdown)
+            logger.info(f"Exporting spans to {TRACE_EXPORT}")
+        return _exporter
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+@contextmanager
+def span(name: str, histogram: Optional[Histogram] = None, **attributes):
+    record = Span(name, attributes, _current_span.get())
+    token = _current_span.set(record)
+    try:
+        yield record
+    except BaseException as e:
+        record.status = "error"
+        record.attributes.setdefault("error", str(e) or type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        record.end()
+        if histogram is not None:
+            labels = {name: record.attributes.get(name, "") for name in histogram.labelnames}
+            if "status" in histogram.labelnames and not labels["status"]:
+                labels["status"] = record.status
+            histogram.observe(record.duration, **labels)
+        exporter = get_span_exporter()
+        if exporter is not None:
+            exporter.export(record)
+
+def traced(name: str, histogram: Optional[Histogram] = None, **attributes):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, histogram, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def render_metrics() -> str:
+    return METRICS.render()
@@ -0,0 +1,82 @@
+import logging
+import posixpath
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, Iterable, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JUNIT_PATH = ".opendev-junit.xml"
+MAX_JUNIT_BYTES = 8 * 1024 * 1024
+MAX_FAILURE_DETAILS = 100
+MAX_MESSAGE_CHARS = 500
+NO_TESTS_EXIT_CODE = 5
+
+def is_test_file(path: str) -> bool:
+    base = posixpath.basename(path)
+    return base == "tests.py" or (base.endswith(".py") and (base.startswith("test_") or base.endswith("_test.py")))
+
+def find_test_files(files: Iterable[str]) -> List[str]:
+    return sorted(name for name in files if is_test_file(name))
+
+def node_id(classname: str, name: str, files: Iterable[str]) -> str:
+    if not classname:
+        return name
+    parts = classname.split(".")
+    known = set(files)
+    for split in range(len(parts), 0, -1):
+        path = "/".join(parts[:split]) + ".py"
+        if path in known:
+            return "::".join([path, *parts[split:], name])
+    return "::".join([parts[0] + ".py", *parts[1:], name])
+
+def parse_junit(data: Optional[bytes], files: Iterable[str] = ()) -> Optional[Dict]:
+    if not data:
+        return None
+    if len(data) > MAX_JUNIT_BYTES:
+        logger.warning(f"Ignoring JUnit report of {len(data)} bytes")
+        return None
+    try:
+        root = ElementTree.fromstring(data)
+    except ElementTree.ParseError as e:
+        logger.warning(f"Could not parse JUnit report: {str(e)}")
+        return None
+
+    files = list(files)
+    outcomes: Dict[str, str] = {}
+    failures: List[Dict] = []
+    duration = 0.0
+    for case in root.iter("testcase"):
+        case_id = node_id(case.get("classname", ""), case.get("name", ""), files)
+        duration += float(case.get("time") or 0)
+        outcome = "passed"
+        detail = None
+        for child in case:
+            if child.tag in ("failure", "error"):
+                outcome, detail = ("failed" if child.tag == "failure" else "error"), child
+                break
+            if child.tag == "skipped":
+                outcome = "skipped"
+        outcomes[case_id] = outcome
+        if detail is not None and len(failures) < MAX_FAILURE_DETAILS:
+            message = detail.get("message") or (detail.text or "").strip().split("\n")[-1]
+            failures.append({"id": case_id, "outcome": outcome, "message": message[:MAX_MESSAGE_CHARS]})
+
+    counts = {outcome: 0 for outcome in ("passed", "failed", "error", "skipped")}
+    for outcome in outcomes.values():
+        counts[outcome] += 1
+    return {
+        "total": len(outcomes),
+        "passed": counts["passed"],
+        "failed": counts["failed"],
+        "errors": counts["error"],
+        "skipped": counts["skipped"],
+        "duration": round(duration, 3),
+        "failures": failures,
+        "outcomes": outcomes,
+    }
+
+def failing_tests(results: Optional[Dict]) -> List[str]:
+    if not results:
+        return []
+    return [case_id for case_id, outcome in results["outcomes"].items() if outcome in ("failed", "error")]
@@ -0,0 +1,215 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+GC_GRACE_SECONDS = 3600
+
+class ArtifactStore:
+    def __init__(
+        self,
+        root: str,
+        compress: bool = True,
+        compress_min_bytes: int = 1024,
+        inline_bytes: int = 256,
+        preview_chars: int = 200,
+        ttl_seconds: Optional[float] = None
+    ):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.manifests_dir = self.root / "tasks"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+        self.inline_bytes = inline_bytes
+        self.preview_chars = preview_chars
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._stats = {"written": 0, "deduplicated": 0, "bytes_in": 0, "bytes_stored": 0}
+
+    def put(self, data: bytes) -> Dict:
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self._blob_path(digest)
+        if existing is not None:
+            self._stats["deduplicated"] += 1
+            return {"id": digest, "size": len(data), "compressed": existing.suffix == ".gz"}
+
+        compressed = self.compress and len(data) >= self.compress_min_bytes
+        payload = gzip.compress(data, compresslevel=6, mtime=0) if compressed else data
+        if compressed and len(payload) >= len(data):
+            compressed, payload = False, data
+        target = self._blob_dir(digest) / (digest + (".gz" if compressed else ""))
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(payload)
+            os.replace(tmp_path, target)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self._stats["written"] += 1
+        self._stats["bytes_in"] += len(data)
+        self._stats["bytes_stored"] += len(payload)
+        return {"id": digest, "size": len(data), "compressed": compressed}
+
+    def read_range(self, artifact_id: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        path = self._blob_path(artifact_id)
+        if path is None:
+            raise FileNotFoundError(artifact_id)
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rb") as handle:
+            if start:
+                handle.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = handle.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def read(self, artifact_id: str) -> bytes:
+        return b"".join(self.read_range(artifact_id))
+
+    def offload(self, task_id: str, result: Dict, logs: Optional[List[str]] = None) -> Dict:
+        with self._lock:
+            artifacts: Dict[str, Dict] = {}
+            compact = self._compact(task_id, result, "", artifacts)
+            artifacts["result.json"] = self.put(json.dumps(result, default=str).encode("utf-8"))
+            if logs is not None:
+                artifacts["logs.txt"] = self.put("\n".join(logs).encode("utf-8"))
+            self._write_manifest(task_id, artifacts)
+        compact["artifacts"] = {
+            "count": len(artifacts),
+            "bytes": sum(meta["size"] for meta in artifacts.values()),
+            "url": f"/api/task/{task_id}/artifacts",
+        }
+        return compact
+
+    def manifest(self, task_id: str) -> Optional[Dict[str, Dict]]:
+        try:
+            with open(self._manifest_path(task_id), encoding="utf-8") as handle:
+                return json.load(handle)["artifacts"]
+        except FileNotFoundError:
+            return None
+
+    def resolve(self, task_id: str, name: str) -> Optional[Dict]:
+        manifest = self.manifest(task_id)
+        if manifest is None or name not in manifest:
+            return None
+        meta = dict(manifest[name])
+        content_type, _ = mimetypes.guess_type(name)
+        if name.endswith(".json"):
+            meta["content_type"] = "application/json"
+        elif content_type and not content_type.startswith("text/"):
+            meta["content_type"] = content_type
+        else:
+            meta["content_type"] = "text/plain; charset=utf-8"
+        return meta
+
+    def delete_task(self, task_id: str):
+        self._manifest_path(task_id).unlink(missing_ok=True)
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        if not self.ttl_seconds:
+            return 0
+        cutoff = (now or time.time()) - self.ttl_seconds
+        with self._lock:
+            evicted = 0
+            for path in self.manifests_dir.glob("*.json"):
+                if path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+                    evicted += 1
+            removed = self._collect_garbage() if evicted else 0
+        if evicted:
+            logger.info(f"Evicted artifacts of {evicted} tasks, removed {removed} unreferenced blobs")
+        return evicted
+
+    def stats(self) -> Dict:
+        return dict(self._stats, root=str(self.root))
+
+    def _compact(self, task_id: str, value, path: str, artifacts: Dict[str, Dict]):
+        if isinstance(value, dict):
+            return {key: self._compact(task_id, item, f"{path}/{key}" if path else str(key), artifacts) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._compact(task_id, item, f"{path}/{index}", artifacts) for index, item in enumerate(value)]
+        if isinstance(value, str) and len(value) > self.inline_bytes:
+            meta = self.put(value.encode("utf-8"))
+            artifacts[path] = meta
+            return {
+                "artifact": path,
+                "size": meta["size"],
+                "preview": value[:self.preview_chars],
+                "url": f"/api/task/{task_id}/artifacts/{path}",
+            }
+        return value
+
+    def _write_manifest(self, task_id: str, artifacts: Dict[str, Dict]):
+        path = self._manifest_path(task_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.manifests_dir, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump({"task_id": task_id, "created_at": time.time(), "artifacts": artifacts}, handle)
+        os.replace(tmp_path, path)
+
+    def _collect_garbage(self) -> int:
+        referenced = set()
+        for path in self.manifests_dir.glob("*.json"):
+            try:
+                with open(path, encoding="utf-8") as handle:
+                    referenced.update(meta["id"] for meta in json.load(handle)["artifacts"].values())
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping unreadable artifact manifest {path.name}: {str(e)}")
+                return 0
+        grace = time.time() - GC_GRACE_SECONDS
+        removed = 0
+        for path in self.blobs_dir.glob("*/*"):
+            digest = path.name.split(".")[0]
+            if digest not in referenced and path.stat().st_mtime < grace:
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    def _manifest_path(self, task_id: str) -> Path:
+        return self.manifests_dir / f"{Path(task_id).name}.json"
+
+    def _blob_dir(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2]
+
+    def _blob_path(self, digest: str) -> Optional[Path]:
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            return None
+        for suffix in ("", ".gz"):
+            path = self._blob_dir(digest) / (digest + suffix)
+            if path.exists():
+                return path
+        return None
+
+def create_artifact_store() -> Optional[ArtifactStore]:
+    backend = os.getenv("ARTIFACT_STORE", "filesystem").lower()
+    if backend in ("", "none", "off"):
+        return None
+    if backend != "filesystem":
+        raise ValueError(f"Unknown ARTIFACT_STORE backend: {backend}")
+    path = os.getenv("ARTIFACT_STORE_PATH", "/app/work_dir/artifacts")
+    logger.info(f"Using filesystem artifact store at {path}")
+    return ArtifactStore(
+        path,
+        compress=os.getenv("ARTIFACT_COMPRESSION", "gzip").lower() == "gzip",
+        compress_min_bytes=int(os.getenv("ARTIFACT_COMPRESS_MIN_BYTES", "1024")),
+        inline_bytes=int(os.getenv("ARTIFACT_INLINE_BYTES", "256")),
+        ttl_seconds=float(os.getenv("TASK_TTL_SECONDS", "86400")) or None,
+    )
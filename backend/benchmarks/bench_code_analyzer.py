@@ -0,0 +1,135 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agent_logic"))
+
+from tools.code_analyzer import CodeAnalyzer, iter_source_files
+
+PYTHON_TEMPLATE = '''import os
+import json
+from typing import Dict, List
+
+class Service{n}:
+    def __init__(self, items=[]):
+        self.items = items
+
+    def load(self, path: str) -> Dict:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except:
+            return {{}}
+
+    def process(self, values: List[int]) -> int:
+        total = 0
+        for value in values:
+            if value == None:
+                continue
+            total += self.transform(value)
+        return total
+
+    def transform(self, value: int) -> int:
+        return value * {n} + len(os.sep)
+
+def helper_{n}(service: Service{n}) -> int:
+    return service.process(list(range({n})))
+'''
+
+JS_TEMPLATE = '''import fs from "fs";
+const path = require("path");
+
+class Store{n} {{
+  constructor(root) {{
+    this.root = root;
+  }}
+  read(name) {{
+    const full = path.join(this.root, name);
+    return fs.readFileSync(full, "utf-8");
+  }}
+}}
+
+function build{n}(values) {{
+  var total = 0;
+  for (const value of values) {{
+    if (value == null) {{ continue; }}
+    total += value * {n};
+  }}
+  return total;
+}}
+
+const run{n} = (root) => {{
+  const store = new Store{n}(root);
+  return build{n}([1, 2, 3]) + store.read("data.json").length;
+}};
+
+module.exports = {{ Store{n}, build{n}, run{n} }};
+'''
+
+def generate_repo(root: str, files: int, blocks: int, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(files):
+        package = os.path.join(root, f"pkg{i % 20}")
+        os.makedirs(package, exist_ok=True)
+        if rng.random() < 0.7:
+            body = "\n".join(PYTHON_TEMPLATE.format(n=i * blocks + b) for b in range(blocks))
+            name = f"module_{i}.py"
+        else:
+            body = "\n".join(JS_TEMPLATE.format(n=i * blocks + b) for b in range(blocks))
+            name = f"module_{i}.js"
+        with open(os.path.join(package, name), "w") as f:
+            f.write(body)
+
+def run(root: str, workers: int) -> dict:
+    files = dict(iter_source_files(root))
+    analyzer = CodeAnalyzer(cache_size=len(files) + 1, workers=workers, parallel_threshold=1)
+    try:
+        if workers > 1:
+            list(analyzer._get_pool(workers).map(abs, range(workers * 4)))
+        started = time.perf_counter()
+        project = analyzer.analyze_project(files, workers=workers)
+        elapsed = time.perf_counter() - started
+    finally:
+        analyzer.shutdown()
+    summary = project["summary"]
+    return {
+        "workers": workers,
+        "files": summary["file_count"],
+        "lines": summary["lines"],
+        "seconds": elapsed,
+        "files_per_second": summary["file_count"] / elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CodeAnalyzer project throughput against worker count")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--blocks", type=int, default=4, help="template blocks per file")
+    parser.add_argument("--workers", type=int, nargs="*", help="worker counts to test (default: 1,2,4,... up to cpu count)")
+    parser.add_argument("--repo", help="analyze an existing directory instead of a synthetic repo")
+    args = parser.parse_args()
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, cpu_count} | {2 ** i for i in range(1, 8) if 2 ** i < cpu_count})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.repo
+        if root is None:
+            root = tmp
+            generate_repo(root, args.files, args.blocks)
+
+        print(f"{'workers':>8} {'files':>8} {'lines':>10} {'seconds':>9} {'files/s':>10} {'speedup':>8}")
+        baseline = None
+        for workers in worker_counts:
+            result = run(root, workers)
+            baseline = baseline or result["files_per_second"]
+            print(
+                f"{result['workers']:>8} {result['files']:>8} {result['lines']:>10} "
+                f"{result['seconds']:>9.3f} {result['files_per_second']:>10.1f} "
+                f"{result['files_per_second'] / baseline:>7.2f}x"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "agent_logic"))
+
+from tools.code_analyzer import CodeAnalyzer
+from tools.language_plugins import PatternPlugin, get_language
+
+from bench_code_analyzer import JS_TEMPLATE, PYTHON_TEMPLATE
+
+GO_TEMPLATE = '''package service
+
+import (
+    "fmt"
+    "os"
+)
+
+// Store{n} keeps values in memory.
+type Store{n} struct {{
+    values map[string]int
+}}
+
+type Reader{n} interface {{
+    Read(key string) (int, error)
+}}
+
+func (s *Store{n}) Read(key string) (int, error) {{
+    value, ok := s.values[key]
+    if !ok {{
+        return 0, fmt.Errorf("missing key %q", key)
+    }}
+    _ = os.Setenv("LAST_KEY", key)
+    return value * {n}, nil
+}}
+
+func NewStore{n}() *Store{n} {{
+    return &Store{n}{{values: map[string]int{{}}}}
+}}
+'''
+
+RUST_TEMPLATE = '''use std::collections::HashMap;
+use std::fmt::{{Display, Formatter}};
+
+/// Cache{n} maps keys to values.
+pub struct Cache{n} {{
+    values: HashMap<String, i64>,
+}}
+
+pub enum Mode{n} {{
+    Fast,
+    Safe,
+}}
+
+impl Cache{n} {{
+    pub fn get(&self, key: &str) -> i64 {{
+        let value = self.values.get(key).copied();
+        value.unwrap() * {n}
+    }}
+
+    fn describe(&self) -> String {{
+        format!("cache with {{}} entries", self.values.len())
+    }}
+}}
+'''
+
+TEMPLATES = {
+    "python": PYTHON_TEMPLATE,
+    "javascript": JS_TEMPLATE,
+    "typescript": JS_TEMPLATE,
+    "go": GO_TEMPLATE,
+    "rust": RUST_TEMPLATE,
+}
+
+class LegacyCodeAnalyzer:
+    def __init__(self):
+        self.patterns = {
+            "python": {
+                "imports": r"^(?:from|import)\s+(.+)$",
+                "functions": r"^def\s+(\w+)\s*\(",
+                "classes": r"^class\s+(\w+)(?:\(|:)",
+                "errors": r"(?:Error|Exception|raise)",
+            },
+            "javascript": {
+                "imports": r"^(?:import|require)\s+(.+)$",
+                "functions": r"(?:function|const|let|var)\s+(\w+)\s*(?:\(|=\s*(?:\(|async))",
+                "classes": r"class\s+(\w+)",
+                "errors": r"(?:Error|throw|catch)",
+            }
+        }
+
+    def analyze(self, code: str, language: str = "python") -> Dict:
+        return {
+            "language": language,
+            "lines": len(code.split('\n')),
+            "imports": self._extract(code, language, "imports"),
+            "functions": self._extract(code, language, "functions"),
+            "classes": self._extract(code, language, "classes"),
+            "potential_issues": self._detect_issues(code, language),
+        }
+
+    def _extract(self, code: str, language: str, kind: str) -> List[str]:
+        pattern = self.patterns.get(language, {}).get(kind, "")
+        if not pattern:
+            return []
+        return re.findall(pattern, code, re.MULTILINE)
+
+    def _detect_issues(self, code: str, language: str) -> List[str]:
+        issues = []
+        if not code.strip():
+            issues.append("Empty code")
+        if len(code) > 10000:
+            issues.append("Large file (>10KB) - consider splitting")
+        if language == "python":
+            if "except:" in code and "except Exception" not in code:
+                issues.append("Bare except clause detected - use specific exceptions")
+            if "import *" in code:
+                issues.append("Wildcard imports detected - use specific imports")
+        return issues
+
+def multipass(plugin: PatternPlugin, code: str) -> int:
+    patterns = list(plugin.skip_patterns)
+    patterns += [pattern for kind_patterns in plugin.patterns.values() for pattern in kind_patterns]
+    patterns += [pattern for pattern, _ in plugin.lint_rules.values()]
+    patterns.append(r"[{}()\[\]]")
+    return sum(len(re.findall(pattern, code, re.MULTILINE | re.DOTALL)) for pattern in patterns)
+
+def measure(fn, code: str, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(code)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the language plugin registry with the legacy regex analyzer")
+    parser.add_argument("--blocks", type=int, default=500, help="template blocks per generated input")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--languages", nargs="*", default=list(TEMPLATES))
+    args = parser.parse_args()
+
+    legacy = LegacyCodeAnalyzer()
+    analyzer = CodeAnalyzer(cache_size=0)
+
+    print(f"{'language':>11} {'size':>9} {'implementation':>16} {'seconds':>9} {'MB/s':>8} {'functions':>10} {'findings':>9}")
+    for language in args.languages:
+        code = "\n".join(TEMPLATES[language].format(n=n) for n in range(args.blocks))
+        size = len(code.encode("utf-8"))
+        runs = [
+            ("legacy", lambda c: legacy.analyze(c, language)),
+            ("registry", lambda c: analyzer.analyze(c, language)),
+        ]
+        plugin = get_language(language)
+        if isinstance(plugin, PatternPlugin):
+            runs.append(("multi-pass*", lambda c: multipass(plugin, c)))
+
+        for label, fn in runs:
+            seconds = measure(fn, code, args.repeat)
+            result = fn(code)
+            functions = len(result["functions"]) if isinstance(result, dict) else "-"
+            findings = len(result.get("findings", result["potential_issues"])) if isinstance(result, dict) else "-"
+            print(
+                f"{language:>11} {size / 1024:>8.0f}K {label:>16} {seconds:>9.4f} "
+                f"{size / seconds / 1024 ** 2:>8.1f} {functions:>10} {findings:>9}"
+            )
+    print("* one re.findall per registered pattern, without string/comment masking or line tracking")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from agent_logic.llm_gateway import LLMGateway, gateway_call
+from stub_llm_server import StubLLMServer
+
+MODES = ("direct", "gateway")
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def build_client(mode: str, args) -> httpx.Client:
+    transport = httpx.HTTPTransport(limits=httpx.Limits(max_connections=args.callers, max_keepalive_connections=args.callers))
+    if mode == "gateway":
+        gateway = LLMGateway(
+            key_rate=args.key_rate,
+            key_burst=args.key_rate * 2,
+            model_rate=0,
+            initial_concurrency=args.initial_concurrency,
+            max_concurrency=args.callers,
+            max_retries=args.retries,
+            backoff_base=0.1,
+            backoff_max=args.retry_after * 2,
+            seed=1,
+        )
+        transport = gateway.wrap(transport)
+    return httpx.Client(transport=transport, timeout=httpx.Timeout(120.0, connect=5.0))
+
+def call(client: httpx.Client, url: str, prompt: int, stream: bool) -> Dict:
+    body = {
+        "model": "stub/model",
+        "stream": stream,
+        "messages": [{"role": "user", "content": f"Generate production-ready code for component {prompt}"}],
+    }
+    started = time.perf_counter()
+    with gateway_call() as tracked:
+        try:
+            with client.stream("POST", f"{url}/chat/completions", json=body, headers={"Authorization": "Bearer bench"}) as response:
+                size = sum(len(chunk) for chunk in response.iter_bytes())
+                status = response.status_code
+        except httpx.HTTPError as e:
+            return {"status": type(e).__name__, "latency": time.perf_counter() - started, **tracked.as_dict()}
+    return {"status": status, "bytes": size, "latency": time.perf_counter() - started, **tracked.as_dict()}
+
+def run_mode(mode: str, args) -> Dict:
+    llm = StubLLMServer(
+        ttft=args.ttft, tokens_per_second=args.tps, max_concurrency=args.upstream_limit, retry_after=args.retry_after, seed=1
+    ).start()
+    client = build_client(mode, args)
+    prompts = [index % args.distinct for index in range(args.requests)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.callers) as pool:
+        results = list(pool.map(lambda prompt: call(client, llm.url, prompt, not args.no_stream), prompts))
+    wall = time.perf_counter() - started
+    upstream = llm.snapshot()
+    gateway = client._transport.gateway.stats() if mode == "gateway" else None
+    client.close()
+    llm.stop()
+
+    latencies = [r["latency"] for r in results]
+    waits = [r["queue_wait"] for r in results if not r["coalesced"]]
+    statuses: Dict[str, int] = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    return {
+        "mode": mode,
+        "wall_seconds": round(wall, 3),
+        "ok": statuses.get("200", 0),
+        "statuses": statuses,
+        "latency_p50": round(percentile(latencies, 0.5), 3),
+        "latency_p95": round(percentile(latencies, 0.95), 3),
+        "queue_wait_p50": round(percentile(waits, 0.5) or 0.0, 3),
+        "queue_wait_p95": round(percentile(waits, 0.95) or 0.0, 3),
+        "coalesced": sum(1 for r in results if r["coalesced"]),
+        "retries": sum(r["retries"] for r in results),
+        "upstream_requests": upstream["requests"],
+        "upstream_throttled": upstream["throttled"],
+        "upstream_max_in_flight": upstream["max_in_flight"],
+        "gateway": gateway,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare direct and gateway LLM calls against a rate-limited stub server")
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=MODES)
+    parser.add_argument("--requests", type=int, default=120)
+    parser.add_argument("--callers", type=int, default=32, help="concurrent calling threads")
+    parser.add_argument("--distinct", type=int, default=40, help="distinct prompts; the rest are identical repeats")
+    parser.add_argument("--upstream-limit", type=int, default=6, help="stub answers 429 above this many in-flight requests")
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--key-rate", type=float, default=50.0, help="gateway requests per second per key")
+    parser.add_argument("--initial-concurrency", type=int, default=16)
+    parser.add_argument("--retries", type=int, default=6)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tps", type=float, default=400.0)
+    parser.add_argument("--no-stream", action="store_true")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    reports = []
+    for mode in args.modes:
+        report = run_mode(mode, args)
+        reports.append(report)
+        print(
+            f"{mode:8} wall={report['wall_seconds']}s ok={report['ok']}/{args.requests} statuses={report['statuses']} "
+            f"p50={report['latency_p50']}s p95={report['latency_p95']}s queue_wait p50={report['queue_wait_p50']}s "
+            f"p95={report['queue_wait_p95']}s coalesced={report['coalesced']} retries={report['retries']} "
+            f"upstream={report['upstream_requests']} throttled={report['upstream_throttled']} "
+            f"max_in_flight={report['upstream_max_in_flight']}"
+        )
+        if report["gateway"]:
+            print(f"         limits={json.dumps(report['gateway']['limits'])}")
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"config": vars(args), "modes": reports}, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
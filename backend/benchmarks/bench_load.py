@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx
+
+from fake_executor import FakeSandboxExecutor
+from stub_llm_server import StubLLMServer
+
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+
+TASK_DESCRIPTION = "Build a small calculator module with add and divide functions and unit tests"
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        if pid is not None:
+            return None
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class LoadRecorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.task_latencies: List[float] = []
+        self.outcomes: Dict[str, int] = {}
+        self.rejected = 0
+        self.submitted = 0
+
+    async def request(self, client: httpx.AsyncClient, method: str, endpoint: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            return None
+        self.latencies.setdefault(endpoint, []).append(time.perf_counter() - started)
+        if response.status_code >= 500:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        return response
+
+    def report(self, duration: float) -> Dict:
+        completed = sum(self.outcomes.values())
+        return {
+            "duration": round(duration, 3),
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "outcomes": dict(self.outcomes),
+            "tasks_per_second": round(completed / duration, 3) if duration > 0 else None,
+            "task_latency": {
+                "p50": percentile(self.task_latencies, 0.5),
+                "p99": percentile(self.task_latencies, 0.99),
+            },
+            "endpoints": {
+                endpoint: {
+                    "count": len(values),
+                    "errors": self.errors.get(endpoint, 0),
+                    "p50_ms": round(percentile(values, 0.5) * 1000, 2),
+                    "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+                    "max_ms": round(max(values) * 1000, 2),
+                }
+                for endpoint, values in sorted(self.latencies.items())
+            },
+        }
+
+async def run_task(client: httpx.AsyncClient, recorder: LoadRecorder, index: int, args) -> None:
+    payload = {
+        "task_description": TASK_DESCRIPTION,
+        "target_language": "python",
+        "openrouter_api_key": f"sk-bench-{index % args.keys}",
+        "bypass_cache": not args.cache,
+    }
+    started = time.perf_counter()
+    while True:
+        response = await recorder.request(client, "POST", "submit_task", "/api/submit_task", json=payload)
+        if response is not None and response.status_code == 429:
+            recorder.rejected += 1
+            await asyncio.sleep(min(float(response.headers.get("Retry-After", "1")), 1.0))
+            continue
+        if response is None or response.status_code != 202:
+            recorder.outcomes["submit_error"] = recorder.outcomes.get("submit_error", 0) + 1
+            return
+        break
+    recorder.submitted += 1
+    task_id = response.json()["task_id"]
+
+    since = 0
+    while True:
+        await asyncio.sleep(args.poll_interval)
+        response = await recorder.request(client, "GET", "task_status", f"/api/task_status/{task_id}", params={"since": since})
+        if response is None or response.status_code != 200:
+            continue
+        status = response.json()
+        since = status["log_offset"]
+        if status["status"] in TERMINAL_STATUSES:
+            recorder.outcomes[status["status"]] = recorder.outcomes.get(status["status"], 0) + 1
+            recorder.task_latencies.append(time.perf_counter() - started)
+            return
+
+async def scenario_burst(client: httpx.AsyncClient, recorder: LoadRecorder, args) -> None:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(index: int):
+        async with semaphore:
+            await run_task(client, recorder, index, args)
+
+    await asyncio.gather(*(limited(index) for index in range(args.tasks)))
+
+async def scenario_steady(client: httpx.AsyncClient, recorder: LoadRecorder, args) -> None:
+    running = []
+    deadline = time.perf_counter() + args.duration
+    index = 0
+    while time.perf_counter() < deadline:
+        running.append(asyncio.create_task(run_task(client, recorder, index, args)))
+        index += 1
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*running)
+
+async def scenario_poll(client: httpx.AsyncClient, recorder: LoadRecorder, args) -> None:
+    tasks = [asyncio.create_task(run_task(client, recorder, index, args)) for index in range(args.keys)]
+    deadline = time.perf_counter() + args.duration
+
+    async def poller():
+        while time.perf_counter() < deadline:
+            await recorder.request(client, "GET", "tasks", "/api/tasks", params={"limit": 100})
+            await recorder.request(client, "GET", "health", "/health")
+            await recorder.request(client, "GET", "metrics", "/metrics")
+
+    await asyncio.gather(*(poller() for _ in range(args.concurrency)))
+    await asyncio.gather(*tasks)
+
+SCENARIOS = {
+    "burst": (scenario_burst, None),
+    "steady": (scenario_steady, None),
+    "poll": (scenario_poll, None),
+    "fix": (scenario_burst, 0.7),
+}
+
+class InProcessBackend:
+    def __init__(self, llm_url: str, executor: FakeSandboxExecutor, port: int):
+        os.environ["OPENROUTER_API_BASE"] = llm_url
+        import uvicorn
+        import main
+        from agent_logic.crew_registry import CrewRegistry
+
+        main.crew_registry = CrewRegistry(sandbox_executor=executor)
+        self.server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+        self.url = f"http://127.0.0.1:{port}"
+        self._thread = threading.Thread(target=self.server.run, name="backend", daemon=True)
+
+    def start(self) -> "InProcessBackend":
+        self._thread.start()
+        while not self.server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Backend failed to start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+
+def print_report(name: str, report: Dict):
+    outcomes = ", ".join(f"{count} {status}" for status, count in sorted(report["outcomes"].items())) or "none finished"
+    print(f"\nscenario {name}: {report['submitted']} tasks ({outcomes}, {report['rejected']} rejected) "
+          f"in {report['duration']:.1f}s -> {report['tasks_per_second']} tasks/s")
+    latency = report["task_latency"]
+    if latency["p50"] is not None:
+        print(f"  task latency   p50 {latency['p50']:.2f}s   p99 {latency['p99']:.2f}s")
+    print(f"  {'endpoint':<14} {'count':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"  {endpoint:<14} {stats['count']:>7} {stats['p50_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9} {stats['errors']:>7}")
+    memory = report.get("memory")
+    if memory and memory["before"] is not None and memory["after"] is not None:
+        print(f"  rss {memory['before'] / 2 ** 20:.1f} MB -> {memory['after'] / 2 ** 20:.1f} MB "
+              f"({(memory['after'] - memory['before']) / 2 ** 20:+.1f} MB)")
+    for label in ("llm", "sandbox"):
+        if report.get(label):
+            print(f"  {label}: {report[label]}")
+
+async def run_scenarios(args, backend_url: str, executor: Optional[FakeSandboxExecutor], llm: StubLLMServer, pid: Optional[int]) -> Dict:
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency + args.keys + 10)
+    async with httpx.AsyncClient(base_url=backend_url, timeout=60.0, limits=limits) as client:
+        if args.warmup:
+            await scenario_burst(client, LoadRecorder(), argparse.Namespace(**{**vars(args), "tasks": args.warmup}))
+        for name in args.scenarios:
+            fn, failure_rate = SCENARIOS[name]
+            if executor is not None:
+                executor.failure_rate = args.failure_rate if failure_rate is None else failure_rate
+            gc.collect()
+            before = rss_bytes(pid)
+            recorder = LoadRecorder()
+            started = time.perf_counter()
+            await fn(client, recorder, args)
+            report = recorder.report(time.perf_counter() - started)
+            gc.collect()
+            report["memory"] = {"before": before, "after": rss_bytes(pid)}
+            report["llm"] = llm.snapshot()
+            report["sandbox"] = executor.snapshot() if executor is not None else None
+            results[name] = report
+            print_report(name, report)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend against a stub LLM server and a fake sandbox")
+    parser.add_argument("--scenarios", nargs="*", default=["burst", "steady", "poll", "fix"], choices=list(SCENARIOS))
+    parser.add_argument("--tasks", type=int, default=40, help="tasks per burst scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent submitters / pollers")
+    parser.add_argument("--rate", type=float, default=4.0, help="arrivals per second in the steady scenario")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds for the steady and poll scenarios")
+    parser.add_argument("--keys", type=int, default=8, help="distinct API keys (the scheduler limits tasks per key)")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--warmup", type=int, default=2, help="tasks run before measuring")
+    parser.add_argument("--cache", action="store_true", help="allow LLM response cache hits")
+    parser.add_argument("--llm-ttft", type=float, default=0.2)
+    parser.add_argument("--llm-tps", type=float, default=400.0)
+    parser.add_argument("--llm-port", type=int, default=0)
+    parser.add_argument("--run-seconds", type=float, default=0.5, help="fake sandbox run time")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="fake sandbox failure rate")
+    parser.add_argument("--port", type=int, default=8765, help="port for the in-process backend")
+    parser.add_argument("--url", help="load an already running backend instead (start it with OPENROUTER_API_BASE at the stub)")
+    parser.add_argument("--pid", type=int, help="backend process id for memory readings with --url")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    llm = StubLLMServer(port=args.llm_port, ttft=args.llm_ttft, tokens_per_second=args.llm_tps, seed=1).start()
+    print(f"stub LLM at {llm.url}")
+
+    backend = None
+    executor = None
+    if args.url:
+        backend_url, pid = args.url, args.pid
+    else:
+        executor = FakeSandboxExecutor(run_seconds=args.run_seconds, failure_rate=args.failure_rate, seed=1)
+        backend = InProcessBackend(llm.url, executor, args.port).start()
+        backend_url, pid = backend.url, None
+    print(f"backend at {backend_url}")
+
+    try:
+        results = asyncio.run(run_scenarios(args, backend_url, executor, llm, pid))
+    finally:
+        if backend is not None:
+            backend.stop()
+        llm.stop()
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"config": vars(args), "scenarios": results}, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
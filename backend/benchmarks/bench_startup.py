@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+MODES = ("lazy", "warm", "eager")
+
+def import_profile(module: str) -> Dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    packages: Dict[str, float] = {}
+    for entry in entries:
+        top = entry["module"].split(".")[0]
+        packages[top] = packages.get(top, 0.0) + entry["self_ms"]
+    target = next((entry for entry in entries if entry["module"] == module), None)
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode != 0 and proc.stderr.strip() else None,
+        "total_ms": target["cumulative_ms"] if target else sum(entry["self_ms"] for entry in entries),
+        "modules": len(entries),
+        "packages": dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)),
+        "slowest": sorted(entries, key=lambda entry: entry["self_ms"], reverse=True),
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def poll_health(url: str, deadline: float) -> Optional[Dict]:
+    try:
+        with urllib.request.urlopen(url, timeout=max(0.1, deadline - time.monotonic())) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, ConnectionError, OSError, ValueError):
+        return None
+
+def measure_startup(mode: str, timeout: float, interval: float) -> Dict:
+    port = free_port()
+    env = dict(os.environ, STARTUP_MODE=mode, STARTUP_WARMUP_DELAY="0")
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    url = f"http://127.0.0.1:{port}/health"
+    deadline = started + timeout
+    healthy = ready = None
+    runtime = None
+    try:
+        while time.monotonic() < deadline and proc.poll() is None:
+            body = poll_health(url, deadline)
+            if body is not None:
+                now = time.monotonic() - started
+                healthy = healthy if healthy is not None else now
+                runtime = body.get("agent_runtime")
+                if runtime == "ready":
+                    ready = now
+                if mode == "lazy" or runtime in ("ready", "failed"):
+                    break
+            time.sleep(interval)
+    finally:
+        proc.terminate()
+        try:
+            _, stderr = proc.communicate(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            _, stderr = proc.communicate()
+    result = {"mode": mode, "first_healthy_s": healthy, "runtime_ready_s": ready, "runtime": runtime}
+    if healthy is None:
+        lines = (stderr or "").strip().splitlines()
+        result["error"] = lines[-1] if lines else "no healthy response before timeout"
+    return result
+
+def median(values: List[Optional[float]]) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return round(statistics.median(values), 3) if values else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend import time per module and time to first healthy response")
+    parser.add_argument("--modules", nargs="*", default=["main", "agent_logic.software_engineer_crew"], help="modules to profile with -X importtime")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules and packages to print")
+    parser.add_argument("--modes", nargs="*", default=list(MODES), choices=MODES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between /health polls")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args()
+
+    report = {"imports": {}, "startup": {}}
+    for module in args.modules:
+        profile = import_profile(module)
+        report["imports"][module] = profile
+        status = "" if profile["ok"] else f"  (failed: {profile['error']})"
+        print(f"\nimport {module}: {profile['total_ms']:.1f} ms across {profile['modules']} modules{status}")
+        print(f"  {'package':<32} {'self ms':>9}")
+        for package, ms in list(profile["packages"].items())[:args.top]:
+            print(f"  {package:<32} {ms:>9.1f}")
+        print(f"  {'slowest module':<48} {'self ms':>9} {'cum ms':>9}")
+        for entry in profile["slowest"][:args.top]:
+            print(f"  {entry['module'][:48]:<48} {entry['self_ms']:>9.1f} {entry['cumulative_ms']:>9.1f}")
+
+    print(f"\n{'mode':<8} {'first /health s':>16} {'runtime ready s':>16}  runtime")
+    for mode in args.modes:
+        runs = [measure_startup(mode, args.timeout, args.interval) for _ in range(args.repeat)]
+        summary = {
+            "first_healthy_s": median([run["first_healthy_s"] for run in runs]),
+            "runtime_ready_s": median([run["runtime_ready_s"] for run in runs]),
+            "runtime": runs[-1]["runtime"],
+            "runs": runs,
+        }
+        report["startup"][mode] = summary
+        healthy = "-" if summary["first_healthy_s"] is None else f"{summary['first_healthy_s']:.3f}"
+        ready = "-" if summary["runtime_ready_s"] is None else f"{summary['runtime_ready_s']:.3f}"
+        print(f"{mode:<8} {healthy:>16} {ready:>16}  {summary['runtime'] or runs[-1].get('error')}")
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+if __name__ == "__main__":
+    main()
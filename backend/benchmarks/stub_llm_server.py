@@ -0,0 +1,298 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+PLAN_RESPONSE = """Thought: I now know the final answer
+Final Answer: ## Components
+1. `calculator` - pure arithmetic helpers
+2. `cli` - parses arguments and prints results
+
+## Steps
+1. Implement the calculator module
+2. Wire the CLI entry point
+3. Add unit tests covering each operation and invalid input
+
+requirements.txt
+```
+pytest==7.4.3
+```
+"""
+
+CODE_RESPONSE = """Thought: I now know the final answer
+Final Answer: Here is the implementation.
+
+main.py
+```python
+import sys
+
+
+def add(a: float, b: float) -> float:
+    return a + b
+
+
+def divide(a: float, b: float) -> float:
+    if b == 0:
+        raise ValueError("division by zero")
+    return a / b
+
+
+if __name__ == "__main__":
+    print(add(float(sys.argv[1]), float(sys.argv[2])))
+```
+
+tests.py
+```python
+import pytest
+
+from main import add, divide
+
+
+def test_add():
+    assert add(2, 3) == 5
+
+
+def test_divide_by_zero():
+    with pytest.raises(ValueError):
+        divide(1, 0)
+```
+"""
+
+FIX_RESPONSE = """Thought: I now know the final answer
+Final Answer: The division guard compared against the wrong value.
+
+main.py
+```python
+import sys
+
+
+def add(a: float, b: float) -> float:
+    return a + b
+
+
+def divide(a: float, b: float) -> float:
+    if b == 0:
+        raise ValueError("division by zero")
+    return a / b
+
+
+if __name__ == "__main__":
+    print(add(float(sys.argv[1]), float(sys.argv[2])))
+```
+"""
+
+GENERIC_RESPONSE = """Thought: I now know the final answer
+Final Answer: Done.
+"""
+
+TOKEN_PATTERN = re.compile(r"\s*\S{1,4}|\s+")
+
+def pick_response(messages: List[Dict]) -> str:
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    if "analyze the errors" in prompt:
+        return FIX_RESPONSE
+    if "Generate production-ready code" in prompt:
+        return CODE_RESPONSE
+    if "architecture plan" in prompt:
+        return PLAN_RESPONSE
+    return GENERIC_RESPONSE
+
+class StubLLMServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        ttft: float = 0.2,
+        tokens_per_second: float = 200.0,
+        jitter: float = 0.1,
+        error_rate: float = 0.0,
+        max_concurrency: int = 0,
+        retry_after: float = 1.0,
+        seed: Optional[int] = None
+    ):
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "streamed": 0, "errors": 0, "throttled": 0, "in_flight": 0, "max_in_flight": 0, "tokens": 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def _delay(self, seconds: float) -> float:
+        if self.jitter:
+            seconds *= 1 + self.random.uniform(-self.jitter, self.jitter)
+        return max(0.0, seconds)
+
+    def _track(self, delta: int):
+        with self._lock:
+            self.stats["in_flight"] += delta
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+                elif self.path == "/stats":
+                    self._json(200, server.snapshot())
+                else:
+                    self._json(404, {"error": {"message": "not found"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._json(404, {"error": {"message": "not found"}})
+                    return
+
+                with server._lock:
+                    server.stats["requests"] += 1
+                    failed = server.random.random() < server.error_rate
+                    throttled = not failed and 0 < server.max_concurrency <= server.stats["in_flight"]
+                    if failed:
+                        server.stats["errors"] += 1
+                    if throttled:
+                        server.stats["throttled"] += 1
+                if failed:
+                    self._json(503, {"error": {"message": "stub overloaded", "type": "server_error"}})
+                    return
+                if throttled:
+                    self._json(
+                        429, {"error": {"message": "stub rate limit exceeded", "type": "rate_limit_error"}},
+                        {"Retry-After": f"{server.retry_after:g}"}
+                    )
+                    return
+
+                model = body.get("model", "stub")
+                text = pick_response(body.get("messages", []))
+                tokens = TOKEN_PATTERN.findall(text)
+                server._track(1)
+                try:
+                    time.sleep(server._delay(server.ttft))
+                    if body.get("stream"):
+                        self._stream(model, tokens)
+                    else:
+                        time.sleep(server._delay(len(tokens) / server.tokens_per_second))
+                        self._json(200, self._completion(model, text, len(tokens)))
+                finally:
+                    server._track(-1)
+                    with server._lock:
+                        server.stats["tokens"] += len(tokens)
+
+            def _completion(self, model: str, text: str, completion_tokens: int) -> Dict:
+                return {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": completion_tokens, "total_tokens": completion_tokens},
+                }
+
+            def _stream(self, model: str, tokens: List[str]):
+                with server._lock:
+                    server.stats["streamed"] += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+                interval = 1 / server.tokens_per_second if server.tokens_per_second > 0 else 0
+                for index, token in enumerate(tokens):
+                    delta = {"content": token}
+                    if index == 0:
+                        delta["role"] = "assistant"
+                    self._event(self._chunk(chunk_id, model, delta, None))
+                    if interval:
+                        time.sleep(interval)
+                self._event(self._chunk(chunk_id, model, {}, "stop"))
+                self._write(b"data: [DONE]\n\n")
+                self._write(b"")
+
+            def _chunk(self, chunk_id: str, model: str, delta: Dict, finish_reason: Optional[str]) -> Dict:
+                return {
+                    "id": chunk_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }
+
+            def _event(self, payload: Dict):
+                self._write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+            def _write(self, data: bytes):
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible chat completions stub with simulated latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tps", type=float, default=200.0, help="streamed tokens per second")
+    parser.add_argument("--jitter", type=float, default=0.1, help="relative +/- jitter on delays")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="answer 429 above this many in-flight requests (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429 responses")
+    args = parser.parse_args()
+
+    server = StubLLMServer(
+        args.host, args.port, args.ttft, args.tps, args.jitter, args.error_rate, args.max_concurrency, args.retry_after
+    ).start()
+    print(f"Stub LLM listening on {server.url} (point OPENROUTER_API_BASE here)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
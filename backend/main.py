@@ -1,10 +1,21 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Query, Header, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uuid
 import os
-from typing import Dict, Optional
-from agent_logic.software_engineer_crew import SoftwareEngineerCrew
+import threading
+from typing import Optional, Tuple
+from agent_logic.crew_registry import get_crew_registry
+from agent_logic.llm_cache import get_llm_cache
+from agent_logic.tools.executor_backend import allowed_backends
+from agent_logic.tools.telemetry import METRICS, render_metrics
+from scheduler import QueueDispatcher, TaskScheduler, QueueFullError
+from task_runner import run_task
+from task_store import create_task_store, TERMINAL_STATUSES
+from artifact_store import create_artifact_store
+import asyncio
+import json
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -24,18 +35,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-task_status: Dict[str, dict] = {}
+task_store = create_task_store()
+
+artifact_store = create_artifact_store()
+
+crew_registry = get_crew_registry()
+
+STARTUP_MODE = os.getenv("STARTUP_MODE", "warm").lower()
+
+TASK_EXECUTION = os.getenv("TASK_EXECUTION", "local").lower()
+
+def apply_task_event(task_id: str, kind: str, data: dict):
+    if task_id not in task_store:
+        return
+    if kind == "log":
+        task_store.append_log(task_id, data["line"])
+    elif kind == "update":
+        if data.get("result") is not None:
+            data = dict(data, result=offload_result(task_id, data["result"]))
+        task_store.update(task_id, **data)
+
+if TASK_EXECUTION == "queue":
+    from task_queue import create_task_queue
+    scheduler = QueueDispatcher(create_task_queue(), apply_task_event)
+elif TASK_EXECUTION == "local":
+    scheduler = TaskScheduler(
+        max_workers=int(os.getenv("TASK_WORKERS", "4")),
+        max_queue_size=int(os.getenv("TASK_QUEUE_SIZE", "100")),
+        max_per_key=int(os.getenv("TASK_MAX_PER_KEY", "2")),
+    )
+else:
+    raise ValueError(f"Unknown TASK_EXECUTION mode: {TASK_EXECUTION}")
+
+SCHEDULER_TASKS = METRICS.gauge("opendevagent_scheduler_tasks", "Tasks queued or running in the scheduler", ("state",))
+TASKS_BY_STATUS = METRICS.gauge("opendevagent_tasks", "Tasks in the task store by status", ("status",))
+CREW_POOL = METRICS.gauge("opendevagent_crew_registry", "Pooled crews by state", ("state",))
+
+def collect_runtime_metrics():
+    stats = scheduler.stats()
+    SCHEDULER_TASKS.set(stats["queued"], state="queued")
+    SCHEDULER_TASKS.set(stats["running"], state="running")
+    for status, count in task_store.summary().items():
+        TASKS_BY_STATUS.set(count, status=status)
+    crews = crew_registry.stats()
+    CREW_POOL.set(crews["idle"], state="idle")
+    CREW_POOL.set(crews["in_use"], state="in_use")
+
+METRICS.add_collector(collect_runtime_metrics)
 
 class TaskSubmission(BaseModel):
     task_description: str
     target_language: str = "python"
     target_framework: Optional[str] = None
     openrouter_api_key: str
+    bypass_cache: bool = False
+    max_fix_iterations: Optional[int] = Field(None, ge=1, le=10)
+    fix_candidates: Optional[int] = Field(None, ge=1, le=8)
+    fix_time_budget: Optional[float] = Field(None, gt=0)
+    select_tests: Optional[bool] = None
+    final_full_run: Optional[bool] = None
+    sandbox_backend: Optional[str] = None
 
 class TaskResponse(BaseModel):
     task_id: str
     status: str
     message: str
+    queue_position: Optional[int] = None
 
 class TaskStatusResponse(BaseModel):
     task_id: str
@@ -45,92 +110,318 @@ class TaskStatusResponse(BaseModel):
     logs: list
     result: Optional[dict] = None
     error: Optional[str] = None
+    queue_position: Optional[int] = None
+    log_offset: int = 0
+
+@app.on_event("startup")
+async def start_scheduler():
+    await scheduler.start()
+    asyncio.create_task(evict_expired_tasks())
+    if TASK_EXECUTION == "queue":
+        logger.info("Tasks run on queue workers, agent runtime is not loaded here")
+    elif STARTUP_MODE == "eager":
+        await asyncio.get_running_loop().run_in_executor(None, crew_registry.warm_up)
+    elif STARTUP_MODE == "warm":
+        asyncio.create_task(warm_up_runtime())
+    else:
+        logger.info("Agent runtime will load on the first task")
+
+async def warm_up_runtime():
+    await asyncio.sleep(float(os.getenv("STARTUP_WARMUP_DELAY", "0.5")))
+    await asyncio.get_running_loop().run_in_executor(None, crew_registry.warm_up)
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
+    task_store.close()
+    crew_registry.shutdown()
+
+async def evict_expired_tasks():
+    interval = float(os.getenv("TASK_EVICT_INTERVAL", "300"))
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, task_store.evict_expired)
+            if artifact_store is not None:
+                await loop.run_in_executor(None, artifact_store.evict_expired)
+            crew_registry.evict_idle()
+        except Exception as e:
+            logger.warning(f"Task eviction failed: {str(e)}")
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "OpenDevAgent Backend"}
+    return {
+        "status": "healthy",
+        "service": "OpenDevAgent Backend",
+        "agent_runtime": crew_registry.runtime_state
+    }
 
-@app.post("/api/submit_task", response_model=TaskResponse)
-async def submit_task(submission: TaskSubmission, background_tasks: BackgroundTasks):
+@app.post("/api/submit_task", response_model=TaskResponse, status_code=202)
+async def submit_task(submission: TaskSubmission):
+    if submission.sandbox_backend and submission.sandbox_backend not in allowed_backends():
+        raise HTTPException(
+            status_code=400,
+            detail=f"sandbox_backend '{submission.sandbox_backend}' is not allowed, expected one of: {', '.join(allowed_backends())}"
+        )
+    
     task_id = str(uuid.uuid4())
     
-    task_status[task_id] = {
-        "status": "pending",
-        "phase": "planning",
-        "progress": 0,
-        "logs": ["Task queued for processing"],
-        "result": None,
-        "error": None
-    }
+    task_store.create(task_id, logs=["Task queued for processing"])
     
-    background_tasks.add_task(
-        execute_task,
-        task_id=task_id,
-        task_description=submission.task_description,
-        target_language=submission.target_language,
-        target_framework=submission.target_framework,
-        openrouter_api_key=submission.openrouter_api_key
-    )
+    try:
+        position = await scheduler.submit(
+            task_id,
+            submission.openrouter_api_key,
+            execute_task,
+            task_id=task_id,
+            task_description=submission.task_description,
+            target_language=submission.target_language,
+            target_framework=submission.target_framework,
+            openrouter_api_key=submission.openrouter_api_key,
+            bypass_cache=submission.bypass_cache,
+            fix_loop=fix_loop_overrides(submission),
+            sandbox_backend=submission.sandbox_backend
+        )
+    except QueueFullError as e:
+        task_store.delete(task_id)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
     
     return TaskResponse(
         task_id=task_id,
         status="accepted",
-        message="Task submitted for processing"
+        message="Task submitted for processing",
+        queue_position=position
     )
 
-async def execute_task(
-    task_id: str,
-    task_description: str,
-    target_language: str,
-    target_framework: Optional[str],
-    openrouter_api_key: str
-):
+def offload_result(task_id: str, result: dict) -> dict:
+    if artifact_store is None:
+        return result
     try:
-        logger.info(f"[{task_id}] Starting task execution")
-        task_status[task_id]["status"] = "running"
-        
-        crew = SoftwareEngineerCrew(openrouter_api_key=openrouter_api_key)
-        
-        result = crew.execute_plan_act_observe_fix(
-            task_id=task_id,
-            task_description=task_description,
-            target_language=target_language,
-            target_framework=target_framework,
-            task_status=task_status
-        )
-        
-        task_status[task_id]["status"] = "completed"
-        task_status[task_id]["phase"] = "complete"
-        task_status[task_id]["progress"] = 100
-        task_status[task_id]["result"] = result
-        
+        status = task_store.get(task_id, include_result=False)
+        return artifact_store.offload(task_id, result, status["logs"] if status else None)
     except Exception as e:
-        logger.error(f"[{task_id}] Task execution failed: {str(e)}")
-        task_status[task_id]["status"] = "failed"
-        task_status[task_id]["error"] = str(e)
-        task_status[task_id]["logs"].append(f"ERROR: {str(e)}")
+        logger.warning(f"[{task_id}] Could not offload result to artifact store, keeping it inline: {str(e)}")
+        return result
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def fix_loop_overrides(submission: TaskSubmission) -> dict:
+    overrides = {
+        "max_iterations": submission.max_fix_iterations,
+        "candidates": submission.fix_candidates,
+        "time_budget": submission.fix_time_budget,
+        "select_tests": submission.select_tests,
+        "final_full_run": submission.final_full_run,
+    }
+    return {key: value for key, value in overrides.items() if value is not None}
+
+def execute_task(cancel_event: Optional[threading.Event] = None, **task):
+    outcome = run_task(task_store, crew_registry, cancel_event=cancel_event, **task)
+    if outcome.get("result") is not None:
+        outcome["result"] = offload_result(task["task_id"], outcome["result"])
+    task_store.update(task["task_id"], **outcome)
 
 @app.get("/api/task_status/{task_id}", response_model=TaskStatusResponse)
-async def get_task_status(task_id: str):
-    if task_id not in task_status:
+async def get_task_status(task_id: str, since: int = Query(0, ge=0)):
+    status = task_store.get(task_id, since=since)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    return TaskStatusResponse(queue_position=scheduler.position(task_id), **status)
+
+async def task_updates(task_id: str, since: int):
+    interval = float(os.getenv("TASK_STREAM_INTERVAL", "0.5"))
+    last_snapshot = None
+    while True:
+        update = task_store.get(task_id, since=since, include_result=False)
+        if update is None:
+            return
+        
+        snapshot = (update["status"], update["phase"], update["progress"], update["log_offset"])
+        if snapshot != last_snapshot:
+            last_snapshot = snapshot
+            since = update["log_offset"]
+            yield {
+                "task_id": task_id,
+                "status": update["status"],
+                "phase": update["phase"],
+                "progress": update["progress"],
+                "logs": update["logs"],
+                "log_offset": update["log_offset"],
+                "error": update["error"],
+            }
+        else:
+            yield None
+        
+        if update["status"] in TERMINAL_STATUSES:
+            return
+        await asyncio.sleep(interval)
+
+@app.get("/api/task_events/{task_id}")
+async def stream_task_events(
+    task_id: str,
+    since: int = Query(0, ge=0),
+    last_event_id: Optional[str] = Header(None)
+):
+    if task_id not in task_store:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    
+    async def event_stream():
+        idle_ticks = 0
+        async for update in task_updates(task_id, since):
+            if update is None:
+                idle_ticks += 1
+                if idle_ticks % 30 == 0:
+                    yield ": keep-alive\n\n"
+                continue
+            idle_ticks = 0
+            yield f"id: {update['log_offset']}\nevent: update\ndata: {json.dumps(update)}\n\n"
+        yield "event: end\ndata: {}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/llm_cache")
+async def llm_cache_stats():
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/api/llm_gateway")
+async def llm_gateway_stats():
+    return crew_registry.llm_gateway_stats()
+
+@app.get("/api/task/{task_id}/artifacts")
+async def list_artifacts(task_id: str):
+    manifest = artifact_store.manifest(task_id) if artifact_store is not None else None
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="No artifacts for this task")
+    return {
+        "task_id": task_id,
+        "artifacts": [
+            {"name": name, "size": meta["size"], "sha256": meta["id"], "url": f"/api/task/{task_id}/artifacts/{name}"}
+            for name, meta in manifest.items()
+        ]
+    }
+
+@app.get("/api/task/{task_id}/artifacts/{name:path}")
+async def download_artifact(
+    task_id: str,
+    name: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None)
+):
+    meta = artifact_store.resolve(task_id, name) if artifact_store is not None else None
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    
+    etag = f'"{meta["id"]}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=31536000, immutable"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    
+    size = meta["size"]
+    byte_range = parse_range(range_header, size)
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(max(0, end - start + 1))
+    
+    return StreamingResponse(
+        artifact_store.read_range(meta["id"], start, end) if size else iter(()),
+        status_code=status_code,
+        media_type=meta["content_type"],
+        headers=headers
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.websocket("/ws/task/{task_id}")
+async def task_websocket(websocket: WebSocket, task_id: str, since: int = 0):
+    await websocket.accept()
+    if task_id not in task_store:
+        await websocket.close(code=4404, reason="Task not found")
+        return
+    
+    try:
+        async for update in task_updates(task_id, since):
+            if update is not None:
+                await websocket.send_json(update)
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"[{task_id}] WebSocket client disconnected")
+
+@app.post("/api/cancel_task/{task_id}", response_model=TaskResponse)
+async def cancel_task(task_id: str):
+    if task_id not in task_store:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    status = task_status[task_id]
-    return TaskStatusResponse(**status)
+    outcome = await scheduler.cancel(task_id)
+    if outcome is None:
+        raise HTTPException(status_code=409, detail="Task is not queued or running")
+    
+    if outcome == "dequeued":
+        task_store.append_log(task_id, "Task cancelled before start")
+        task_store.update(task_id, status="cancelled")
+        message = "Task removed from queue"
+    else:
+        task_store.append_log(task_id, "Cancellation requested")
+        message = "Task will stop at the next phase boundary"
+    
+    return TaskResponse(task_id=task_id, status="cancelled", message=message)
 
 @app.get("/api/tasks")
-async def list_tasks():
+async def list_tasks(
+    status: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    total, task_ids = task_store.list_tasks(status=status, limit=limit, offset=offset)
     return {
-        "total": len(task_status),
-        "tasks": list(task_status.keys()),
-        "status_summary": {
-            "pending": sum(1 for s in task_status.values() if s["status"] == "pending"),
-            "running": sum(1 for s in task_status.values() if s["status"] == "running"),
-            "completed": sum(1 for s in task_status.values() if s["status"] == "completed"),
-            "failed": sum(1 for s in task_status.values() if s["status"] == "failed"),
-        }
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "tasks": task_ids,
+        "status_summary": task_store.summary(),
+        "scheduler": scheduler.stats(),
+        "crew_registry": crew_registry.stats()
     }
 
+@app.get("/api/workers")
+async def list_workers():
+    if TASK_EXECUTION != "queue":
+        return {"mode": TASK_EXECUTION, "workers": []}
+    workers = await asyncio.get_running_loop().run_in_executor(None, scheduler.workers)
+    return {"mode": TASK_EXECUTION, "workers": workers}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,75 @@
+import base64
+import hashlib
+import hmac
+import os
+from typing import Dict, Optional, Tuple
+
+SECRET_FIELDS = ("openrouter_api_key",)
+SEALED_PREFIX = "sealed:v1:"
+NONCE_BYTES = 16
+TAG_BYTES = 32
+
+class PayloadSealError(ValueError):
+    pass
+
+class PayloadSealer:
+    def __init__(self, secret: str, fields: Tuple[str, ...] = SECRET_FIELDS):
+        if not secret:
+            raise ValueError("QUEUE_SECRET_KEY must be set to queue tasks")
+        master = secret.encode("utf-8")
+        self._encryption_key = hmac.new(master, b"opendev-queue-encryption", hashlib.sha256).digest()
+        self._mac_key = hmac.new(master, b"opendev-queue-mac", hashlib.sha256).digest()
+        self.fields = fields
+
+    def seal_payload(self, task_id: str, payload: Dict) -> Dict:
+        sealed = dict(payload)
+        for field in self.fields:
+            if sealed.get(field):
+                sealed[field] = self.seal(task_id, sealed[field])
+        return sealed
+
+    def open_payload(self, task_id: str, payload: Dict) -> Dict:
+        opened = dict(payload)
+        for field in self.fields:
+            if opened.get(field):
+                opened[field] = self.open(task_id, opened[field])
+        return opened
+
+    def seal(self, task_id: str, value: str) -> str:
+        nonce = os.urandom(NONCE_BYTES)
+        ciphertext = self._xor(nonce, value.encode("utf-8"))
+        tag = self._tag(task_id, nonce, ciphertext)
+        return SEALED_PREFIX + base64.urlsafe_b64encode(nonce + ciphertext + tag).decode("ascii")
+
+    def open(self, task_id: str, value: str) -> str:
+        if not isinstance(value, str) or not value.startswith(SEALED_PREFIX):
+            raise PayloadSealError("Queued secret is not sealed")
+        try:
+            blob = base64.urlsafe_b64decode(value[len(SEALED_PREFIX):].encode("ascii"))
+        except ValueError as e:
+            raise PayloadSealError(f"Queued secret is malformed: {str(e)}")
+        if len(blob) < NONCE_BYTES + TAG_BYTES:
+            raise PayloadSealError("Queued secret is truncated")
+        nonce, ciphertext, tag = blob[:NONCE_BYTES], blob[NONCE_BYTES:-TAG_BYTES], blob[-TAG_BYTES:]
+        if not hmac.compare_digest(tag, self._tag(task_id, nonce, ciphertext)):
+            raise PayloadSealError("Queued secret failed authentication, check that QUEUE_SECRET_KEY matches on API and workers")
+        return self._xor(nonce, ciphertext).decode("utf-8")
+
+    def _tag(self, task_id: str, nonce: bytes, ciphertext: bytes) -> bytes:
+        return hmac.new(self._mac_key, task_id.encode("utf-8") + b"\0" + nonce + ciphertext, hashlib.sha256).digest()
+
+    def _xor(self, nonce: bytes, data: bytes) -> bytes:
+        stream = bytearray()
+        counter = 0
+        while len(stream) < len(data):
+            stream += hmac.new(self._encryption_key, nonce + counter.to_bytes(8, "big"), hashlib.sha256).digest()
+            counter += 1
+        return bytes(a ^ b for a, b in zip(data, stream))
+
+_sealer: Optional[PayloadSealer] = None
+
+def get_payload_sealer() -> PayloadSealer:
+    global _sealer
+    if _sealer is None:
+        _sealer = PayloadSealer(os.getenv("QUEUE_SECRET_KEY", ""))
+    return _sealer
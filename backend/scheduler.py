@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from queue_secrets import get_payload_sealer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    pass
+
+class ScheduledJob:
+    def __init__(self, task_id: str, key: str, fn: Callable, kwargs: Dict):
+        self.task_id = task_id
+        self.key = key
+        self.fn = fn
+        self.kwargs = kwargs
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        return self.fn(cancel_event=self.cancel_event, **self.kwargs)
+
+class TaskScheduler:
+    def __init__(self, max_workers: int = 4, max_queue_size: int = 100, max_per_key: int = 2):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.max_per_key = max_per_key
+        self._pending: "OrderedDict[str, ScheduledJob]" = OrderedDict()
+        self._running: Dict[str, ScheduledJob] = {}
+        self._running_per_key: Dict[str, int] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cond: Optional[asyncio.Condition] = None
+        self._workers: List[asyncio.Task] = []
+
+    @staticmethod
+    def key_for(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+    async def start(self):
+        self._cond = asyncio.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="crew-worker")
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.max_workers)]
+        logger.info(f"Task scheduler started: {self.max_workers} workers, queue size {self.max_queue_size}")
+
+    async def stop(self):
+        if self._cond is None:
+            return
+        async with self._cond:
+            for job in list(self._pending.values()) + list(self._running.values()):
+                job.cancel_event.set()
+            self._pending.clear()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._cond = None
+
+    async def submit(self, task_id: str, api_key: str, fn: Callable, /, **kwargs) -> int:
+        async with self._cond:
+            if len(self._pending) >= self.max_queue_size:
+                raise QueueFullError(f"Task queue is full ({self.max_queue_size} pending)")
+            self._pending[task_id] = ScheduledJob(task_id, self.key_for(api_key), fn, kwargs)
+            position = len(self._pending)
+            self._cond.notify_all()
+        return position
+
+    async def cancel(self, task_id: str) -> Optional[str]:
+        async with self._cond:
+            job = self._pending.pop(task_id, None)
+            if job is not None:
+                job.cancel_event.set()
+                self._cond.notify_all()
+                return "dequeued"
+            job = self._running.get(task_id)
+            if job is not None:
+                job.cancel_event.set()
+                return "cancelling"
+        return None
+
+    def position(self, task_id: str) -> Optional[int]:
+        for index, pending_id in enumerate(self._pending):
+            if pending_id == task_id:
+                return index + 1
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.max_workers,
+            "queued": len(self._pending),
+            "running": len(self._running),
+            "queue_capacity": self.max_queue_size,
+            "max_per_key": self.max_per_key,
+        }
+
+    def _next_runnable(self) -> Optional[ScheduledJob]:
+        for job in self._pending.values():
+            if self._running_per_key.get(job.key, 0) < self.max_per_key:
+                return job
+        return None
+
+    async def _worker(self, index: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self._cond:
+                job = self._next_runnable()
+                while job is None:
+                    await self._cond.wait()
+                    job = self._next_runnable()
+                del self._pending[job.task_id]
+                self._running[job.task_id] = job
+                self._running_per_key[job.key] = self._running_per_key.get(job.key, 0) + 1
+
+            try:
+                await loop.run_in_executor(self._executor, job.run)
+            except Exception as e:
+                logger.error(f"[{job.task_id}] Worker {index} job failed: {str(e)}")
+            finally:
+                async with self._cond:
+                    self._running.pop(job.task_id, None)
+                    remaining = self._running_per_key.get(job.key, 1) - 1
+                    if remaining > 0:
+                        self._running_per_key[job.key] = remaining
+                    else:
+                        self._running_per_key.pop(job.key, None)
+                    self._cond.notify_all()
+
+class QueueDispatcher:
+    def __init__(self, task_queue, on_event: Callable[[str, str, Dict], None], poll_interval: float = 0.2, sealer=None):
+        self.task_queue = task_queue
+        self.sealer = sealer or get_payload_sealer()
+        self.on_event = on_event
+        self.poll_interval = poll_interval
+        self._cursor: Optional[str] = None
+        self._pump: Optional[asyncio.Task] = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._cursor = await loop.run_in_executor(None, self.task_queue.event_cursor)
+        self._pump = asyncio.create_task(self._pump_events())
+        logger.info(f"Dispatching tasks to workers through {type(self.task_queue).__name__}")
+
+    async def stop(self):
+        if self._pump is not None:
+            self._pump.cancel()
+            await asyncio.gather(self._pump, return_exceptions=True)
+            self._pump = None
+        self.task_queue.close()
+
+    async def submit(self, task_id: str, api_key: str, fn: Callable, /, **kwargs) -> int:
+        loop = asyncio.get_running_loop()
+        payload = self.sealer.seal_payload(task_id, kwargs)
+        return await loop.run_in_executor(None, self.task_queue.put, task_id, TaskScheduler.key_for(api_key), payload)
+
+    async def cancel(self, task_id: str) -> Optional[str]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.task_queue.cancel, task_id)
+
+    def position(self, task_id: str) -> Optional[int]:
+        return self.task_queue.position(task_id)
+
+    def stats(self) -> Dict:
+        return {"mode": "queue", **self.task_queue.stats()}
+
+    def workers(self) -> List[Dict]:
+        return self.task_queue.workers()
+
+    async def _pump_events(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                self._cursor, events = await loop.run_in_executor(None, self.task_queue.read_events, self._cursor)
+                await loop.run_in_executor(None, self._apply, events)
+            except Exception as e:
+                logger.warning(f"Reading task events failed: {str(e)}")
+                events = []
+            if not events:
+                await asyncio.sleep(self.poll_interval)
+
+    def _apply(self, events: List[Tuple[str, str, Dict]]):
+        for task_id, kind, data in events:
+            try:
+                self.on_event(task_id, kind, data)
+            except Exception as e:
+                logger.warning(f"[{task_id}] Could not apply {kind} event: {str(e)}")
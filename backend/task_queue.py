@@ -0,0 +1,551 @@
+import abc
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from scheduler import QueueFullError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Lease:
+    def __init__(self, task_id: str, token: str, key: str, payload: Dict, attempts: int):
+        self.task_id = task_id
+        self.token = token
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+
+class TaskQueue(abc.ABC):
+    def __init__(
+        self,
+        max_queue_size: int = 100,
+        max_per_key: int = 2,
+        lease_seconds: float = 60.0,
+        event_retention: float = 3600.0
+    ):
+        self.max_queue_size = max_queue_size
+        self.max_per_key = max_per_key
+        self.lease_seconds = lease_seconds
+        self.event_retention = event_retention
+
+    @abc.abstractmethod
+    def put(self, task_id: str, key: str, payload: Dict) -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def claim(self, worker_id: str) -> Optional[Lease]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def heartbeat(self, lease: Lease) -> str:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def complete(self, lease: Lease, fields: Dict) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def release(self, lease: Lease) -> bool:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cancel(self, task_id: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def position(self, task_id: str) -> Optional[int]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def publish(self, task_id: str, kind: str, data: Dict):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def event_cursor(self) -> str:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def read_events(self, cursor: str, limit: int = 500) -> Tuple[str, List[Tuple[str, str, Dict]]]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def worker_heartbeat(self, worker_id: str, info: Dict):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def unregister_worker(self, worker_id: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def workers(self) -> List[Dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def _token(self) -> str:
+        return uuid.uuid4().hex
+
+QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_jobs (
+    task_id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker_id TEXT,
+    token TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_jobs_state ON queue_jobs(state, enqueued_at);
+
+CREATE TABLE IF NOT EXISTS queue_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_events_created ON queue_events(created_at);
+
+CREATE TABLE IF NOT EXISTS queue_workers (
+    worker_id TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    seen_at REAL NOT NULL
+);
+"""
+
+class SQLiteTaskQueue(TaskQueue):
+    def __init__(self, path: str, **options):
+        super().__init__(**options)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._connection().executescript(QUEUE_SCHEMA)
+        self._trimmed_at = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _event(self, conn: sqlite3.Connection, task_id: str, kind: str, data: Dict):
+        conn.execute(
+            "INSERT INTO queue_events (task_id, kind, data, created_at) VALUES (?, ?, ?, ?)",
+            (task_id, kind, json.dumps(data, default=str), time.time()),
+        )
+
+    def put(self, task_id: str, key: str, payload: Dict) -> int:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            queued = conn.execute("SELECT COUNT(*) FROM queue_jobs WHERE state = 'queued'").fetchone()[0]
+            if queued >= self.max_queue_size:
+                raise QueueFullError(f"Task queue is full ({self.max_queue_size} pending)")
+            conn.execute(
+                "INSERT INTO queue_jobs (task_id, key, payload, state, enqueued_at) VALUES (?, ?, ?, 'queued', ?)",
+                (task_id, key, json.dumps(payload), time.time()),
+            )
+        return queued + 1
+
+    def claim(self, worker_id: str) -> Optional[Lease]:
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = conn.execute(
+                "SELECT task_id, worker_id, cancel_requested FROM queue_jobs WHERE state = 'leased' AND lease_expires < ?",
+                (now,),
+            ).fetchall()
+            for row in expired:
+                if row["cancel_requested"]:
+                    conn.execute("DELETE FROM queue_jobs WHERE task_id = ?", (row["task_id"],))
+                    self._event(conn, row["task_id"], "log", {"line": "Task cancelled"})
+                    self._event(conn, row["task_id"], "update", {"status": "cancelled"})
+                    continue
+                logger.warning(f"[{row['task_id']}] Lease held by {row['worker_id']} expired, re-queueing")
+                conn.execute(
+                    "UPDATE queue_jobs SET state = 'queued', token = NULL, worker_id = NULL WHERE task_id = ?",
+                    (row["task_id"],),
+                )
+                self._event(conn, row["task_id"], "log", {"line": f"Worker {row['worker_id']} stopped responding, task re-queued"})
+
+            running = {
+                row[0]: row[1] for row in conn.execute(
+                    "SELECT key, COUNT(*) FROM queue_jobs WHERE state = 'leased' GROUP BY key"
+                )
+            }
+            for row in conn.execute("SELECT task_id, key FROM queue_jobs WHERE state = 'queued' ORDER BY enqueued_at").fetchall():
+                if running.get(row["key"], 0) >= self.max_per_key:
+                    continue
+                token = self._token()
+                conn.execute(
+                    "UPDATE queue_jobs SET state = 'leased', worker_id = ?, token = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE task_id = ?",
+                    (worker_id, token, now + self.lease_seconds, row["task_id"]),
+                )
+                job = conn.execute("SELECT payload, attempts FROM queue_jobs WHERE task_id = ?", (row["task_id"],)).fetchone()
+                return Lease(row["task_id"], token, row["key"], json.loads(job["payload"]), job["attempts"])
+        return None
+
+    def heartbeat(self, lease: Lease) -> str:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT token, cancel_requested FROM queue_jobs WHERE task_id = ?", (lease.task_id,)).fetchone()
+            if row is None or row["token"] != lease.token:
+                return "lost"
+            conn.execute(
+                "UPDATE queue_jobs SET lease_expires = ? WHERE task_id = ?",
+                (time.time() + self.lease_seconds, lease.task_id),
+            )
+            return "cancelled" if row["cancel_requested"] else "ok"
+
+    def complete(self, lease: Lease, fields: Dict) -> bool:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            deleted = conn.execute(
+                "DELETE FROM queue_jobs WHERE task_id = ? AND token = ?", (lease.task_id, lease.token)
+            ).rowcount
+            if deleted:
+                self._event(conn, lease.task_id, "update", fields)
+        return bool(deleted)
+
+    def release(self, lease: Lease) -> bool:
+        return bool(self._connection().execute(
+            "UPDATE queue_jobs SET state = 'queued', token = NULL, worker_id = NULL, attempts = attempts - 1 "
+            "WHERE task_id = ? AND token = ?",
+            (lease.task_id, lease.token),
+        ).rowcount)
+
+    def cancel(self, task_id: str) -> Optional[str]:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT state FROM queue_jobs WHERE task_id = ?", (task_id,)).fetchone()
+            if row is None:
+                return None
+            if row["state"] == "queued":
+                conn.execute("DELETE FROM queue_jobs WHERE task_id = ?", (task_id,))
+                return "dequeued"
+            conn.execute("UPDATE queue_jobs SET cancel_requested = 1 WHERE task_id = ?", (task_id,))
+            return "cancelling"
+
+    def position(self, task_id: str) -> Optional[int]:
+        row = self._connection().execute(
+            "SELECT (SELECT COUNT(*) FROM queue_jobs AS other WHERE other.state = 'queued' AND other.enqueued_at <= job.enqueued_at) "
+            "FROM queue_jobs AS job WHERE job.task_id = ? AND job.state = 'queued'",
+            (task_id,),
+        ).fetchone()
+        return row[0] if row else None
+
+    def publish(self, task_id: str, kind: str, data: Dict):
+        self._event(self._connection(), task_id, kind, data)
+
+    def event_cursor(self) -> str:
+        return str(self._connection().execute("SELECT COALESCE(MAX(id), 0) FROM queue_events").fetchone()[0])
+
+    def read_events(self, cursor: str, limit: int = 500) -> Tuple[str, List[Tuple[str, str, Dict]]]:
+        conn = self._connection()
+        now = time.time()
+        if now - self._trimmed_at > 60:
+            self._trimmed_at = now
+            conn.execute("DELETE FROM queue_events WHERE created_at < ?", (now - self.event_retention,))
+        rows = conn.execute(
+            "SELECT id, task_id, kind, data FROM queue_events WHERE id > ? ORDER BY id LIMIT ?", (int(cursor), limit)
+        ).fetchall()
+        if not rows:
+            return cursor, []
+        return str(rows[-1]["id"]), [(row["task_id"], row["kind"], json.loads(row["data"])) for row in rows]
+
+    def worker_heartbeat(self, worker_id: str, info: Dict):
+        self._connection().execute(
+            "INSERT INTO queue_workers (worker_id, info, seen_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(worker_id) DO UPDATE SET info = excluded.info, seen_at = excluded.seen_at",
+            (worker_id, json.dumps(info), time.time()),
+        )
+
+    def unregister_worker(self, worker_id: str):
+        self._connection().execute("DELETE FROM queue_workers WHERE worker_id = ?", (worker_id,))
+
+    def workers(self) -> List[Dict]:
+        conn = self._connection()
+        conn.execute("DELETE FROM queue_workers WHERE seen_at < ?", (time.time() - 3 * self.lease_seconds,))
+        return [
+            dict(json.loads(row["info"]), worker_id=row["worker_id"], seen_at=row["seen_at"])
+            for row in conn.execute("SELECT * FROM queue_workers WHERE seen_at >= ? ORDER BY worker_id", (time.time() - self.lease_seconds,))
+        ]
+
+    def stats(self) -> Dict:
+        counts = dict(self._connection().execute("SELECT state, COUNT(*) FROM queue_jobs GROUP BY state").fetchall())
+        return {
+            "backend": "sqlite",
+            "queued": counts.get("queued", 0),
+            "running": counts.get("leased", 0),
+            "workers": len(self.workers()),
+            "queue_capacity": self.max_queue_size,
+            "max_per_key": self.max_per_key,
+        }
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+PUT_SCRIPT = """
+local p = ARGV[1]
+if redis.call('ZCARD', p .. 'pending') >= tonumber(ARGV[5]) then
+    return -1
+end
+local seq = redis.call('INCR', p .. 'seq')
+redis.call('HSET', p .. 'job:' .. ARGV[2], 'key', ARGV[3], 'payload', ARGV[4], 'seq', seq, 'attempts', 0, 'state', 'queued', 'cancel', 0)
+redis.call('ZADD', p .. 'pending', seq, ARGV[2])
+return redis.call('ZRANK', p .. 'pending', ARGV[2]) + 1
+"""
+
+CLAIM_SCRIPT = """
+local p, now, lease, worker, token = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[4], ARGV[5]
+local max_per_key, maxlen = tonumber(ARGV[6]), ARGV[7]
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', p .. 'leases', '-inf', now)) do
+    local job = p .. 'job:' .. id
+    local key = redis.call('HGET', job, 'key')
+    redis.call('ZREM', p .. 'leases', id)
+    if key then
+        redis.call('HINCRBY', p .. 'keys', key, -1)
+        if redis.call('HGET', job, 'cancel') == '1' then
+            redis.call('DEL', job)
+            redis.call('XADD', p .. 'events', 'MAXLEN', '~', maxlen, '*', 'task_id', id, 'kind', 'log', 'data', '{"line": "Task cancelled"}')
+            redis.call('XADD', p .. 'events', 'MAXLEN', '~', maxlen, '*', 'task_id', id, 'kind', 'update', 'data', '{"status": "cancelled"}')
+        else
+            local previous = redis.call('HGET', job, 'worker') or 'unknown'
+            redis.call('HSET', job, 'state', 'queued', 'token', '')
+            redis.call('ZADD', p .. 'pending', redis.call('HGET', job, 'seq'), id)
+            redis.call('XADD', p .. 'events', 'MAXLEN', '~', maxlen, '*', 'task_id', id, 'kind', 'log',
+                'data', cjson.encode({line = 'Worker ' .. previous .. ' stopped responding, task re-queued'}))
+        end
+    end
+end
+for _, id in ipairs(redis.call('ZRANGE', p .. 'pending', 0, -1)) do
+    local job = p .. 'job:' .. id
+    local key = redis.call('HGET', job, 'key')
+    if not key then
+        redis.call('ZREM', p .. 'pending', id)
+    elseif tonumber(redis.call('HGET', p .. 'keys', key) or '0') < max_per_key then
+        redis.call('ZREM', p .. 'pending', id)
+        redis.call('ZADD', p .. 'leases', now + lease, id)
+        redis.call('HINCRBY', p .. 'keys', key, 1)
+        local attempts = redis.call('HINCRBY', job, 'attempts', 1)
+        redis.call('HSET', job, 'state', 'leased', 'token', token, 'worker', worker)
+        return {id, key, redis.call('HGET', job, 'payload'), attempts}
+    end
+end
+return false
+"""
+
+HEARTBEAT_SCRIPT = """
+local p, id = ARGV[1], ARGV[2]
+local job = p .. 'job:' .. id
+if redis.call('HGET', job, 'token') ~= ARGV[3] then
+    return 'lost'
+end
+redis.call('ZADD', p .. 'leases', 'XX', tonumber(ARGV[4]), id)
+if redis.call('HGET', job, 'cancel') == '1' then
+    return 'cancelled'
+end
+return 'ok'
+"""
+
+COMPLETE_SCRIPT = """
+local p, id = ARGV[1], ARGV[2]
+local job = p .. 'job:' .. id
+if redis.call('HGET', job, 'token') ~= ARGV[3] then
+    return 0
+end
+redis.call('ZREM', p .. 'leases', id)
+redis.call('HINCRBY', p .. 'keys', redis.call('HGET', job, 'key'), -1)
+redis.call('DEL', job)
+redis.call('XADD', p .. 'events', 'MAXLEN', '~', ARGV[5], '*', 'task_id', id, 'kind', 'update', 'data', ARGV[4])
+return 1
+"""
+
+RELEASE_SCRIPT = """
+local p, id = ARGV[1], ARGV[2]
+local job = p .. 'job:' .. id
+if redis.call('HGET', job, 'token') ~= ARGV[3] then
+    return 0
+end
+redis.call('ZREM', p .. 'leases', id)
+redis.call('HINCRBY', p .. 'keys', redis.call('HGET', job, 'key'), -1)
+redis.call('HINCRBY', job, 'attempts', -1)
+redis.call('HSET', job, 'state', 'queued', 'token', '')
+redis.call('ZADD', p .. 'pending', redis.call('HGET', job, 'seq'), id)
+return 1
+"""
+
+CANCEL_SCRIPT = """
+local p, id = ARGV[1], ARGV[2]
+if redis.call('ZREM', p .. 'pending', id) == 1 then
+    redis.call('DEL', p .. 'job:' .. id)
+    return 'dequeued'
+end
+if redis.call('EXISTS', p .. 'job:' .. id) == 1 then
+    redis.call('HSET', p .. 'job:' .. id, 'cancel', 1)
+    return 'cancelling'
+end
+return false
+"""
+
+class RedisTaskQueue(TaskQueue):
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "opendev:queue:", client=None, **options):
+        super().__init__(**options)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("TASK_QUEUE=redis requires the redis package (pip install redis)") from e
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+        self.max_events = int(os.getenv("TASK_QUEUE_MAX_EVENTS", "100000"))
+        self._put = client.register_script(PUT_SCRIPT)
+        self._claim = client.register_script(CLAIM_SCRIPT)
+        self._heartbeat = client.register_script(HEARTBEAT_SCRIPT)
+        self._complete = client.register_script(COMPLETE_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+        self._cancel = client.register_script(CANCEL_SCRIPT)
+
+    def put(self, task_id: str, key: str, payload: Dict) -> int:
+        position = int(self._put(args=[self.prefix, task_id, key, json.dumps(payload), self.max_queue_size]))
+        if position < 0:
+            raise QueueFullError(f"Task queue is full ({self.max_queue_size} pending)")
+        return position
+
+    def claim(self, worker_id: str) -> Optional[Lease]:
+        token = self._token()
+        claimed = self._claim(args=[
+            self.prefix, time.time(), self.lease_seconds, worker_id, token, self.max_per_key, self.max_events
+        ])
+        if not claimed:
+            return None
+        task_id, key, payload, attempts = claimed
+        return Lease(task_id, token, key, json.loads(payload), int(attempts))
+
+    def heartbeat(self, lease: Lease) -> str:
+        return self._heartbeat(args=[self.prefix, lease.task_id, lease.token, time.time() + self.lease_seconds])
+
+    def complete(self, lease: Lease, fields: Dict) -> bool:
+        return bool(self._complete(args=[
+            self.prefix, lease.task_id, lease.token, json.dumps(fields, default=str), self.max_events
+        ]))
+
+    def release(self, lease: Lease) -> bool:
+        return bool(self._release(args=[self.prefix, lease.task_id, lease.token]))
+
+    def cancel(self, task_id: str) -> Optional[str]:
+        return self._cancel(args=[self.prefix, task_id]) or None
+
+    def position(self, task_id: str) -> Optional[int]:
+        rank = self.client.zrank(self.prefix + "pending", task_id)
+        return rank + 1 if rank is not None else None
+
+    def publish(self, task_id: str, kind: str, data: Dict):
+        self.client.xadd(
+            self.prefix + "events",
+            {"task_id": task_id, "kind": kind, "data": json.dumps(data, default=str)},
+            maxlen=self.max_events,
+            approximate=True,
+        )
+
+    def event_cursor(self) -> str:
+        last = self.client.xrevrange(self.prefix + "events", count=1)
+        return last[0][0] if last else "0-0"
+
+    def read_events(self, cursor: str, limit: int = 500) -> Tuple[str, List[Tuple[str, str, Dict]]]:
+        response = self.client.xread({self.prefix + "events": cursor}, count=limit)
+        if not response:
+            return cursor, []
+        entries = response[0][1]
+        return entries[-1][0], [(fields["task_id"], fields["kind"], json.loads(fields["data"])) for _, fields in entries]
+
+    def worker_heartbeat(self, worker_id: str, info: Dict):
+        pipe = self.client.pipeline()
+        pipe.zadd(self.prefix + "workers", {worker_id: time.time()})
+        pipe.set(self.prefix + "worker:" + worker_id, json.dumps(info), ex=max(1, int(3 * self.lease_seconds)))
+        pipe.execute()
+
+    def unregister_worker(self, worker_id: str):
+        pipe = self.client.pipeline()
+        pipe.zrem(self.prefix + "workers", worker_id)
+        pipe.delete(self.prefix + "worker:" + worker_id)
+        pipe.execute()
+
+    def workers(self) -> List[Dict]:
+        self.client.zremrangebyscore(self.prefix + "workers", "-inf", time.time() - 3 * self.lease_seconds)
+        live = self.client.zrangebyscore(self.prefix + "workers", time.time() - self.lease_seconds, "+inf", withscores=True)
+        workers = []
+        for worker_id, seen_at in live:
+            info = self.client.get(self.prefix + "worker:" + worker_id)
+            workers.append(dict(json.loads(info) if info else {}, worker_id=worker_id, seen_at=seen_at))
+        return workers
+
+    def stats(self) -> Dict:
+        return {
+            "backend": "redis",
+            "queued": self.client.zcard(self.prefix + "pending"),
+            "running": self.client.zcard(self.prefix + "leases"),
+            "workers": len(self.workers()),
+            "queue_capacity": self.max_queue_size,
+            "max_per_key": self.max_per_key,
+        }
+
+    def close(self):
+        self.client.close()
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def create_task_queue() -> TaskQueue:
+    backend = os.getenv("TASK_QUEUE", "sqlite").lower()
+    options = dict(
+        max_queue_size=int(os.getenv("TASK_QUEUE_SIZE", "100")),
+        max_per_key=int(os.getenv("TASK_MAX_PER_KEY", "2")),
+        lease_seconds=float(os.getenv("TASK_LEASE_SECONDS", "60")),
+        event_retention=float(os.getenv("TASK_QUEUE_EVENT_RETENTION", "3600")),
+    )
+    if backend == "sqlite":
+        path = os.getenv("TASK_QUEUE_PATH", "/app/work_dir/queue.db")
+        logger.info(f"Using SQLite task queue at {path}")
+        return SQLiteTaskQueue(path, **options)
+    if backend == "redis":
+        url = os.getenv("TASK_QUEUE_URL", "redis://localhost:6379/0")
+        logger.info(f"Using Redis task queue at {url}")
+        return RedisTaskQueue(url, prefix=os.getenv("TASK_QUEUE_PREFIX", "opendev:queue:"), **options)
+    raise ValueError(f"Unknown TASK_QUEUE backend: {backend}")
@@ -0,0 +1,65 @@
+import threading
+import logging
+from typing import Dict, Optional
+
+from agent_logic.errors import TaskCancelledError
+from agent_logic.tools.telemetry import METRICS, span
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TASK_SECONDS = METRICS.histogram(
+    "opendevagent_task_duration_seconds", "Task run time from start to finish", ("status",),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+)
+TASKS_FINISHED = METRICS.counter("opendevagent_tasks_finished_total", "Tasks that reached a terminal state", ("status",))
+
+def run_task(
+    task_store,
+    crew_registry,
+    task_id: str,
+    task_description: str,
+    target_language: str,
+    target_framework: Optional[str],
+    openrouter_api_key: str,
+    bypass_cache: bool = False,
+    fix_loop: Optional[dict] = None,
+    sandbox_backend: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> Dict:
+    with span("task", TASK_SECONDS, task_id=task_id, language=target_language) as task_span:
+        try:
+            if cancel_event is not None and cancel_event.is_set():
+                raise TaskCancelledError("Task was cancelled")
+
+            logger.info(f"[{task_id}] Starting task execution")
+            task_store.update(task_id, status="running")
+
+            with crew_registry.lease(openrouter_api_key) as crew:
+                result = crew.execute_plan_act_observe_fix(
+                    task_id=task_id,
+                    task_description=task_description,
+                    target_language=target_language,
+                    target_framework=target_framework,
+                    task_store=task_store,
+                    cancel_event=cancel_event,
+                    use_cache=not bypass_cache,
+                    fix_loop=fix_loop,
+                    sandbox_backend=sandbox_backend
+                )
+
+            outcome = {"status": "completed", "phase": "complete", "progress": 100, "result": result}
+
+        except TaskCancelledError:
+            logger.info(f"[{task_id}] Task cancelled")
+            task_store.append_log(task_id, "Task cancelled")
+            outcome = {"status": "cancelled"}
+
+        except Exception as e:
+            logger.error(f"[{task_id}] Task execution failed: {str(e)}")
+            task_store.append_log(task_id, f"ERROR: {str(e)}")
+            outcome = {"status": "failed", "error": str(e)}
+
+        task_span.set(status=outcome["status"])
+        TASKS_FINISHED.inc(status=outcome["status"])
+        return outcome
@@ -0,0 +1,393 @@
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATUSES = ("pending", "running", "completed", "failed", "cancelled")
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+UPDATABLE_FIELDS = ("status", "phase", "progress", "result", "error")
+
+class TaskLog:
+    def __init__(self, store: "TaskReporter", task_id: str):
+        self.store = store
+        self.task_id = task_id
+
+    def append(self, line: str):
+        self.store.append_log(self.task_id, line)
+
+class TaskReporter(abc.ABC):
+    @abc.abstractmethod
+    def update(self, task_id: str, **fields):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def append_log(self, task_id: str, line: str):
+        raise NotImplementedError
+
+    def logs(self, task_id: str) -> TaskLog:
+        return TaskLog(self, task_id)
+
+class TaskStore(TaskReporter):
+    def __init__(self, ttl_seconds: Optional[float] = None, archive_path: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.archive_path = archive_path
+
+    @abc.abstractmethod
+    def create(self, task_id: str, status: str = "pending", phase: str = "planning", logs: Optional[List[str]] = None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get(self, task_id: str, since: int = 0, include_result: bool = True) -> Optional[Dict]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, task_id: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_tasks(self, status: Optional[str] = None, limit: int = 100, offset: int = 0) -> Tuple[int, List[str]]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def summary(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def __contains__(self, task_id: str) -> bool:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        if not self.ttl_seconds:
+            return 0
+        cutoff = (now or time.time()) - self.ttl_seconds
+        expired = self._pop_expired(cutoff)
+        if expired and self.archive_path:
+            self._archive(expired)
+        if expired:
+            logger.info(f"Evicted {len(expired)} tasks older than {self.ttl_seconds}s")
+        return len(expired)
+
+    @abc.abstractmethod
+    def _pop_expired(self, cutoff: float) -> List[Dict]:
+        raise NotImplementedError
+
+    def _archive(self, records: List[Dict]):
+        try:
+            with open(self.archive_path, "a", encoding="utf-8") as archive:
+                for record in records:
+                    archive.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Failed to archive evicted tasks: {str(e)}")
+
+class InMemoryTaskStore(TaskStore):
+    def __init__(self, ttl_seconds: Optional[float] = None, archive_path: Optional[str] = None):
+        super().__init__(ttl_seconds, archive_path)
+        self._tasks: "OrderedDict[str, Dict]" = OrderedDict()
+        self._by_status: Dict[str, "OrderedDict[str, None]"] = {status: OrderedDict() for status in STATUSES}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def create(self, task_id: str, status: str = "pending", phase: str = "planning", logs: Optional[List[str]] = None):
+        now = time.time()
+        with self._lock:
+            self._tasks[task_id] = {
+                "task_id": task_id,
+                "status": status,
+                "phase": phase,
+                "progress": 0,
+                "logs": list(logs or []),
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            self._by_status.setdefault(status, OrderedDict())[task_id] = None
+
+    def get(self, task_id: str, since: int = 0, include_result: bool = True) -> Optional[Dict]:
+        with self._lock:
+            record = self._tasks.get(task_id)
+            if record is None:
+                return None
+            return dict(
+                record,
+                logs=record["logs"][since:],
+                log_offset=len(record["logs"]),
+                result=record["result"] if include_result else None,
+            )
+
+    def update(self, task_id: str, **fields):
+        with self._lock:
+            record = self._tasks.get(task_id)
+            if record is None:
+                return
+            new_status = fields.get("status")
+            if new_status and new_status != record["status"]:
+                self._by_status[record["status"]].pop(task_id, None)
+                self._by_status.setdefault(new_status, OrderedDict())[task_id] = None
+            for key, value in fields.items():
+                if key in UPDATABLE_FIELDS:
+                    record[key] = value
+            record["updated_at"] = time.time()
+            if record["status"] in TERMINAL_STATUSES:
+                self._finished[task_id] = record["updated_at"]
+                self._finished.move_to_end(task_id)
+            else:
+                self._finished.pop(task_id, None)
+
+    def append_log(self, task_id: str, line: str):
+        with self._lock:
+            record = self._tasks.get(task_id)
+            if record is not None:
+                record["logs"].append(line)
+                record["updated_at"] = time.time()
+
+    def delete(self, task_id: str):
+        with self._lock:
+            record = self._tasks.pop(task_id, None)
+            if record is not None:
+                self._by_status[record["status"]].pop(task_id, None)
+                self._finished.pop(task_id, None)
+
+    def list_tasks(self, status: Optional[str] = None, limit: int = 100, offset: int = 0) -> Tuple[int, List[str]]:
+        with self._lock:
+            ids = self._tasks if status is None else self._by_status.get(status, {})
+            total = len(ids)
+            page = []
+            for index, task_id in enumerate(ids):
+                if index >= offset + limit:
+                    break
+                if index >= offset:
+                    page.append(task_id)
+            return total, page
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            return {status: len(ids) for status, ids in self._by_status.items()}
+
+    def __contains__(self, task_id: str) -> bool:
+        return task_id in self._tasks
+
+    def _pop_expired(self, cutoff: float) -> List[Dict]:
+        expired = []
+        with self._lock:
+            while self._finished:
+                task_id, finished_at = next(iter(self._finished.items()))
+                if finished_at >= cutoff:
+                    break
+                expired.append(self._tasks[task_id])
+                self.delete(task_id)
+        return expired
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_created ON tasks(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_updated ON tasks(status, updated_at);
+
+CREATE TABLE IF NOT EXISTS task_logs (
+    task_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    PRIMARY KEY (task_id, seq)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS task_status_counts (
+    status TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS tasks_count_insert AFTER INSERT ON tasks BEGIN
+    INSERT OR IGNORE INTO task_status_counts (status, count) VALUES (NEW.status, 0);
+    UPDATE task_status_counts SET count = count + 1 WHERE status = NEW.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_count_update AFTER UPDATE OF status ON tasks
+WHEN OLD.status != NEW.status BEGIN
+    UPDATE task_status_counts SET count = count - 1 WHERE status = OLD.status;
+    INSERT OR IGNORE INTO task_status_counts (status, count) VALUES (NEW.status, 0);
+    UPDATE task_status_counts SET count = count + 1 WHERE status = NEW.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_count_delete AFTER DELETE ON tasks BEGIN
+    UPDATE task_status_counts SET count = count - 1 WHERE status = OLD.status;
+    DELETE FROM task_logs WHERE task_id = OLD.task_id;
+END;
+"""
+
+class SQLiteTaskStore(TaskStore):
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None, archive_path: Optional[str] = None):
+        super().__init__(ttl_seconds, archive_path)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def create(self, task_id: str, status: str = "pending", phase: str = "planning", logs: Optional[List[str]] = None):
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO tasks (task_id, status, phase, progress, created_at, updated_at) VALUES (?, ?, ?, 0, ?, ?)",
+                (task_id, status, phase, now, now),
+            )
+            conn.executemany(
+                "INSERT INTO task_logs (task_id, seq, line) VALUES (?, ?, ?)",
+                [(task_id, seq, line) for seq, line in enumerate(logs or [])],
+            )
+
+    def get(self, task_id: str, since: int = 0, include_result: bool = True) -> Optional[Dict]:
+        conn = self._connection()
+        columns = "*" if include_result else "task_id, status, phase, progress, NULL AS result, error, created_at, updated_at"
+        row = conn.execute(f"SELECT {columns} FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            return None
+        log_rows = conn.execute(
+            "SELECT seq, line FROM task_logs WHERE task_id = ? AND seq >= ? ORDER BY seq", (task_id, since)
+        ).fetchall()
+        if log_rows:
+            log_offset = log_rows[-1][0] + 1
+        else:
+            log_offset = conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM task_logs WHERE task_id = ?", (task_id,)
+            ).fetchone()[0]
+        record = self._to_record(row, [r[1] for r in log_rows])
+        record["log_offset"] = log_offset
+        return record
+
+    def update(self, task_id: str, **fields):
+        columns = [key for key in fields if key in UPDATABLE_FIELDS]
+        values = [json.dumps(fields[key], default=str) if key == "result" else fields[key] for key in columns]
+        assignments = ", ".join([f"{key} = ?" for key in columns] + ["updated_at = ?"])
+        self._connection().execute(
+            f"UPDATE tasks SET {assignments} WHERE task_id = ?",
+            values + [time.time(), task_id],
+        )
+
+    def append_log(self, task_id: str, line: str):
+        self._connection().execute(
+            "INSERT INTO task_logs (task_id, seq, line) "
+            "SELECT ?, COALESCE(MAX(seq), -1) + 1, ? FROM task_logs WHERE task_id = ?",
+            (task_id, line, task_id),
+        )
+
+    def delete(self, task_id: str):
+        self._connection().execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+
+    def list_tasks(self, status: Optional[str] = None, limit: int = 100, offset: int = 0) -> Tuple[int, List[str]]:
+        conn = self._connection()
+        if status is None:
+            total = conn.execute("SELECT COALESCE(SUM(count), 0) FROM task_status_counts").fetchone()[0]
+            rows = conn.execute(
+                "SELECT task_id FROM tasks ORDER BY created_at LIMIT ? OFFSET ?", (limit, offset)
+            )
+        else:
+            row = conn.execute("SELECT count FROM task_status_counts WHERE status = ?", (status,)).fetchone()
+            total = row[0] if row else 0
+            rows = conn.execute(
+                "SELECT task_id FROM tasks WHERE status = ? ORDER BY created_at LIMIT ? OFFSET ?",
+                (status, limit, offset),
+            )
+        return total, [r[0] for r in rows]
+
+    def summary(self) -> Dict[str, int]:
+        counts = {status: 0 for status in STATUSES}
+        for row in self._connection().execute("SELECT status, count FROM task_status_counts"):
+            counts[row[0]] = row[1]
+        return counts
+
+    def __contains__(self, task_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone() is not None
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _pop_expired(self, cutoff: float) -> List[Dict]:
+        conn = self._connection()
+        placeholders = ", ".join("?" for _ in TERMINAL_STATUSES)
+        expired = []
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                f"SELECT * FROM tasks WHERE status IN ({placeholders}) AND updated_at < ?",
+                TERMINAL_STATUSES + (cutoff,),
+            ).fetchall()
+            for row in rows:
+                if self.archive_path:
+                    logs = [r[0] for r in conn.execute(
+                        "SELECT line FROM task_logs WHERE task_id = ? ORDER BY seq", (row["task_id"],)
+                    )]
+                else:
+                    logs = []
+                expired.append(self._to_record(row, logs))
+                conn.execute("DELETE FROM tasks WHERE task_id = ?", (row["task_id"],))
+        return expired
+
+    def _to_record(self, row: sqlite3.Row, logs: List[str]) -> Dict:
+        return {
+            "task_id": row["task_id"],
+            "status": row["status"],
+            "phase": row["phase"],
+            "progress": row["progress"],
+            "logs": logs,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+def create_task_store() -> TaskStore:
+    backend = os.getenv("TASK_STORE", "memory").lower()
+    ttl = float(os.getenv("TASK_TTL_SECONDS", "86400")) or None
+    archive_path = os.getenv("TASK_ARCHIVE_PATH") or None
+
+    if backend == "sqlite":
+        path = os.getenv("TASK_STORE_PATH", "/app/work_dir/tasks.db")
+        logger.info(f"Using SQLite task store at {path}")
+        return SQLiteTaskStore(path, ttl_seconds=ttl, archive_path=archive_path)
+    if backend != "memory":
+        raise ValueError(f"Unknown TASK_STORE backend: {backend}")
+    return InMemoryTaskStore(ttl_seconds=ttl, archive_path=archive_path)
@@ -0,0 +1,81 @@
+import json
+import os
+import time
+
+import pytest
+
+from artifact_store import GC_GRACE_SECONDS, ArtifactStore
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / "artifacts"), inline_bytes=32, preview_chars=8, ttl_seconds=60)
+
+def test_put_deduplicates_and_compresses(store):
+    data = b"x" * 4096
+    first = store.put(data)
+    second = store.put(data)
+    assert first == second
+    assert first["compressed"] is True
+    assert store.put(b"tiny")["compressed"] is False
+
+    stats = store.stats()
+    assert stats["written"] == 2
+    assert stats["deduplicated"] == 1
+    assert stats["bytes_stored"] < stats["bytes_in"]
+    assert store.read(first["id"]) == data
+
+@pytest.mark.parametrize("data", [bytes(range(256)) * 16, b"abcdefghij" * 500])
+def test_read_range_is_inclusive(store, data):
+    artifact_id = store.put(data)["id"]
+    assert b"".join(store.read_range(artifact_id, 10, 19)) == data[10:20]
+    assert b"".join(store.read_range(artifact_id, 100)) == data[100:]
+
+def test_unknown_or_malformed_ids_are_not_found(store):
+    with pytest.raises(FileNotFoundError):
+        store.read("0" * 64)
+    with pytest.raises(FileNotFoundError):
+        store.read("../../etc/passwd")
+
+def test_offload_replaces_large_strings_with_references(store):
+    code = "print('hello world')\n" * 10
+    result = {"status": "success", "files": {"main.py": code}, "tests": [{"name": "t", "output": "ok"}]}
+    compact = store.offload("task-1", result, logs=["started", "done"])
+
+    reference = compact["files"]["main.py"]
+    assert reference["artifact"] == "files/main.py"
+    assert reference["preview"] == code[:8]
+    assert reference["url"] == "/api/task/task-1/artifacts/files/main.py"
+    assert compact["status"] == "success"
+    assert compact["tests"] == [{"name": "t", "output": "ok"}]
+    assert compact["artifacts"]["count"] == 3
+
+    manifest = store.manifest("task-1")
+    assert set(manifest) == {"files/main.py", "result.json", "logs.txt"}
+    assert store.read(manifest["files/main.py"]["id"]).decode() == code
+    assert json.loads(store.read(manifest["result.json"]["id"])) == result
+    assert store.read(manifest["logs.txt"]["id"]) == b"started\ndone"
+
+def test_resolve_sets_content_type(store):
+    store.offload("task-1", {"files": {"logo.png": "p" * 64, "main.py": "m" * 64}})
+    assert store.resolve("task-1", "result.json")["content_type"] == "application/json"
+    assert store.resolve("task-1", "files/logo.png")["content_type"] == "image/png"
+    assert store.resolve("task-1", "files/main.py")["content_type"] == "text/plain; charset=utf-8"
+    assert store.resolve("task-1", "missing") is None
+    assert store.resolve("other", "result.json") is None
+
+def test_evict_expired_removes_manifests_and_unreferenced_blobs(store):
+    store.offload("old", {"code": "o" * 64})
+    store.offload("new", {"code": "n" * 64})
+    old_manifest = store.manifest("old")
+    kept_id = store.manifest("new")["code"]["id"]
+
+    past = time.time() - GC_GRACE_SECONDS - 120
+    os.utime(store._manifest_path("old"), (past, past))
+    for path in store.blobs_dir.glob("*/*"):
+        os.utime(path, (past, past))
+
+    assert store.evict_expired() == 1
+    assert store.manifest("old") is None
+    with pytest.raises(FileNotFoundError):
+        store.read(old_manifest["code"]["id"])
+    assert store.read(kept_id) == b"n" * 64
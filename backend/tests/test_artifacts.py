@@ -0,0 +1,72 @@
+from agent_logic.artifacts import (
+    FencedFileParser,
+    build_artifacts,
+    content_hash,
+    parse_artifacts,
+    parse_named_files,
+    render_files,
+    safe_filename,
+)
+
+def test_filenames_from_headings_fence_info_and_comments():
+    text = (
+        "Here is the project.\n\n"
+        "**app/models.py**\n"
+        "```python\n"
+        "class User:\n"
+        "    pass\n"
+        "```\n\n"
+        "```python title=\"tests.py\"\n"
+        "def test_user():\n"
+        "    assert True\n"
+        "```\n\n"
+        "```js\n"
+        "// File: src/index.js\n"
+        "console.log(1);\n"
+        "```\n\n"
+        "```dockerfile Dockerfile\n"
+        "FROM python:3.11\n"
+        "```\n"
+    )
+    assert parse_named_files(text) == {
+        "app/models.py": "class User:\n    pass\n",
+        "tests.py": "def test_user():\n    assert True\n",
+        "src/index.js": "console.log(1);\n",
+        "Dockerfile": "FROM python:3.11\n",
+    }
+
+def test_unsafe_paths_are_not_used_as_filenames():
+    assert safe_filename("../etc/passwd") is None
+    assert safe_filename("/etc/passwd") is None
+    assert safe_filename("`src/app.py`") == "src/app.py"
+    text = "### ../../evil.py\n```python\nprint(1)\n```\n"
+    assert parse_named_files(text) == {}
+
+def test_unnamed_block_falls_back_to_the_language_default():
+    text = "```javascript\nconsole.log(1);\n```\n"
+    assert parse_artifacts(text, "javascript") == {"index.js": "console.log(1);\n"}
+    assert parse_artifacts("print(1)", "python") == {"main.py": "print(1)"}
+
+def test_longer_fence_keeps_nested_fences_in_content():
+    text = "README.md\n````markdown\nUsage:\n```bash\nrun\n```\n````\n"
+    assert parse_named_files(text) == {"README.md": "Usage:\n```bash\nrun\n```\n"}
+
+def test_feed_reports_files_as_their_block_closes():
+    parser = FencedFileParser()
+    text = "main.py\n```python\nprint(1)\n```\nutil.py\n```python\nx = 1"
+    completed = []
+    for index in range(0, len(text), 5):
+        completed.extend(parser.feed(text[index:index + 5]))
+    assert completed == [("main.py", "print(1)\n")]
+    assert parser.close() == [("util.py", "x = 1\n")]
+    assert parser.files == {"main.py": "print(1)\n", "util.py": "x = 1\n"}
+
+def test_render_round_trips_through_the_parser():
+    files = {"main.py": "print(1)\n", "pkg/util.py": "x = 1\n"}
+    assert parse_named_files(render_files(files)) == files
+
+def test_build_artifacts_hashes_each_file():
+    artifacts = build_artifacts({"main.py": "print(1)\n"}, "python")
+    assert artifacts["hashes"] == {"main.py": content_hash("print(1)\n")}
+    assert artifacts["language"] == "python"
+    assert "main.py" in artifacts["code_text"]
@@ -0,0 +1,81 @@
+import pytest
+
+from agent_logic.tools.code_analyzer import CodeAnalyzer
+
+PYTHON_SOURCE = """import os
+from json import loads
+
+class Repo:
+    def load(self, path):
+        return loads(open(path).read())
+
+def main():
+    try:
+        Repo().load(os.environ["X"])
+    except:
+        pass
+"""
+
+@pytest.fixture
+def analyzer():
+    analyzer = CodeAnalyzer(workers=1)
+    yield analyzer
+    analyzer.shutdown()
+
+def test_python_structure_and_findings(analyzer):
+    result = analyzer.analyze(PYTHON_SOURCE, "python")
+    assert result["imports"] == ["os", "json"]
+    assert result["classes"] == ["Repo"]
+    assert result["functions"] == ["Repo.load", "main"]
+    assert result["call_graph"]["Repo.load"] == ["loads", "open", "read"]
+    assert [f["code"] for f in result["findings"]] == ["E722"]
+    assert result["syntax_errors"] == []
+
+def test_results_are_cached_by_content(analyzer):
+    first = analyzer.analyze(PYTHON_SOURCE, "python")
+    second = analyzer.analyze(PYTHON_SOURCE, "python")
+    assert second is first
+    assert analyzer.stats()["hits"] == 1
+
+@pytest.mark.parametrize("filename, language", [
+    ("main.py", "python"),
+    ("src/app.tsx", "typescript"),
+    ("index.mjs", "javascript"),
+    ("Makefile", None),
+    ("Dockerfile", None),
+    ("notes.txt", None),
+])
+def test_language_for(filename, language):
+    assert CodeAnalyzer.language_for(filename) == language
+
+def test_check_syntax_reports_errors_per_file(analyzer):
+    errors = analyzer.check_syntax({
+        "main.py": "def broken(:\n    pass\n",
+        "ok.py": "print(1)\n",
+        "index.js": "function f( {\n",
+        "Makefile": "all:\n\t(echo\n",
+    })
+    assert {error["file"] for error in errors} == {"main.py", "index.js"}
+    assert all(error["line"] == 1 for error in errors)
+
+@pytest.mark.parametrize("code", [
+    "const pattern = /[(]/;\n",
+    "const clean = s.replace(/'/g, \"\");\n",
+    "const ratio = (a / b) / 2;\n",
+    "const el = <p>Don't stop {name}</p>;\n",
+    "const el = <div className=\"x\">{items.map(i => <Item key={i} />)}</div>;\n",
+])
+def test_valid_javascript_passes_the_syntax_gate(analyzer, code):
+    assert analyzer.check_syntax({"app.jsx": code}) == []
+
+def test_typescript_generics_are_not_mistaken_for_jsx(analyzer):
+    code = "function id<T>(x: T): T { return x; }\nconst n = <number>value;\n"
+    assert analyzer.check_syntax({"index.ts": code}) == []
+
+def test_analyze_project_aggregates_totals(analyzer):
+    report = analyzer.analyze_project({"a.py": PYTHON_SOURCE, "b.py": "def f(:\n", "README": "text"})
+    summary = report["summary"]
+    assert summary["file_count"] == 2
+    assert summary["languages"] == {"python": 2}
+    assert summary["findings_by_code"]["E722"] == 1
+    assert [error["file"] for error in summary["syntax_errors"]] == ["b.py"]
@@ -0,0 +1,38 @@
+from agent_logic.llm_cache import LLMResponseCache
+
+FIX_PROMPT = """Fix this code:
+def total(items):
+    result = 0
+    for item in items:
+        result += item
+    return result
+"""
+
+def key(cache, prompt):
+    return cache.make_key("openai/gpt-4o", 0.2, "debugger", prompt)
+
+def test_indentation_changes_the_key():
+    cache = LLMResponseCache()
+    dedented = FIX_PROMPT.replace("        result += item", "    result += item")
+    assert dedented != FIX_PROMPT
+    assert key(cache, dedented) != key(cache, FIX_PROMPT)
+
+def test_trailing_whitespace_and_line_endings_do_not_change_the_key():
+    cache = LLMResponseCache()
+    noisy = "\n  " + FIX_PROMPT.replace("\n", "   \r\n") + "\n\n"
+    assert key(cache, noisy) == key(cache, FIX_PROMPT)
+
+def test_model_temperature_and_role_are_part_of_the_key():
+    cache = LLMResponseCache()
+    base = key(cache, FIX_PROMPT)
+    assert cache.make_key("openai/gpt-4o-mini", 0.2, "debugger", FIX_PROMPT) != base
+    assert cache.make_key("openai/gpt-4o", 0.7, "debugger", FIX_PROMPT) != base
+    assert cache.make_key("openai/gpt-4o", 0.2, "coder", FIX_PROMPT) != base
+
+def test_entries_survive_a_restart_on_disk(tmp_path):
+    cache = LLMResponseCache(cache_dir=str(tmp_path))
+    cache.set(key(cache, FIX_PROMPT), "fixed code")
+    reloaded = LLMResponseCache(cache_dir=str(tmp_path))
+    assert reloaded.get(key(reloaded, FIX_PROMPT)) == "fixed code"
+    assert reloaded.get(key(reloaded, "other prompt")) is None
+    assert reloaded.stats()["disk_hits"] == 1
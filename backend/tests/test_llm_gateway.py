@@ -0,0 +1,174 @@
+import json
+import threading
+import time
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from agent_logic import llm_gateway
+from agent_logic.llm_gateway import AdaptiveLimiter, LLMGateway, TokenBucket, gateway_call
+
+URL = "https://llm.example/v1/chat/completions"
+
+def make_client(gateway: LLMGateway, handler) -> httpx.Client:
+    return httpx.Client(transport=gateway.wrap(httpx.MockTransport(handler)))
+
+def post(client: httpx.Client, prompt: str = "hello", key: str = "k1") -> httpx.Response:
+    body = {"model": "test/model", "messages": [{"role": "user", "content": prompt}]}
+    return client.post(URL, json=body, headers={"Authorization": f"Bearer {key}"})
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.02)
+
+def test_limiter_blocks_at_the_limit_and_halves_on_throttling():
+    limiter = AdaptiveLimiter(initial=2, minimum=1, maximum=8, latency_tolerance=0)
+    assert limiter.acquire(timeout=0.01)
+    assert limiter.acquire(timeout=0.01)
+    assert not limiter.acquire(timeout=0.01)
+
+    limiter.release(throttled=True)
+    assert limiter.stats()["limit"] == 1
+    assert limiter.stats()["decreases"] == 1
+    limiter.release(throttled=True)
+    assert limiter.stats()["decreases"] == 1
+
+def test_limiter_grows_while_saturated_and_backs_off_on_latency():
+    limiter = AdaptiveLimiter(initial=1, minimum=1, maximum=4, latency_tolerance=3.0)
+    limiter.acquire()
+    limiter.release(latency=0.1)
+    assert limiter.stats()["limit"] == 2
+
+    limiter.acquire()
+    limiter.release(latency=0.1)
+    assert limiter.stats()["limit"] == 2
+
+    limiter.acquire()
+    limiter.acquire()
+    limiter.release(latency=0.1)
+    assert limiter.stats()["limit"] == 2.5
+
+    limiter.release(latency=1.0)
+    assert limiter.stats()["limit"] == 1.25
+    assert limiter.stats()["baseline_latency"] == pytest.approx(0.1, abs=0.01)
+
+def test_retries_throttled_requests_after_retry_after():
+    calls = []
+
+    def handler(request):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            return httpx.Response(429, headers={"Retry-After": "0.05"})
+        return httpx.Response(200, json={"ok": True})
+
+    gateway = LLMGateway(key_rate=0, model_rate=0, backoff_base=0.01, seed=1)
+    with make_client(gateway, handler) as client, gateway_call() as call:
+        response = post(client)
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert len(calls) == 3
+    assert calls[1] - calls[0] >= 0.05
+    assert call.retries == 2
+    stats = gateway.stats()
+    assert (stats["upstream_requests"], stats["retries"], stats["throttled"]) == (3, 2, 2)
+
+def test_gives_up_after_max_retries():
+    gateway = LLMGateway(key_rate=0, model_rate=0, max_retries=1, backoff_base=0.001, seed=1)
+    with make_client(gateway, lambda request: httpx.Response(503, text="busy")) as client:
+        response = post(client)
+    assert response.status_code == 503
+    assert response.text == "busy"
+    assert gateway.stats()["upstream_requests"] == 2
+
+def test_identical_in_flight_requests_are_coalesced():
+    release = threading.Event()
+    upstream = []
+
+    def handler(request):
+        upstream.append(json.loads(request.content))
+        release.wait(5)
+        return httpx.Response(200, content=b"shared answer")
+
+    gateway = LLMGateway(key_rate=0, model_rate=0)
+    results = {}
+    with make_client(gateway, handler) as client:
+        def run(name):
+            with gateway_call() as call:
+                results[name] = (post(client).content, call.coalesced)
+
+        leader = threading.Thread(target=run, args=("leader",))
+        leader.start()
+        while not upstream:
+            time.sleep(0.005)
+        follower = threading.Thread(target=run, args=("follower",))
+        follower.start()
+        while gateway.stats()["coalesced"] < 1:
+            time.sleep(0.005)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+
+        assert results == {"leader": (b"shared answer", 0), "follower": (b"shared answer", 1)}
+        assert len(upstream) == 1
+        assert gateway.stats()["in_flight_requests"] == 0
+        assert post(client).content == b"shared answer"
+    assert len(upstream) == 2
+
+def test_follower_gets_the_full_body_when_the_leader_closes_early(monkeypatch):
+    joined, leader_closed = threading.Event(), threading.Event()
+    upstream = []
+
+    def body():
+        yield b"first "
+        yield b"second"
+
+    def handler(request):
+        upstream.append(request)
+        return httpx.Response(200, content=body())
+
+    def hold_follower(**labels):
+        joined.set()
+        leader_closed.wait(5)
+
+    monkeypatch.setattr(llm_gateway.LLM_GATEWAY_COALESCED, "inc", hold_follower)
+    gateway = LLMGateway(key_rate=0, model_rate=0)
+    results = {}
+    with make_client(gateway, handler) as client:
+        request = {"model": "test/model", "messages": [{"role": "user", "content": "hello"}]}
+        with client.stream("POST", URL, json=request, headers={"Authorization": "Bearer k1"}) as leader:
+            assert next(leader.iter_raw()) == b"first "
+            follower = threading.Thread(target=lambda: results.update(follower=post(client).content))
+            follower.start()
+            assert joined.wait(5)
+        leader_closed.set()
+        follower.join(5)
+
+        assert results == {"follower": b"first second"}
+        assert len(upstream) == 1
+        assert gateway.stats()["in_flight_requests"] == 0
+
+def test_different_keys_are_not_coalesced():
+    release = threading.Event()
+    upstream = []
+
+    def handler(request):
+        upstream.append(request.headers["authorization"])
+        release.wait(5)
+        return httpx.Response(200, content=b"answer")
+
+    gateway = LLMGateway(key_rate=0, model_rate=0)
+    with make_client(gateway, handler) as client:
+        threads = [threading.Thread(target=post, args=(client, "same", key)) for key in ("k1", "k2")]
+        for thread in threads:
+            thread.start()
+        while len(upstream) < 2:
+            time.sleep(0.005)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+    assert sorted(upstream) == ["Bearer k1", "Bearer k2"]
+    assert gateway.stats()["coalesced"] == 0
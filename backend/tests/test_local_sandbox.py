@@ -0,0 +1,74 @@
+import pytest
+
+from agent_logic.tools.local_sandbox import LocalSandboxExecutor
+from agent_logic.tools.test_results import NO_TESTS_EXIT_CODE, find_test_files
+
+MAIN = "print('main ran')\n"
+
+@pytest.fixture
+def executor(tmp_path):
+    executor = LocalSandboxExecutor(root=str(tmp_path), pool_size=0, isolate_network=False, require_network_isolation=False,
+                                    private_root=False, user="")
+    yield executor
+    executor.shutdown()
+
+def run(executor, files, task_id="task"):
+    return executor.execute({"files": files}, "python", timeout=30, task_id=task_id)
+
+def test_find_test_files_uses_pytest_naming():
+    names = ["main.py", "tests.py", "test_app.py", "pkg/api_test.py", "pkg/tests/test_x.py", "testing.py", "README.md"]
+    assert find_test_files(names) == ["pkg/api_test.py", "pkg/tests/test_x.py", "test_app.py", "tests.py"]
+
+def test_runs_tests_outside_tests_py(executor):
+    result = run(executor, {
+        "app.py": "def f():\n    return 1\n",
+        "tests/test_app.py": "from app import f\n\ndef test_f():\n    assert f() == 1\n",
+        "main.py": MAIN,
+    })
+    assert result["status"] == "success"
+    assert result["tests"]["outcomes"] == {"tests/test_app.py::test_f": "passed"}
+    assert "main ran" not in result["stdout"]
+
+def test_failing_tests_do_not_fall_back_to_main(executor):
+    result = run(executor, {
+        "app.py": "def f():\n    return 2\n",
+        "test_app.py": "from app import f\n\ndef test_f():\n    assert f() == 1\n",
+        "main.py": MAIN,
+    })
+    assert result["status"] == "error"
+    assert result["tests"]["failed"] == 1
+    assert "main ran" not in result["stdout"]
+
+def test_no_tests_is_reported_as_pytest_exit_5(executor):
+    result = run(executor, {"main.py": MAIN})
+    assert result["exit_code"] == NO_TESTS_EXIT_CODE
+    assert "main ran" not in result["stdout"]
+
+def test_isolation_fails_closed_by_default(monkeypatch, tmp_path):
+    for name in ("LOCAL_SANDBOX_ISOLATE_NETWORK", "LOCAL_SANDBOX_REQUIRE_NETNS", "LOCAL_SANDBOX_PRIVATE_ROOT", "LOCAL_SANDBOX_USER"):
+        monkeypatch.delenv(name, raising=False)
+    executor = LocalSandboxExecutor(root=str(tmp_path), pool_size=0)
+    try:
+        assert executor.require_network_isolation
+        assert executor.private_root
+        assert executor.user == (65534, 65534)
+    finally:
+        executor.shutdown()
+
+def test_private_root_hides_the_host_filesystem(tmp_path):
+    secret = tmp_path / "tasks.db"
+    secret.write_text("secret")
+    executor = LocalSandboxExecutor(root=str(tmp_path / "sandbox"), pool_size=0, isolate_network=False, private_root=True)
+    try:
+        result = run(executor, {"test_fs.py": (
+            "import os\n\n"
+            "def test_fs():\n"
+            f"    assert not os.path.exists({str(secret)!r})\n"
+            "    assert os.getcwd() == '/sandbox'\n"
+            "    open('out.txt', 'w').write('ok')\n"
+        )})
+    finally:
+        executor.shutdown()
+    if result["exit_code"] == 126:
+        pytest.skip(f"namespaces are not available here: {result['stderr'].strip()}")
+    assert result["status"] == "success", result["stdout"] + result["stderr"]
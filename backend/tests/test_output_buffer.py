@@ -0,0 +1,29 @@
+from agent_logic.tools.output_buffer import TRUNCATION_MARKER, BoundedOutput, LineForwarder
+
+def forward(chunks, max_line_length=10):
+    lines = []
+    forwarder = LineForwarder(lambda stream, line: lines.append((stream, line)), max_line_length=max_line_length)
+    for chunk in chunks:
+        forwarder.write("stdout", chunk)
+    forwarder.close()
+    return lines
+
+def test_long_lines_keep_their_head_whether_or_not_they_arrive_whole():
+    expected = [("stdout", "0123456789" + TRUNCATION_MARKER), ("stdout", "short")]
+    assert forward([b"0123456789abcdef\nshort\n"]) == expected
+    assert forward([b"01234", b"56789abc", b"def\nshort\n"]) == expected
+    assert forward([b"0123456789abcdef", b"\nshort"]) == expected
+
+def test_unterminated_long_line_is_marked_on_close():
+    assert forward([b"0123456789abcdef"]) == [("stdout", "0123456789" + TRUNCATION_MARKER)]
+    assert forward([b"0123456789"]) == [("stdout", "0123456789")]
+
+def test_multibyte_characters_split_across_chunks():
+    data = "héllo\n".encode("utf-8")
+    assert forward([data[:2], data[2:]]) == [("stdout", "héllo")]
+
+def test_bounded_output_keeps_head_and_tail():
+    output = BoundedOutput(head_bytes=4, tail_bytes=4)
+    output.write(b"abcdefghijkl")
+    assert output.truncated_bytes == 4
+    assert output.text() == "abcd\n... [4 bytes truncated] ...\nijkl"
@@ -0,0 +1,63 @@
+import json
+
+from agent_logic.plan_parser import FALLBACK_COMPONENT, critical_path, order_components, parse_components
+
+def plan(components) -> str:
+    return f"Architecture notes.\n\n```json\n{json.dumps({'components': components})}\n```\n"
+
+def test_components_are_ordered_by_dependencies():
+    text = plan([
+        {"name": "api", "files": ["api.py"], "depends_on": ["models", "db"]},
+        {"name": "models", "files": ["models.py"], "depends_on": ["db"]},
+        {"name": "db", "files": ["db.py"], "description": "Storage"},
+    ])
+    components = parse_components(text)
+    assert [c["name"] for c in components] == ["db", "models", "api"]
+    assert components[0]["description"] == "Storage"
+    assert components[2]["depends_on"] == ["models", "db"]
+
+def test_names_files_and_dependencies_are_cleaned():
+    text = plan([
+        {"name": "Web UI!", "files": ["ui/app.js", "../secret.txt"], "dependencies": ["core", "missing", "Web UI!"]},
+        {"name": "core", "files": ["ui/app.js", "core.py"], "responsibility": "Domain logic"},
+        {"name": "core", "files": ["dup.py"]},
+        {"name": "   "},
+    ])
+    components = {c["name"]: c for c in parse_components(text)}
+    assert set(components) == {"Web_UI", "core"}
+    assert components["Web_UI"]["files"] == ["ui/app.js"]
+    assert components["Web_UI"]["depends_on"] == ["core"]
+    assert components["core"]["files"] == ["core.py"]
+    assert components["core"]["description"] == "Domain logic"
+
+def test_last_plan_block_wins_and_bare_lists_are_accepted():
+    text = plan([{"name": "draft"}]) + "\nRevised:\n```\n" + json.dumps([{"name": "final"}]) + "\n```\n"
+    assert [c["name"] for c in parse_components(text)] == ["final"]
+
+def test_unparseable_plan_falls_back_to_one_component():
+    assert parse_components("No JSON here.") == [FALLBACK_COMPONENT]
+    assert parse_components("```json\n{not json}\n```") == [FALLBACK_COMPONENT]
+    assert parse_components(plan([])) == [FALLBACK_COMPONENT]
+
+def test_cycles_are_broken_instead_of_blocking():
+    components = [
+        {"name": "a", "depends_on": ["b"]},
+        {"name": "b", "depends_on": ["a"]},
+        {"name": "c", "depends_on": ["a"]},
+    ]
+    ordered = order_components(components)
+    assert sorted(c["name"] for c in ordered) == ["a", "b", "c"]
+    position = {c["name"]: index for index, c in enumerate(ordered)}
+    for component in ordered:
+        assert all(position[dep] < position[component["name"]] for dep in component["depends_on"])
+
+def test_critical_path_follows_the_longest_chain():
+    components = [
+        {"name": "db", "depends_on": []},
+        {"name": "models", "depends_on": ["db"]},
+        {"name": "ui", "depends_on": []},
+        {"name": "api", "depends_on": ["models", "ui"]},
+    ]
+    result = critical_path(components, {"db": 1.0, "models": 2.0, "ui": 2.5, "api": 1.0})
+    assert result == {"components": ["db", "models", "api"], "seconds": 4.0}
+    assert critical_path([], {}) == {"components": [], "seconds": 0.0}
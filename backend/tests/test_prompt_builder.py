@@ -0,0 +1,80 @@
+from agent_logic.prompt_builder import (
+    PromptBuilder,
+    count_tokens,
+    dedupe_lines,
+    extract_failures,
+    referenced_files,
+    truncate_tokens,
+)
+
+PYTEST_OUTPUT = """============================= test session starts ==============================
+collected 2 items
+
+tests.py .F                                                              [100%]
+
+=================================== FAILURES ===================================
+__________________________________ test_total __________________________________
+
+    def test_total():
+>       assert total([1, 2]) == 4
+E       assert 3 == 4
+
+tests.py:5: AssertionError
+=========================== short test summary info ============================
+FAILED tests.py::test_total - assert 3 == 4
+"""
+
+def test_truncate_tokens_keeps_head_and_tail_within_budget():
+    text = "".join(f"line {i}\n" for i in range(2000))
+    truncated = truncate_tokens(text, 200)
+    assert count_tokens(truncated) <= 200
+    assert truncated.startswith("line 0\n")
+    assert truncated.rstrip().endswith("line 1999")
+    assert "characters omitted" in truncated
+    assert truncate_tokens("short", 200) == "short"
+    assert truncate_tokens("short", 0) == ""
+
+def test_dedupe_lines_collapses_runs_and_repeats():
+    text = "\n".join(["retrying 1", "retrying 2", "retrying 3", "done"] + ["warn x"] * 1 + ["other", "warn x"] * 5)
+    deduped = dedupe_lines(text).splitlines()
+    assert deduped[:3] == ["retrying 1", "... [previous line repeated 2 more times]", "done"]
+    assert deduped.count("warn x") == 3
+    assert deduped[-1].endswith("repeated lines omitted]")
+
+def test_extract_failures_finds_pytest_sections():
+    sections = extract_failures(PYTEST_OUTPUT)
+    assert any(section.startswith("___") and "assert 3 == 4" in section for section in sections)
+    assert "FAILED tests.py::test_total - assert 3 == 4" in sections
+    assert not any("test session starts" in section for section in sections)
+
+def test_extract_failures_finds_tracebacks():
+    output = 'Traceback (most recent call last):\n  File "main.py", line 3, in <module>\n    run()\nNameError: name \'run\' is not defined\n'
+    assert extract_failures(output) == [output.strip()]
+
+def test_referenced_files_matches_known_files_only():
+    files = {"main.py": "", "src/util.ts": "", "tests.py": ""}
+    text = 'File "/sandbox/main.py", line 3\nsrc/util.ts(4,2): error TS2322\nlib/other.py:9'
+    assert referenced_files(text, files) == ["main.py", "src/util.ts"]
+
+def test_builder_keeps_required_sections_and_trims_by_priority():
+    builder = PromptBuilder(model="", budget=300)
+    builder.add("instructions", "Fix the failing tests.", required=True)
+    builder.add("errors", "E" * 400, priority=2)
+    builder.add("code", "C" * 2000, priority=1)
+    builder.add("empty", "")
+    prompt = builder.build()
+
+    stats = builder.stats
+    assert prompt.startswith("Fix the failing tests.")
+    assert "E" * 400 in prompt
+    assert stats["truncated"] == ["code"]
+    assert stats["sections"]["code"]["tokens"] < stats["sections"]["code"]["original_tokens"]
+    assert "empty" not in stats["sections"]
+    assert stats["tokens"] <= 300 + len(stats["sections"])
+
+def test_builder_drops_sections_that_would_be_too_small():
+    builder = PromptBuilder(model="", budget=20)
+    builder.add("instructions", "I" * 60, required=True)
+    builder.add("code", "C" * 400, priority=1)
+    assert builder.build() == "I" * 60
+    assert builder.stats["truncated"] == ["code"]
@@ -0,0 +1,140 @@
+import asyncio
+import time
+
+import pytest
+
+from queue_secrets import PayloadSealer, PayloadSealError
+from scheduler import QueueDispatcher, QueueFullError
+from task_queue import SQLiteTaskQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.db"), max_queue_size=3, max_per_key=1, lease_seconds=60)
+    yield queue
+    queue.close()
+
+def events(queue, cursor="0"):
+    return queue.read_events(cursor)[1]
+
+def test_claims_in_order_with_a_per_key_cap(queue):
+    assert queue.put("t1", "key-a", {"n": 1}) == 1
+    assert queue.put("t2", "key-a", {"n": 2}) == 2
+    assert queue.put("t3", "key-b", {"n": 3}) == 3
+    assert queue.position("t2") == 2
+
+    first = queue.claim("w1")
+    assert (first.task_id, first.key, first.payload, first.attempts) == ("t1", "key-a", {"n": 1}, 1)
+    second = queue.claim("w1")
+    assert second.task_id == "t3"
+    assert queue.claim("w2") is None
+    assert queue.position("t2") == 1
+    assert queue.position("t1") is None
+
+    assert queue.complete(first, {"status": "completed"})
+    assert queue.claim("w2").task_id == "t2"
+
+def test_put_rejects_when_full(queue):
+    for index in range(3):
+        queue.put(f"t{index}", f"key-{index}", {})
+    with pytest.raises(QueueFullError):
+        queue.put("t3", "key-3", {})
+
+def test_complete_publishes_once_and_only_for_the_lease_holder(queue):
+    queue.put("t1", "key", {})
+    lease = queue.claim("w1")
+    cursor = queue.event_cursor()
+    assert queue.complete(lease, {"status": "completed"})
+    assert not queue.complete(lease, {"status": "failed"})
+    assert events(queue, cursor) == [("t1", "update", {"status": "completed"})]
+    assert queue.heartbeat(lease) == "lost"
+
+def test_expired_lease_is_requeued_and_the_old_holder_loses_it(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.db"), lease_seconds=0.05)
+    queue.put("t1", "key", {})
+    stale = queue.claim("w1")
+    time.sleep(0.1)
+    fresh = queue.claim("w2")
+    assert fresh.task_id == "t1"
+    assert fresh.attempts == 2
+    assert queue.heartbeat(stale) == "lost"
+    assert not queue.complete(stale, {"status": "completed"})
+    assert queue.heartbeat(fresh) == "ok"
+    assert any("stopped responding" in data.get("line", "") for _, kind, data in events(queue))
+    queue.close()
+
+def test_release_requeues_without_counting_an_attempt(queue):
+    queue.put("t1", "key", {})
+    lease = queue.claim("w1")
+    assert queue.release(lease)
+    again = queue.claim("w2")
+    assert again.task_id == "t1"
+    assert again.attempts == 1
+
+def test_cancel_dequeues_or_flags_running_tasks(queue):
+    queue.put("t1", "key-a", {})
+    queue.put("t2", "key-b", {})
+    lease = queue.claim("w1")
+    assert queue.cancel("t2") == "dequeued"
+    assert queue.cancel("t1") == "cancelling"
+    assert queue.cancel("missing") is None
+    assert queue.heartbeat(lease) == "cancelled"
+    assert queue.claim("w2") is None
+
+def test_events_are_read_from_a_cursor(queue):
+    queue.publish("t1", "log", {"line": "a"})
+    cursor = queue.event_cursor()
+    queue.publish("t1", "log", {"line": "b"})
+    queue.publish("t2", "update", {"phase": "coding"})
+    cursor, batch = queue.read_events(cursor)
+    assert batch == [("t1", "log", {"line": "b"}), ("t2", "update", {"phase": "coding"})]
+    assert queue.read_events(cursor) == (cursor, [])
+
+def test_worker_registry_and_stats(queue):
+    queue.worker_heartbeat("w1", {"concurrency": 4})
+    queue.worker_heartbeat("w2", {"concurrency": 2})
+    queue.unregister_worker("w2")
+    assert [(w["worker_id"], w["concurrency"]) for w in queue.workers()] == [("w1", 4)]
+
+    queue.put("t1", "key-a", {})
+    queue.put("t2", "key-b", {})
+    queue.claim("w1")
+    stats = queue.stats()
+    assert (stats["queued"], stats["running"], stats["workers"]) == (1, 1, 1)
+
+def test_lease_reporter_publishes_progress_to_the_queue(queue):
+    from worker import LeaseReporter, WorkerJob
+
+    queue.put("t1", "key-a", {})
+    job = WorkerJob(queue.claim("w1"))
+    reporter = LeaseReporter(queue, job)
+    reporter.update("t1", phase="coding", progress=40)
+    reporter.update("t1", phase="coding", progress=40)
+    reporter.logs("t1").append("line")
+    job.lost = True
+    reporter.append_log("t1", "after the lease was lost")
+    assert events(queue) == [("t1", "update", {"phase": "coding", "progress": 40}), ("t1", "log", {"line": "line"})]
+
+def test_dispatcher_seals_the_api_key_in_the_queue(tmp_path):
+    path = tmp_path / "queue.db"
+    queue = SQLiteTaskQueue(str(path))
+    sealer = PayloadSealer("queue-secret")
+    dispatcher = QueueDispatcher(queue, lambda *_: None, sealer=sealer)
+    asyncio.run(dispatcher.submit("t1", "sk-or-v1-raw", None, task_description="x", openrouter_api_key="sk-or-v1-raw"))
+    lease = queue.claim("w1")
+    queue.close()
+    assert b"sk-or-v1-raw" not in path.read_bytes()
+    assert lease.payload["openrouter_api_key"] != "sk-or-v1-raw"
+    assert sealer.open_payload("t1", lease.payload) == {"task_description": "x", "openrouter_api_key": "sk-or-v1-raw"}
+
+def test_sealed_secrets_are_bound_to_the_key_and_task():
+    sealer = PayloadSealer("queue-secret")
+    sealed = sealer.seal("t1", "sk-or-v1-raw")
+    assert sealer.seal("t1", "sk-or-v1-raw") != sealed
+    with pytest.raises(PayloadSealError):
+        sealer.open("t2", sealed)
+    with pytest.raises(PayloadSealError):
+        PayloadSealer("other-secret").open("t1", sealed)
+    with pytest.raises(PayloadSealError):
+        sealer.open("t1", "sk-or-v1-raw")
+    with pytest.raises(ValueError):
+        PayloadSealer("")
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from task_store import InMemoryTaskStore, SQLiteTaskStore, create_task_store
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    archive_path = str(tmp_path / "archive.jsonl")
+    if request.param == "sqlite":
+        store = SQLiteTaskStore(str(tmp_path / "tasks.db"), ttl_seconds=60, archive_path=archive_path)
+    else:
+        store = InMemoryTaskStore(ttl_seconds=60, archive_path=archive_path)
+    yield store
+    store.close()
+
+def test_create_get_and_update(store):
+    store.create("t1", logs=["queued"])
+    assert "t1" in store
+    assert "missing" not in store
+    assert store.get("missing") is None
+
+    store.update("t1", status="running", phase="coding", progress=40, ignored="x")
+    record = store.get("t1")
+    assert record["status"] == "running"
+    assert record["phase"] == "coding"
+    assert record["progress"] == 40
+    assert "ignored" not in record
+    assert record["logs"] == ["queued"]
+
+def test_result_round_trips_and_can_be_left_out(store):
+    store.create("t1")
+    store.update("t1", status="completed", result={"files": {"main.py": "print(1)"}})
+    assert store.get("t1")["result"] == {"files": {"main.py": "print(1)"}}
+    assert store.get("t1", include_result=False)["result"] is None
+
+def test_logs_since_offset(store):
+    store.create("t1")
+    for line in ("a", "b", "c"):
+        store.logs("t1").append(line)
+    record = store.get("t1", since=1)
+    assert record["logs"] == ["b", "c"]
+    assert record["log_offset"] == 3
+    record = store.get("t1", since=3)
+    assert record["logs"] == []
+    assert record["log_offset"] == 3
+
+def test_list_and_summary_follow_status(store):
+    for task_id in ("t1", "t2", "t3"):
+        store.create(task_id)
+    store.update("t2", status="running")
+    store.update("t3", status="failed")
+
+    assert store.list_tasks() == (3, ["t1", "t2", "t3"])
+    assert store.list_tasks(limit=1, offset=1) == (3, ["t2"])
+    assert store.list_tasks(status="running") == (1, ["t2"])
+    summary = store.summary()
+    assert summary["pending"] == 1
+    assert summary["running"] == 1
+    assert summary["failed"] == 1
+
+    store.delete("t2")
+    assert "t2" not in store
+    assert store.summary()["running"] == 0
+    assert store.list_tasks() == (2, ["t1", "t3"])
+
+def test_evict_expired_archives_finished_tasks(store, tmp_path):
+    store.create("done", logs=["started"])
+    store.create("busy")
+    store.update("done", status="completed", result={"ok": True})
+    store.update("busy", status="running")
+
+    assert store.evict_expired(now=0) == 0
+    evicted = store.evict_expired(now=10 ** 12)
+    assert evicted == 1
+    assert "done" not in store
+    assert "busy" in store
+
+    with open(tmp_path / "archive.jsonl") as archive:
+        records = [json.loads(line) for line in archive]
+    assert [r["task_id"] for r in records] == ["done"]
+    assert records[0]["logs"] == ["started"]
+    assert records[0]["result"] == {"ok": True}
+
+def test_sqlite_store_persists_across_instances(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    first = SQLiteTaskStore(path)
+    first.create("t1", logs=["queued"])
+    first.update("t1", status="completed")
+    first.close()
+
+    second = SQLiteTaskStore(path)
+    record = second.get("t1")
+    second.close()
+    assert record["status"] == "completed"
+    assert record["logs"] == ["queued"]
+
+def test_create_task_store_rejects_unknown_backend(monkeypatch):
+    monkeypatch.setenv("TASK_STORE", "postgres")
+    with pytest.raises(ValueError):
+        create_task_store()
@@ -0,0 +1,106 @@
+from agent_logic.test_impact import changed_symbols, select_tests
+from agent_logic.tools.test_results import failing_tests, find_test_files, is_test_file, node_id, parse_junit
+
+CALC = """def add(a, b):
+    return a + b
+
+def mul(a, b):
+    return a * b
+"""
+
+TESTS = """from calc import add, mul
+import calc
+
+def test_add():
+    assert add(1, 2) == 3
+
+def test_mul():
+    assert mul(2, 3) == 6
+
+def test_module():
+    assert calc.mul(1, 1) == 1
+
+class TestMore:
+    def test_zero(self):
+        assert add(0, 0) == 0
+"""
+
+JUNIT = b"""<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" tests="4">
+  <testcase classname="tests" name="test_add" time="0.010"/>
+  <testcase classname="tests" name="test_mul" time="0.020">
+    <failure message="assert 5 == 6">def test_mul(): ...</failure>
+  </testcase>
+  <testcase classname="pkg.test_api.TestApi" name="test_get[1]" time="0.005">
+    <error>Traceback ...
+RuntimeError: boom</error>
+  </testcase>
+  <testcase classname="tests" name="test_slow" time="0"><skipped message="slow"/></testcase>
+</testsuite></testsuites>
+"""
+
+def previous_run(**outcomes):
+    return {"outcomes": {f"tests.py::{name}": outcome for name, outcome in outcomes.items()}}
+
+def test_node_id_maps_classnames_to_files():
+    assert node_id("tests", "test_add", ["tests.py"]) == "tests.py::test_add"
+    assert node_id("pkg.test_api.TestApi", "test_get", ["pkg/test_api.py"]) == "pkg/test_api.py::TestApi::test_get"
+    assert node_id("", "test_free", []) == "test_free"
+
+def test_parse_junit_counts_outcomes_and_failures():
+    results = parse_junit(JUNIT, ["tests.py", "pkg/test_api.py"])
+    assert (results["total"], results["passed"], results["failed"], results["errors"], results["skipped"]) == (4, 1, 1, 1, 1)
+    assert results["duration"] == 0.035
+    assert results["failures"] == [
+        {"id": "tests.py::test_mul", "outcome": "failed", "message": "assert 5 == 6"},
+        {"id": "pkg/test_api.py::TestApi::test_get[1]", "outcome": "error", "message": "RuntimeError: boom"},
+    ]
+    assert failing_tests(results) == ["tests.py::test_mul", "pkg/test_api.py::TestApi::test_get[1]"]
+
+def test_parse_junit_ignores_missing_or_broken_reports():
+    assert parse_junit(None) is None
+    assert parse_junit(b"<testsuite><testcase") is None
+    assert failing_tests(None) == []
+
+def test_is_test_file():
+    assert is_test_file("tests.py")
+    assert is_test_file("pkg/test_api.py")
+    assert is_test_file("api_test.py")
+    assert not is_test_file("calc.py")
+
+def test_changed_symbols_reports_changed_definitions():
+    assert changed_symbols(CALC, CALC.replace("a + b", "a - b"), "calc.py") == {"add"}
+    assert changed_symbols(CALC, CALC + "\nprint('side effect')\n", "calc.py") is None
+    assert changed_symbols(None, CALC, "calc.py") is None
+
+def test_selects_failing_and_affected_tests():
+    old = {"calc.py": CALC.replace("a * b", "a + b"), "tests.py": TESTS}
+    new = {"calc.py": CALC, "tests.py": TESTS}
+    selection = select_tests(previous_run(test_add="failed", test_mul="passed"), old, new, "python")
+    assert selection["tests"] == ["tests.py::test_add", "tests.py::test_mul", "tests.py::test_module"]
+    assert (selection["failing"], selection["affected"], selection["total"]) == (1, 2, 4)
+    assert selection["changed_files"] == ["calc.py"]
+
+def test_falls_back_to_the_full_suite():
+    old = {"calc.py": CALC, "tests.py": TESTS}
+    failing = previous_run(test_mul="failed")
+    assert select_tests(failing, old, dict(old, **{"calc.py": CALC + "print('loaded')\n"}), "python") is None
+    assert select_tests(failing, old, dict(old, **{"requirements.txt": "pytest\n"}), "python") is None
+    assert select_tests(failing, old, dict(old, **{"calc.py": "def add(:\n"}), "python") is None
+    assert select_tests(previous_run(test_mul="passed"), old, old, "python") is None
+    assert select_tests(failing, old, old, "javascript") is None
+
+def test_selection_uses_the_same_test_files_as_the_full_run():
+    files = {
+        "calc.py": CALC,
+        "tests/test_calc.py": TESTS,
+        "pkg/calc_test.py": "from calc import mul\n\ndef test_mul_again():\n    assert mul(1, 1) == 1\n",
+        "check_calc.py": "from calc import add\n\ndef test_not_collected():\n    assert add(1, 1) == 2\n",
+    }
+    previous = {"outcomes": {"tests/test_calc.py::test_mul": "failed"}}
+    selection = select_tests(previous, dict(files, **{"calc.py": CALC.replace("a * b", "a + b")}), files, "python")
+    full_run = find_test_files(files)
+    assert full_run == ["pkg/calc_test.py", "tests/test_calc.py"]
+    assert selection["tests"] == ["tests/test_calc.py::test_mul", "tests/test_calc.py::test_module", "pkg/calc_test.py::test_mul_again"]
+    assert selection["total"] == 5
+    assert all(case.split("::")[0] in full_run for case in selection["tests"])
@@ -0,0 +1,225 @@
+import argparse
+import os
+import signal
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+from agent_logic.crew_registry import get_crew_registry
+from queue_secrets import PayloadSealError, get_payload_sealer
+from task_queue import Lease, TaskQueue, create_task_queue, default_worker_id
+from task_runner import run_task
+from task_store import TaskReporter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class WorkerJob:
+    def __init__(self, lease: Lease):
+        self.lease = lease
+        self.cancel_event = threading.Event()
+        self.lost = False
+        self.thread: Optional[threading.Thread] = None
+
+class LeaseReporter(TaskReporter):
+    def __init__(self, task_queue: TaskQueue, job: WorkerJob):
+        self.task_queue = task_queue
+        self.job = job
+        self._last_update: Optional[Dict] = None
+
+    def update(self, task_id: str, **fields):
+        if fields == self._last_update:
+            return
+        self._last_update = fields
+        self._publish(task_id, "update", fields)
+
+    def append_log(self, task_id: str, line: str):
+        self._publish(task_id, "log", {"line": line})
+
+    def _publish(self, task_id: str, kind: str, data: Dict):
+        if self.job.lost:
+            return
+        try:
+            self.task_queue.publish(task_id, kind, data)
+        except Exception as e:
+            logger.warning(f"[{task_id}] Could not report {kind} to the queue: {str(e)}")
+
+class TaskWorker:
+    def __init__(
+        self,
+        task_queue: TaskQueue,
+        crew_registry=None,
+        concurrency: int = 4,
+        worker_id: Optional[str] = None,
+        heartbeat_interval: float = 10.0,
+        poll_interval: float = 1.0,
+        drain_timeout: float = 300.0,
+        max_attempts: int = 3,
+        sealer=None
+    ):
+        self.task_queue = task_queue
+        self.sealer = sealer or get_payload_sealer()
+        self.crew_registry = crew_registry or get_crew_registry()
+        self.concurrency = concurrency
+        self.worker_id = worker_id or default_worker_id()
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self.max_attempts = max_attempts
+        self.draining = threading.Event()
+        self.stopped = threading.Event()
+        self._jobs: Dict[str, WorkerJob] = {}
+        self._lock = threading.Lock()
+        self._stats = {"claimed": 0, "completed": 0, "lost": 0, "released": 0}
+
+    def run(self):
+        logger.info(f"Worker {self.worker_id} started with {self.concurrency} slots")
+        self.crew_registry.warm_up()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="worker-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            while not self.draining.is_set():
+                if self.active() >= self.concurrency:
+                    self.draining.wait(self.poll_interval)
+                    continue
+                try:
+                    lease = self.task_queue.claim(self.worker_id)
+                except Exception as e:
+                    logger.warning(f"Claiming a task failed: {str(e)}")
+                    lease = None
+                if lease is None:
+                    self.draining.wait(self.poll_interval)
+                    continue
+                self._start(lease)
+        finally:
+            self._drain()
+            self.stopped.set()
+            heartbeat.join()
+            self.task_queue.unregister_worker(self.worker_id)
+            self.crew_registry.shutdown()
+            self.task_queue.close()
+            logger.info(f"Worker {self.worker_id} stopped")
+
+    def drain(self):
+        if not self.draining.is_set():
+            logger.info(f"Worker {self.worker_id} draining, no new tasks will be claimed")
+        self.draining.set()
+
+    def active(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats, active=len(self._jobs), slots=self.concurrency, draining=self.draining.is_set())
+
+    def _start(self, lease: Lease):
+        job = WorkerJob(lease)
+        with self._lock:
+            self._jobs[lease.task_id] = job
+            self._stats["claimed"] += 1
+        job.thread = threading.Thread(target=self._execute, args=(job,), name=f"task-{lease.task_id[:8]}", daemon=True)
+        job.thread.start()
+
+    def _execute(self, job: WorkerJob):
+        lease = job.lease
+        reporter = LeaseReporter(self.task_queue, job)
+        try:
+            if lease.attempts > self.max_attempts:
+                logger.error(f"[{lease.task_id}] Giving up after {lease.attempts - 1} deliveries")
+                reporter.append_log(lease.task_id, f"ERROR: Task was delivered {lease.attempts - 1} times without finishing")
+                outcome = {"status": "failed", "error": "Task exceeded the maximum number of delivery attempts"}
+            else:
+                if lease.attempts > 1:
+                    reporter.append_log(lease.task_id, f"Task picked up by worker {self.worker_id} (attempt {lease.attempts})")
+                outcome = self._run(lease, reporter, job.cancel_event)
+            if job.lost:
+                logger.warning(f"[{lease.task_id}] Lease was lost, discarding {outcome['status']} result")
+            elif not self.task_queue.complete(lease, outcome):
+                logger.warning(f"[{lease.task_id}] Lease expired before completion, result discarded")
+            else:
+                with self._lock:
+                    self._stats["completed"] += 1
+        except Exception as e:
+            logger.error(f"[{lease.task_id}] Worker failed to finish task: {str(e)}")
+        finally:
+            with self._lock:
+                self._jobs.pop(lease.task_id, None)
+
+    def _run(self, lease: Lease, reporter: LeaseReporter, cancel_event: threading.Event) -> Dict:
+        try:
+            payload = self.sealer.open_payload(lease.task_id, lease.payload)
+        except PayloadSealError as e:
+            logger.error(f"[{lease.task_id}] {str(e)}")
+            reporter.append_log(lease.task_id, f"ERROR: {str(e)}")
+            return {"status": "failed", "error": "Could not decrypt the queued task"}
+        return run_task(reporter, self.crew_registry, cancel_event=cancel_event, **payload)
+
+    def _heartbeat_loop(self):
+        while not self.stopped.is_set():
+            try:
+                self.task_queue.worker_heartbeat(self.worker_id, self.stats())
+            except Exception as e:
+                logger.warning(f"Worker heartbeat failed: {str(e)}")
+            with self._lock:
+                jobs = list(self._jobs.values())
+            for job in jobs:
+                try:
+                    state = self.task_queue.heartbeat(job.lease)
+                except Exception as e:
+                    logger.warning(f"[{job.lease.task_id}] Lease heartbeat failed: {str(e)}")
+                    continue
+                if state == "cancelled" and not job.cancel_event.is_set():
+                    logger.info(f"[{job.lease.task_id}] Cancellation requested")
+                    job.cancel_event.set()
+                elif state == "lost" and not job.lost:
+                    logger.warning(f"[{job.lease.task_id}] Lease lost, stopping task")
+                    job.lost = True
+                    job.cancel_event.set()
+                    with self._lock:
+                        self._stats["lost"] += 1
+            self.stopped.wait(self.heartbeat_interval)
+
+    def _drain(self):
+        deadline = time.monotonic() + self.drain_timeout
+        while self.active() and time.monotonic() < deadline:
+            time.sleep(min(1.0, self.poll_interval))
+        with self._lock:
+            remaining = list(self._jobs.values())
+        for job in remaining:
+            job.lost = True
+            job.cancel_event.set()
+            try:
+                released = self.task_queue.release(job.lease)
+            except Exception as e:
+                logger.warning(f"[{job.lease.task_id}] Could not re-queue task: {str(e)}")
+                continue
+            if released:
+                self.task_queue.publish(job.lease.task_id, "log", {"line": f"Worker {self.worker_id} shut down, task re-queued"})
+                with self._lock:
+                    self._stats["released"] += 1
+                logger.info(f"[{job.lease.task_id}] Re-queued unfinished task")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run OpenDevAgent tasks from the task queue")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", os.getenv("TASK_WORKERS", "4"))))
+    parser.add_argument("--worker-id", default=os.getenv("WORKER_ID") or None)
+    parser.add_argument("--drain-timeout", type=float, default=float(os.getenv("WORKER_DRAIN_TIMEOUT", "300")))
+    args = parser.parse_args()
+
+    worker = TaskWorker(
+        create_task_queue(),
+        concurrency=args.concurrency,
+        worker_id=args.worker_id,
+        heartbeat_interval=float(os.getenv("TASK_HEARTBEAT_INTERVAL", "10")),
+        poll_interval=float(os.getenv("WORKER_POLL_INTERVAL", "1")),
+        drain_timeout=args.drain_timeout,
+        max_attempts=int(os.getenv("TASK_MAX_ATTEMPTS", "3")),
+    )
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: worker.drain())
+    worker.run()
+
+if __name__ == "__main__":
+    main()
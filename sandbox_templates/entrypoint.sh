@@ -3,7 +3,11 @@ set -e
 
 cd /sandbox
 
-if [ -f "requirements.txt" ]; then
+if [ "$#" -gt 0 ]; then
+    exec "$@"
+fi
+
+if [ -f "requirements.txt" ] && ! cmp -s requirements.txt /opt/deps/requirements.txt; then
     pip install -r requirements.txt
 fi
 